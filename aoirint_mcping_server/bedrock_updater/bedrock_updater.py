@@ -1,21 +1,47 @@
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-import schedule
+from prometheus_client import start_http_server
 from pydantic import BaseModel
+from sqlalchemy import create_engine
 
 from .. import __version__ as APP_VERSION
 from ..lib.repository.bedrock_ping_record_repository import (
+    BedrockPingRecordRepository,
     BedrockPingRecordRepositoryImpl,
+    CreateBedrockPingRecord,
 )
 from ..lib.repository.bedrock_ping_repository import (
     BedrockPingRefusedError,
+    BedrockPingRepository,
     BedrockPingRepositoryImpl,
     BedrockPingTimeoutError,
 )
-from ..lib.repository.bedrock_server_repository import BedrockServerRepositoryImpl
+from ..lib.repository.bedrock_server_repository import (
+    BedrockServer,
+    BedrockServerRepositoryImpl,
+)
+from ..lib.repository.dns_resolver_repository import (
+    CachedDnsResolverRepositoryImpl,
+    DnsResolverRepositoryImpl,
+)
+from ..lib.repository.ping_record_partition_repository import (
+    BEDROCK_PING_RECORD_PARTITIONED_TABLES,
+    UPDATER_FUTURE_PARTITIONS,
+    PingRecordPartitionRepositoryImpl,
+)
 from ..lib.util.logging_utility import setup_logger
+from ..lib.util.metrics_utility import (
+    UPDATER_SWEEP_DURATION,
+    UPDATER_WRITE_DURATION,
+    observe_ping,
+)
+from ..lib.util.ping_schedule_utility import PingScheduleConfig
+from ..lib.util.signal_utility import install_stop_signal_handlers
+from ..lib.util.update_loop_utility import run_update_loop
 
 logger = logging.Logger(name="bedrock_updater")
 
@@ -23,81 +49,290 @@ logger = logging.Logger(name="bedrock_updater")
 class BedrockUpdaterConfig(BaseModel):
     database_url: str
     interval: int
+    important_interval: int
+    max_backoff_interval: int
+    jitter: float
+    dns_min_ttl: int
+    dns_max_ttl: int
+    dns_negative_ttl: int
     timeout: float
+    concurrency: int
+    metrics_host: str
+    metrics_port: int | None
 
 
-def update(config: BedrockUpdaterConfig) -> None:
-    bedrock_server_api = BedrockServerRepositoryImpl(database_url=config.database_url)
-    bedrock_ping_api = BedrockPingRepositoryImpl()
-    bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(
-        database_url=config.database_url
+def ping_bedrock_server(
+    bedrock_ping_api: BedrockPingRepository,
+    bedrock_server: BedrockServer,
+    timeout: float,
+    logger: logging.Logger,
+) -> CreateBedrockPingRecord | None:
+    """
+    Ping a server and log with "logger" of the calling updater.
+    """
+    logger.info(
+        f"Ping {bedrock_server.host}:{bedrock_server.port} ({bedrock_server.id})"
     )
+    started_at = time.monotonic()
+    try:
+        ping_result = bedrock_ping_api.ping(
+            host=bedrock_server.host,
+            port=bedrock_server.port,
+            timeout=timeout,
+        )
+        observe_ping(
+            edition="bedrock",
+            server_id=bedrock_server.id,
+            result="success",
+            duration=time.monotonic() - started_at,
+        )
+        return CreateBedrockPingRecord(
+            bedrock_server_id=bedrock_server.id,
+            timeout=timeout,
+            is_timeout=False,
+            is_refused=False,
+            version_protocol=ping_result.version_protocol,
+            version_brand=ping_result.version_brand,
+            version_version=ping_result.version_version,
+            latency=ping_result.latency,
+            players_online=ping_result.players_online,
+            players_max=ping_result.players_max,
+            motd=ping_result.motd,
+            map=ping_result.map,
+            gamemode=ping_result.gamemode,
+        )
+    except BedrockPingTimeoutError:
+        observe_ping(
+            edition="bedrock",
+            server_id=bedrock_server.id,
+            result="timeout",
+            duration=time.monotonic() - started_at,
+        )
+        return CreateBedrockPingRecord(
+            bedrock_server_id=bedrock_server.id,
+            timeout=timeout,
+            is_timeout=True,
+            is_refused=False,
+            version_protocol=None,
+            version_brand=None,
+            version_version=None,
+            latency=None,
+            players_online=None,
+            players_max=None,
+            motd=None,
+            map=None,
+            gamemode=None,
+        )
+    except BedrockPingRefusedError:
+        observe_ping(
+            edition="bedrock",
+            server_id=bedrock_server.id,
+            result="refused",
+            duration=time.monotonic() - started_at,
+        )
+        return CreateBedrockPingRecord(
+            bedrock_server_id=bedrock_server.id,
+            timeout=timeout,
+            is_timeout=False,
+            is_refused=True,
+            version_protocol=None,
+            version_brand=None,
+            version_version=None,
+            latency=None,
+            players_online=None,
+            players_max=None,
+            motd=None,
+            map=None,
+            gamemode=None,
+        )
+    except Exception:
+        observe_ping(
+            edition="bedrock",
+            server_id=bedrock_server.id,
+            result="error",
+            duration=time.monotonic() - started_at,
+        )
+        # Skip the server not to lose the results of the other servers
+        logger.exception(
+            f"Failed to ping {bedrock_server.host}:{bedrock_server.port} "
+            f"({bedrock_server.id})"
+        )
+        return None
+
 
-    for bedrock_server in bedrock_server_api.get_bedrock_servers():
-        logger.info(
-            f"Ping {bedrock_server.host}:{bedrock_server.port} ({bedrock_server.id})"
+def sweep_bedrock_servers(
+    executor: ThreadPoolExecutor,
+    bedrock_ping_api: BedrockPingRepository,
+    bedrock_ping_record_api: BedrockPingRecordRepository,
+    bedrock_servers: list[BedrockServer],
+    timeout: float,
+) -> list[CreateBedrockPingRecord | None]:
+    """
+    Ping the servers and write their records, and return the records in the order
+    of the servers (None for the servers skipped by an error).
+    """
+    started_at = time.monotonic()
+
+    # Ping servers concurrently so that a sweep takes about as long as the slowest
+    # server rather than the sum of all the timeouts.
+    ping_records = list(
+        executor.map(
+            lambda bedrock_server: ping_bedrock_server(
+                bedrock_ping_api=bedrock_ping_api,
+                bedrock_server=bedrock_server,
+                timeout=timeout,
+                logger=logger,
+            ),
+            bedrock_servers,
         )
-        try:
-            ping_result = bedrock_ping_api.ping(
-                host=bedrock_server.host,
-                port=bedrock_server.port,
-                timeout=config.timeout,
-            )
-            bedrock_ping_record_api.create_bedrock_ping_record(
-                bedrock_server_id=bedrock_server.id,
-                timeout=config.timeout,
-                is_timeout=False,
-                is_refused=False,
-                version_protocol=ping_result.version_protocol,
-                version_brand=ping_result.version_brand,
-                version_version=ping_result.version_version,
-                latency=ping_result.latency,
-                players_online=ping_result.players_online,
-                players_max=ping_result.players_max,
-                motd=ping_result.motd,
-                map=ping_result.map,
-                gamemode=ping_result.gamemode,
-            )
-        except BedrockPingTimeoutError:
-            bedrock_ping_record_api.create_bedrock_ping_record(
-                bedrock_server_id=bedrock_server.id,
-                timeout=config.timeout,
-                is_timeout=True,
-                is_refused=False,
-                version_protocol=None,
-                version_brand=None,
-                version_version=None,
-                latency=None,
-                players_online=None,
-                players_max=None,
-                motd=None,
-                map=None,
-                gamemode=None,
+    )
+    pinged_at = time.monotonic()
+
+    # Write the results of the whole sweep at once
+    created_ping_records = [
+        ping_record for ping_record in ping_records if ping_record is not None
+    ]
+    bedrock_ping_record_api.create_bedrock_ping_records(
+        ping_records=created_ping_records
+    )
+    written_at = time.monotonic()
+    UPDATER_WRITE_DURATION.labels(edition="bedrock").observe(written_at - pinged_at)
+    UPDATER_SWEEP_DURATION.labels(updater=logger.name).observe(written_at - started_at)
+
+    timeout_count = sum(
+        1 for ping_record in created_ping_records if ping_record.is_timeout
+    )
+    refused_count = sum(
+        1 for ping_record in created_ping_records if ping_record.is_refused
+    )
+    logger.info(
+        f"Swept {len(bedrock_servers)} servers in {written_at - started_at:.3f}s "
+        f"(ping {pinged_at - started_at:.3f}s, write {written_at - pinged_at:.3f}s): "
+        f"{len(created_ping_records)} records, {timeout_count} timeouts, "
+        f"{refused_count} refused, "
+        f"{len(bedrock_servers) - len(created_ping_records)} skipped"
+    )
+
+    return ping_records
+
+
+def update(config: BedrockUpdaterConfig) -> None:
+    engine = create_engine(url=config.database_url)
+    try:
+        bedrock_server_api = BedrockServerRepositoryImpl(engine=engine)
+        bedrock_ping_api = BedrockPingRepositoryImpl(
+            dns_resolver_api=DnsResolverRepositoryImpl(),
+        )
+        bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(engine=engine)
+
+        ping_record_partition_api = PingRecordPartitionRepositoryImpl(engine=engine)
+        for table in BEDROCK_PING_RECORD_PARTITIONED_TABLES:
+            ping_record_partition_api.create_ping_record_partitions(
+                table=table,
+                months_ahead=UPDATER_FUTURE_PARTITIONS,
             )
-        except BedrockPingRefusedError:
-            bedrock_ping_record_api.create_bedrock_ping_record(
-                bedrock_server_id=bedrock_server.id,
+
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+            sweep_bedrock_servers(
+                executor=executor,
+                bedrock_ping_api=bedrock_ping_api,
+                bedrock_ping_record_api=bedrock_ping_record_api,
+                bedrock_servers=bedrock_server_api.get_bedrock_servers(),
                 timeout=config.timeout,
-                is_timeout=False,
-                is_refused=True,
-                version_protocol=None,
-                version_brand=None,
-                version_version=None,
-                latency=None,
-                players_online=None,
-                players_max=None,
-                motd=None,
-                map=None,
-                gamemode=None,
             )
+    finally:
+        engine.dispose()
 
 
 def update_loop(config: BedrockUpdaterConfig) -> None:
-    schedule.every(interval=config.interval).seconds.do(update, config=config)
+    """
+    Run as a daemon until SIGTERM or SIGINT. The engine, the repositories and
+    their caches are kept across the sweeps, and the sweep in progress is
+    finished (including its write) before stopping.
+    """
+    stop_event = threading.Event()
+    install_stop_signal_handlers(stop_event=stop_event, logger=logger)
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    if config.metrics_port is not None:
+        start_http_server(port=config.metrics_port, addr=config.metrics_host)
+
+    # The database is used only from this thread, one query at a time. The pings
+    # on the executor do not use it, so the pool is not sized to the concurrency.
+    engine = create_engine(url=config.database_url, pool_size=1)
+
+    bedrock_server_api = BedrockServerRepositoryImpl(engine=engine)
+    ping_record_partition_api = PingRecordPartitionRepositoryImpl(engine=engine)
+    # Resolve each host once per TTL instead of on every ping
+    dns_resolver_api = CachedDnsResolverRepositoryImpl(
+        resolver=DnsResolverRepositoryImpl(),
+        min_ttl=config.dns_min_ttl,
+        max_ttl=config.dns_max_ttl,
+        negative_ttl=config.dns_negative_ttl,
+    )
+    bedrock_ping_api = BedrockPingRepositoryImpl(dns_resolver_api=dns_resolver_api)
+    bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(engine=engine)
+
+    bedrock_servers_by_id: dict[str, BedrockServer] = {}
+
+    def reload_servers() -> dict[str, dict[str, bool]]:
+        bedrock_servers = bedrock_server_api.get_bedrock_servers()
+        bedrock_servers_by_id.clear()
+        bedrock_servers_by_id.update(
+            (bedrock_server.id, bedrock_server) for bedrock_server in bedrock_servers
+        )
+        return {
+            "bedrock": {
+                bedrock_server.id: bedrock_server.is_important
+                for bedrock_server in bedrock_servers
+            },
+        }
+
+    logger.info("Started")
+    try:
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+
+            def sweep_due_servers(
+                server_ids_by_edition: dict[str, list[str]],
+            ) -> dict[str, list[bool]]:
+                ping_records = sweep_bedrock_servers(
+                    executor=executor,
+                    bedrock_ping_api=bedrock_ping_api,
+                    bedrock_ping_record_api=bedrock_ping_record_api,
+                    bedrock_servers=[
+                        bedrock_servers_by_id[server_id]
+                        for server_id in server_ids_by_edition["bedrock"]
+                    ],
+                    timeout=config.timeout,
+                )
+                return {
+                    "bedrock": [
+                        ping_record is None
+                        or ping_record.is_timeout
+                        or ping_record.is_refused
+                        for ping_record in ping_records
+                    ],
+                }
+
+            run_update_loop(
+                stop_event=stop_event,
+                editions=["bedrock"],
+                ping_schedule_config=PingScheduleConfig(
+                    interval=config.interval,
+                    important_interval=config.important_interval,
+                    max_backoff_interval=config.max_backoff_interval,
+                    jitter=config.jitter,
+                ),
+                ping_record_partition_api=ping_record_partition_api,
+                partitioned_tables=BEDROCK_PING_RECORD_PARTITIONED_TABLES,
+                dns_resolver_api=dns_resolver_api,
+                reload_servers=reload_servers,
+                sweep=sweep_due_servers,
+                logger=logger,
+            )
+    finally:
+        engine.dispose()
+
+    logger.info("Stopped")
 
 
 def main() -> None:
@@ -114,11 +349,63 @@ def main() -> None:
         type=int,
         default=os.environ.get("MCPING_BEDROCK_UPDATER_INTERVAL", "300"),
     )
+    parser.add_argument(
+        "--important_interval",
+        type=int,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_IMPORTANT_INTERVAL", "60"),
+        help="Interval for the servers flagged as important",
+    )
+    parser.add_argument(
+        "--max_backoff_interval",
+        type=int,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_MAX_BACKOFF_INTERVAL", "3600"),
+        help="Upper bound of the interval for the servers failing consecutively",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_JITTER", "0.1"),
+        help="Ratio of the interval to randomize",
+    )
+    parser.add_argument(
+        "--dns_min_ttl",
+        type=int,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_DNS_MIN_TTL", "60"),
+        help="Lower bound of the seconds to cache a DNS resolution",
+    )
+    parser.add_argument(
+        "--dns_max_ttl",
+        type=int,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_DNS_MAX_TTL", "3600"),
+        help="Upper bound of the seconds to cache a DNS resolution",
+    )
+    parser.add_argument(
+        "--dns_negative_ttl",
+        type=int,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_DNS_NEGATIVE_TTL", "300"),
+        help="Seconds to cache a host name which does not exist",
+    )
     parser.add_argument(
         "--timeout",
         type=float,
         default=os.environ.get("MCPING_BEDROCK_UPDATER_TIMEOUT", "3"),
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_CONCURRENCY", "16"),
+    )
+    parser.add_argument(
+        "--metrics_host",
+        type=str,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_METRICS_HOST", "0.0.0.0"),
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=os.environ.get("MCPING_BEDROCK_UPDATER_METRICS_PORT"),
+        help="Port to serve the Prometheus metrics in the loop (disabled if unset)",
+    )
     parser.add_argument(
         "-l",
         "--loop",
@@ -144,7 +431,16 @@ def main() -> None:
     log_file: str | None = args.log_file
     database_url: str = args.database_url
     interval: int = args.interval
+    important_interval: int = args.important_interval
+    max_backoff_interval: int = args.max_backoff_interval
+    jitter: float = args.jitter
+    dns_min_ttl: int = args.dns_min_ttl
+    dns_max_ttl: int = args.dns_max_ttl
+    dns_negative_ttl: int = args.dns_negative_ttl
     timeout: float = args.timeout
+    concurrency: int = args.concurrency
+    metrics_host: str = args.metrics_host
+    metrics_port: int | None = args.metrics_port
     loop: bool = args.loop
 
     logging.basicConfig(
@@ -155,7 +451,16 @@ def main() -> None:
     config = BedrockUpdaterConfig(
         database_url=database_url,
         interval=interval,
+        important_interval=important_interval,
+        max_backoff_interval=max_backoff_interval,
+        jitter=jitter,
+        dns_min_ttl=dns_min_ttl,
+        dns_max_ttl=dns_max_ttl,
+        dns_negative_ttl=dns_negative_ttl,
         timeout=timeout,
+        concurrency=concurrency,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
     )
 
     if loop:
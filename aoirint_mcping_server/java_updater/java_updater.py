@@ -1,22 +1,48 @@
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-import schedule
+from prometheus_client import start_http_server
 from pydantic import BaseModel
+from sqlalchemy import create_engine
 
 from .. import __version__ as APP_VERSION
+from ..lib.repository.dns_resolver_repository import (
+    CachedDnsResolverRepositoryImpl,
+    DnsResolverRepositoryImpl,
+)
 from ..lib.repository.java_ping_record_repository import (
+    CreateJavaPingRecord,
     CreateJavaPingRecordJavaPingRecordPlayer,
+    JavaPingRecordRepository,
     JavaPingRecordRepositoryImpl,
 )
 from ..lib.repository.java_ping_repository import (
     JavaPingRefusedError,
+    JavaPingRepository,
     JavaPingRepositoryImpl,
     JavaPingTimeoutError,
 )
-from ..lib.repository.java_server_repository import JavaServerRepositoryImpl
+from ..lib.repository.java_server_repository import (
+    JavaServer,
+    JavaServerRepositoryImpl,
+)
+from ..lib.repository.ping_record_partition_repository import (
+    JAVA_PING_RECORD_PARTITIONED_TABLES,
+    UPDATER_FUTURE_PARTITIONS,
+    PingRecordPartitionRepositoryImpl,
+)
 from ..lib.util.logging_utility import setup_logger
+from ..lib.util.metrics_utility import (
+    UPDATER_SWEEP_DURATION,
+    UPDATER_WRITE_DURATION,
+    observe_ping,
+)
+from ..lib.util.ping_schedule_utility import PingScheduleConfig
+from ..lib.util.signal_utility import install_stop_signal_handlers
+from ..lib.util.update_loop_utility import run_update_loop
 
 logger = logging.Logger(name="java_updater")
 
@@ -24,82 +50,288 @@ logger = logging.Logger(name="java_updater")
 class JavaUpdaterConfig(BaseModel):
     database_url: str
     interval: int
+    important_interval: int
+    max_backoff_interval: int
+    jitter: float
+    dns_min_ttl: int
+    dns_max_ttl: int
+    dns_negative_ttl: int
     timeout: float
+    concurrency: int
+    metrics_host: str
+    metrics_port: int | None
+
+
+def ping_java_server(
+    java_ping_api: JavaPingRepository,
+    java_server: JavaServer,
+    timeout: float,
+    logger: logging.Logger,
+) -> CreateJavaPingRecord | None:
+    """
+    Ping a server and log with "logger" of the calling updater.
+    """
+    logger.info(f"Ping {java_server.host}:{java_server.port} ({java_server.id})")
+    started_at = time.monotonic()
+    try:
+        ping_result = java_ping_api.ping(
+            host=java_server.host,
+            port=java_server.port,
+            timeout=timeout,
+        )
+        observe_ping(
+            edition="java",
+            server_id=java_server.id,
+            result="success",
+            duration=time.monotonic() - started_at,
+        )
+        return CreateJavaPingRecord(
+            java_server_id=java_server.id,
+            timeout=timeout,
+            is_timeout=False,
+            is_refused=False,
+            version_protocol=ping_result.version_protocol,
+            version_name=ping_result.version_name,
+            latency=ping_result.latency,
+            players_online=ping_result.players_online,
+            players_max=ping_result.players_max,
+            players_sample=[
+                CreateJavaPingRecordJavaPingRecordPlayer(
+                    player_id=player_sample.id,
+                    name=player_sample.name,
+                )
+                for player_sample in ping_result.players_sample
+            ],
+            description=ping_result.description,
+            favicon=ping_result.favicon,
+        )
+    except JavaPingTimeoutError:
+        observe_ping(
+            edition="java",
+            server_id=java_server.id,
+            result="timeout",
+            duration=time.monotonic() - started_at,
+        )
+        return CreateJavaPingRecord(
+            java_server_id=java_server.id,
+            timeout=timeout,
+            is_timeout=True,
+            is_refused=False,
+            version_protocol=None,
+            version_name=None,
+            latency=None,
+            players_online=None,
+            players_max=None,
+            players_sample=None,
+            description=None,
+            favicon=None,
+        )
+    except JavaPingRefusedError:
+        observe_ping(
+            edition="java",
+            server_id=java_server.id,
+            result="refused",
+            duration=time.monotonic() - started_at,
+        )
+        return CreateJavaPingRecord(
+            java_server_id=java_server.id,
+            timeout=timeout,
+            is_timeout=False,
+            is_refused=True,
+            version_protocol=None,
+            version_name=None,
+            latency=None,
+            players_online=None,
+            players_max=None,
+            players_sample=None,
+            description=None,
+            favicon=None,
+        )
+    except Exception:
+        observe_ping(
+            edition="java",
+            server_id=java_server.id,
+            result="error",
+            duration=time.monotonic() - started_at,
+        )
+        # Skip the server not to lose the results of the other servers
+        logger.exception(
+            f"Failed to ping {java_server.host}:{java_server.port} "
+            f"({java_server.id})"
+        )
+        return None
+
+
+def sweep_java_servers(
+    executor: ThreadPoolExecutor,
+    java_ping_api: JavaPingRepository,
+    java_ping_record_api: JavaPingRecordRepository,
+    java_servers: list[JavaServer],
+    timeout: float,
+) -> list[CreateJavaPingRecord | None]:
+    """
+    Ping the servers and write their records, and return the records in the order
+    of the servers (None for the servers skipped by an error).
+    """
+    started_at = time.monotonic()
+
+    # Ping servers concurrently so that a sweep takes about as long as the slowest
+    # server rather than the sum of all the timeouts.
+    ping_records = list(
+        executor.map(
+            lambda java_server: ping_java_server(
+                java_ping_api=java_ping_api,
+                java_server=java_server,
+                timeout=timeout,
+                logger=logger,
+            ),
+            java_servers,
+        )
+    )
+    pinged_at = time.monotonic()
+
+    # Write the results of the whole sweep at once
+    created_ping_records = [
+        ping_record for ping_record in ping_records if ping_record is not None
+    ]
+    java_ping_record_api.create_java_ping_records(ping_records=created_ping_records)
+    written_at = time.monotonic()
+    UPDATER_WRITE_DURATION.labels(edition="java").observe(written_at - pinged_at)
+    UPDATER_SWEEP_DURATION.labels(updater=logger.name).observe(written_at - started_at)
+
+    timeout_count = sum(
+        1 for ping_record in created_ping_records if ping_record.is_timeout
+    )
+    refused_count = sum(
+        1 for ping_record in created_ping_records if ping_record.is_refused
+    )
+    logger.info(
+        f"Swept {len(java_servers)} servers in {written_at - started_at:.3f}s "
+        f"(ping {pinged_at - started_at:.3f}s, write {written_at - pinged_at:.3f}s): "
+        f"{len(created_ping_records)} records, {timeout_count} timeouts, "
+        f"{refused_count} refused, "
+        f"{len(java_servers) - len(created_ping_records)} skipped"
+    )
+
+    return ping_records
 
 
 def update(config: JavaUpdaterConfig) -> None:
-    java_server_api = JavaServerRepositoryImpl(database_url=config.database_url)
-    java_ping_api = JavaPingRepositoryImpl()
-    java_ping_record_api = JavaPingRecordRepositoryImpl(
-        database_url=config.database_url
-    )
-
-    for java_server in java_server_api.get_java_servers():
-        logger.info(f"Ping {java_server.host}:{java_server.port} ({java_server.id})")
-        try:
-            ping_result = java_ping_api.ping(
-                host=java_server.host,
-                port=java_server.port,
-                timeout=config.timeout,
-            )
-            java_ping_record_api.create_java_ping_record(
-                java_server_id=java_server.id,
-                timeout=config.timeout,
-                is_timeout=False,
-                is_refused=False,
-                version_protocol=ping_result.version_protocol,
-                version_name=ping_result.version_name,
-                latency=ping_result.latency,
-                players_online=ping_result.players_online,
-                players_max=ping_result.players_max,
-                players_sample=[
-                    CreateJavaPingRecordJavaPingRecordPlayer(
-                        player_id=player_sample.id,
-                        name=player_sample.name,
-                    )
-                    for player_sample in ping_result.players_sample
-                ],
-                description=ping_result.description,
-                favicon=ping_result.favicon,
-            )
-        except JavaPingTimeoutError:
-            java_ping_record_api.create_java_ping_record(
-                java_server_id=java_server.id,
-                timeout=config.timeout,
-                is_timeout=True,
-                is_refused=False,
-                version_protocol=None,
-                version_name=None,
-                latency=None,
-                players_online=None,
-                players_max=None,
-                players_sample=None,
-                description=None,
-                favicon=None,
+    engine = create_engine(url=config.database_url)
+    try:
+        java_server_api = JavaServerRepositoryImpl(engine=engine)
+        java_ping_api = JavaPingRepositoryImpl(
+            dns_resolver_api=DnsResolverRepositoryImpl(),
+        )
+        java_ping_record_api = JavaPingRecordRepositoryImpl(engine=engine)
+
+        ping_record_partition_api = PingRecordPartitionRepositoryImpl(engine=engine)
+        for table in JAVA_PING_RECORD_PARTITIONED_TABLES:
+            ping_record_partition_api.create_ping_record_partitions(
+                table=table,
+                months_ahead=UPDATER_FUTURE_PARTITIONS,
             )
-        except JavaPingRefusedError:
-            java_ping_record_api.create_java_ping_record(
-                java_server_id=java_server.id,
+
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+            sweep_java_servers(
+                executor=executor,
+                java_ping_api=java_ping_api,
+                java_ping_record_api=java_ping_record_api,
+                java_servers=java_server_api.get_java_servers(),
                 timeout=config.timeout,
-                is_timeout=False,
-                is_refused=True,
-                version_protocol=None,
-                version_name=None,
-                latency=None,
-                players_online=None,
-                players_max=None,
-                players_sample=None,
-                description=None,
-                favicon=None,
             )
+    finally:
+        engine.dispose()
 
 
 def update_loop(config: JavaUpdaterConfig) -> None:
-    schedule.every(interval=config.interval).seconds.do(update, config=config)
+    """
+    Run as a daemon until SIGTERM or SIGINT. The engine, the repositories and
+    their caches are kept across the sweeps, and the sweep in progress is
+    finished (including its write) before stopping.
+    """
+    stop_event = threading.Event()
+    install_stop_signal_handlers(stop_event=stop_event, logger=logger)
+
+    if config.metrics_port is not None:
+        start_http_server(port=config.metrics_port, addr=config.metrics_host)
+
+    # The database is used only from this thread, one query at a time. The pings
+    # on the executor do not use it, so the pool is not sized to the concurrency.
+    engine = create_engine(url=config.database_url, pool_size=1)
+
+    java_server_api = JavaServerRepositoryImpl(engine=engine)
+    ping_record_partition_api = PingRecordPartitionRepositoryImpl(engine=engine)
+    # Resolve each host once per TTL instead of on every ping
+    dns_resolver_api = CachedDnsResolverRepositoryImpl(
+        resolver=DnsResolverRepositoryImpl(),
+        min_ttl=config.dns_min_ttl,
+        max_ttl=config.dns_max_ttl,
+        negative_ttl=config.dns_negative_ttl,
+    )
+    java_ping_api = JavaPingRepositoryImpl(dns_resolver_api=dns_resolver_api)
+    java_ping_record_api = JavaPingRecordRepositoryImpl(engine=engine)
+
+    java_servers_by_id: dict[str, JavaServer] = {}
+
+    def reload_servers() -> dict[str, dict[str, bool]]:
+        java_servers = java_server_api.get_java_servers()
+        java_servers_by_id.clear()
+        java_servers_by_id.update(
+            (java_server.id, java_server) for java_server in java_servers
+        )
+        return {
+            "java": {
+                java_server.id: java_server.is_important for java_server in java_servers
+            },
+        }
+
+    logger.info("Started")
+    try:
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+            def sweep_due_servers(
+                server_ids_by_edition: dict[str, list[str]],
+            ) -> dict[str, list[bool]]:
+                ping_records = sweep_java_servers(
+                    executor=executor,
+                    java_ping_api=java_ping_api,
+                    java_ping_record_api=java_ping_record_api,
+                    java_servers=[
+                        java_servers_by_id[server_id]
+                        for server_id in server_ids_by_edition["java"]
+                    ],
+                    timeout=config.timeout,
+                )
+                return {
+                    "java": [
+                        ping_record is None
+                        or ping_record.is_timeout
+                        or ping_record.is_refused
+                        for ping_record in ping_records
+                    ],
+                }
+
+            run_update_loop(
+                stop_event=stop_event,
+                editions=["java"],
+                ping_schedule_config=PingScheduleConfig(
+                    interval=config.interval,
+                    important_interval=config.important_interval,
+                    max_backoff_interval=config.max_backoff_interval,
+                    jitter=config.jitter,
+                ),
+                ping_record_partition_api=ping_record_partition_api,
+                partitioned_tables=JAVA_PING_RECORD_PARTITIONED_TABLES,
+                dns_resolver_api=dns_resolver_api,
+                reload_servers=reload_servers,
+                sweep=sweep_due_servers,
+                logger=logger,
+            )
+    finally:
+        engine.dispose()
+
+    logger.info("Stopped")
 
 
 def main() -> None:
@@ -116,11 +348,63 @@ def main() -> None:
         type=int,
         default=os.environ.get("MCPING_JAVA_UPDATER_INTERVAL", "300"),
     )
+    parser.add_argument(
+        "--important_interval",
+        type=int,
+        default=os.environ.get("MCPING_JAVA_UPDATER_IMPORTANT_INTERVAL", "60"),
+        help="Interval for the servers flagged as important",
+    )
+    parser.add_argument(
+        "--max_backoff_interval",
+        type=int,
+        default=os.environ.get("MCPING_JAVA_UPDATER_MAX_BACKOFF_INTERVAL", "3600"),
+        help="Upper bound of the interval for the servers failing consecutively",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=os.environ.get("MCPING_JAVA_UPDATER_JITTER", "0.1"),
+        help="Ratio of the interval to randomize",
+    )
+    parser.add_argument(
+        "--dns_min_ttl",
+        type=int,
+        default=os.environ.get("MCPING_JAVA_UPDATER_DNS_MIN_TTL", "60"),
+        help="Lower bound of the seconds to cache a DNS resolution",
+    )
+    parser.add_argument(
+        "--dns_max_ttl",
+        type=int,
+        default=os.environ.get("MCPING_JAVA_UPDATER_DNS_MAX_TTL", "3600"),
+        help="Upper bound of the seconds to cache a DNS resolution",
+    )
+    parser.add_argument(
+        "--dns_negative_ttl",
+        type=int,
+        default=os.environ.get("MCPING_JAVA_UPDATER_DNS_NEGATIVE_TTL", "300"),
+        help="Seconds to cache a host name which does not exist",
+    )
     parser.add_argument(
         "--timeout",
         type=float,
         default=os.environ.get("MCPING_JAVA_UPDATER_TIMEOUT", "3"),
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=os.environ.get("MCPING_JAVA_UPDATER_CONCURRENCY", "16"),
+    )
+    parser.add_argument(
+        "--metrics_host",
+        type=str,
+        default=os.environ.get("MCPING_JAVA_UPDATER_METRICS_HOST", "0.0.0.0"),
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=os.environ.get("MCPING_JAVA_UPDATER_METRICS_PORT"),
+        help="Port to serve the Prometheus metrics in the loop (disabled if unset)",
+    )
     parser.add_argument(
         "-l",
         "--loop",
@@ -146,7 +430,16 @@ def main() -> None:
     log_file: str | None = args.log_file
     database_url: str = args.database_url
     interval: int = args.interval
+    important_interval: int = args.important_interval
+    max_backoff_interval: int = args.max_backoff_interval
+    jitter: float = args.jitter
+    dns_min_ttl: int = args.dns_min_ttl
+    dns_max_ttl: int = args.dns_max_ttl
+    dns_negative_ttl: int = args.dns_negative_ttl
     timeout: float = args.timeout
+    concurrency: int = args.concurrency
+    metrics_host: str = args.metrics_host
+    metrics_port: int | None = args.metrics_port
     loop: bool = args.loop
 
     logging.basicConfig(
@@ -157,7 +450,16 @@ def main() -> None:
     config = JavaUpdaterConfig(
         database_url=database_url,
         interval=interval,
+        important_interval=important_interval,
+        max_backoff_interval=max_backoff_interval,
+        jitter=jitter,
+        dns_min_ttl=dns_min_ttl,
+        dns_max_ttl=dns_max_ttl,
+        dns_negative_ttl=dns_negative_ttl,
         timeout=timeout,
+        concurrency=concurrency,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
     )
 
     if loop:
@@ -1,9 +1,38 @@
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import Any
+from uuid import uuid4
 
 from pydantic import BaseModel
-from sqlalchemy import create_engine
+from sqlalchemy import Connection, Engine, Row
 from sqlalchemy.sql import text as sql_text
 
+from ..util.metrics_utility import observe_database_query_duration
+from .bedrock_ping_record_rollup_repository import upsert_bedrock_ping_record_rollups
+from .ping_record_partition_repository import get_month_start
+
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+# NOTIFY channel of the created ping records. The payload is the bedrock_server_id.
+BEDROCK_PING_RECORD_CREATED_CHANNEL = "bedrock_ping_record_created"
+
+
+class CreateBedrockPingRecord(BaseModel):
+    bedrock_server_id: str
+    timeout: float
+    is_timeout: bool
+    is_refused: bool
+    version_protocol: int | None
+    version_brand: str | None
+    version_version: str | None
+    latency: float | None
+    players_online: int | None
+    players_max: int | None
+    motd: str | None
+    map: str | None
+    gamemode: str | None
+
 
 class BedrockPingRecord(BaseModel):
     id: str
@@ -24,13 +53,56 @@ class BedrockPingRecord(BaseModel):
     updated_at: str
 
 
+# A ping record as plain values in the same shape as BedrockPingRecord, which the
+# Web API encodes with orjson without building the models. The timestamps are kept
+# as datetimes, which orjson writes in the same format as isoformat().
+BedrockPingRecordDict = dict[str, Any]
+
+
+def build_bedrock_ping_record_dicts(
+    rows: Sequence[Row[Any]],
+) -> list[BedrockPingRecordDict]:
+    return [
+        {
+            "id": row[0],
+            "bedrock_server_id": row[1],
+            "timeout": row[2],
+            "is_timeout": row[3],
+            "is_refused": row[4],
+            "version_protocol": row[5],
+            "version_brand": row[6],
+            "version_version": row[7],
+            "latency": row[8],
+            "players_online": row[9],
+            "players_max": row[10],
+            "motd": row[11],
+            "map": row[12],
+            "gamemode": row[13],
+            "created_at": row[14],
+            "updated_at": row[15],
+        }
+        for row in rows
+    ]
+
+
 class BedrockPingRecordRepository(ABC):
     @abstractmethod
-    def get_latest_bedrock_ping_record(
+    def get_latest_bedrock_ping_record_dicts(
         self,
         bedrock_server_id: str,
         count: int,
-    ) -> list[BedrockPingRecord]: ...
+    ) -> list[BedrockPingRecordDict]: ...
+
+    @abstractmethod
+    def get_bedrock_ping_records_in_range_dicts(
+        self,
+        bedrock_server_id: str,
+        since: datetime,
+        until: datetime,
+        after_created_at: datetime | None,
+        after_id: str | None,
+        count: int,
+    ) -> list[BedrockPingRecordDict]: ...
 
     @abstractmethod
     def create_bedrock_ping_record(
@@ -50,30 +122,145 @@ class BedrockPingRecordRepository(ABC):
         gamemode: str | None,
     ) -> BedrockPingRecord: ...
 
+    @abstractmethod
+    def create_bedrock_ping_records(
+        self,
+        ping_records: list[CreateBedrockPingRecord],
+    ) -> list[BedrockPingRecord]:
+        """
+        Create the records in one transaction. The records of the servers which no
+        longer exist are skipped and not returned.
+        """
+        ...
+
+    @abstractmethod
+    def delete_bedrock_ping_records_created_before(
+        self,
+        created_before: datetime,
+        count: int,
+    ) -> int: ...
+
 
 class BedrockPingRecordRepositoryImpl(BedrockPingRecordRepository):
-    def __init__(self, database_url: str):
-        self.engine = create_engine(url=database_url)
+    def __init__(self, engine: Engine):
+        self.engine = engine
 
-    def get_latest_bedrock_ping_record(
+    @observe_database_query_duration
+    def get_latest_bedrock_ping_record_dicts(
         self,
         bedrock_server_id: str,
         count: int,
-    ) -> list[BedrockPingRecord]:
+    ) -> list[BedrockPingRecordDict]:
+        # Look in the partition of the current month first, and in the older
+        # partitions only when it has fewer than "count" records of the server.
+        month_start = get_month_start(datetime.now(UTC))
+
+        with self.engine.connect() as conn:
+            rows = list(
+                self._select_latest_bedrock_ping_record_rows(
+                    conn=conn,
+                    bedrock_server_id=bedrock_server_id,
+                    created_since=month_start,
+                    created_before=None,
+                    count=count,
+                )
+            )
+            if len(rows) < count:
+                rows.extend(
+                    self._select_latest_bedrock_ping_record_rows(
+                        conn=conn,
+                        bedrock_server_id=bedrock_server_id,
+                        created_since=None,
+                        created_before=month_start,
+                        count=count - len(rows),
+                    )
+                )
+
+            return build_bedrock_ping_record_dicts(rows=rows)
+
+    def _select_latest_bedrock_ping_record_rows(
+        self,
+        conn: Connection,
+        bedrock_server_id: str,
+        created_since: datetime | None,
+        created_before: datetime | None,
+        count: int,
+    ) -> Sequence[Row[Any]]:
+        # A NULL bound folds to TRUE when planning, and a given bound prunes the
+        # partitions out of it.
+        return conn.execute(
+            sql_text(
+                """
+                    SELECT
+                        CAST("id" AS TEXT),
+                        CAST("bedrock_server_id" AS TEXT),
+                        CAST("timeout" AS DOUBLE PRECISION),
+                        "is_timeout",
+                        "is_refused",
+                        "version_protocol",
+                        "version_brand",
+                        "version_version",
+                        CAST("latency" AS DOUBLE PRECISION),
+                        "players_online",
+                        "players_max",
+                        "motd",
+                        "map",
+                        "gamemode",
+                        "created_at",
+                        "updated_at"
+                    FROM "bedrock_ping_records"
+                    WHERE
+                        "bedrock_server_id" = :bedrock_server_id
+                        AND (
+                            CAST(:created_since AS TIMESTAMPTZ) IS NULL
+                            OR "created_at" >= :created_since
+                        )
+                        AND (
+                            CAST(:created_before AS TIMESTAMPTZ) IS NULL
+                            OR "created_at" < :created_before
+                        )
+                    ORDER BY "created_at" DESC
+                    LIMIT :count
+                """,
+            ),
+            parameters={
+                "bedrock_server_id": bedrock_server_id,
+                "created_since": created_since,
+                "created_before": created_before,
+                "count": count,
+            },
+        ).fetchall()
+
+    @observe_database_query_duration
+    def get_bedrock_ping_records_in_range_dicts(
+        self,
+        bedrock_server_id: str,
+        since: datetime,
+        until: datetime,
+        after_created_at: datetime | None,
+        after_id: str | None,
+        count: int,
+    ) -> list[BedrockPingRecordDict]:
+        # Keyset pagination: continue from the last (created_at, id) of the previous
+        # page. The first page starts from "since" with the smallest UUID.
+        if after_created_at is None or after_id is None:
+            after_created_at = since
+            after_id = NIL_UUID
+
         with self.engine.connect() as conn:
             rows = conn.execute(
                 sql_text(
                     """
                         SELECT
-                            "id",
-                            "bedrock_server_id",
-                            "timeout",
+                            CAST("id" AS TEXT),
+                            CAST("bedrock_server_id" AS TEXT),
+                            CAST("timeout" AS DOUBLE PRECISION),
                             "is_timeout",
                             "is_refused",
                             "version_protocol",
                             "version_brand",
                             "version_version",
-                            "latency",
+                            CAST("latency" AS DOUBLE PRECISION),
                             "players_online",
                             "players_max",
                             "motd",
@@ -84,38 +271,29 @@ class BedrockPingRecordRepositoryImpl(BedrockPingRecordRepository):
                         FROM "bedrock_ping_records"
                         WHERE
                             "bedrock_server_id" = :bedrock_server_id
-                        ORDER BY "created_at" DESC
+                            AND "created_at" >= :since
+                            AND "created_at" < :until
+                            AND ("created_at", "id") > (
+                                :after_created_at,
+                                CAST(:after_id AS UUID)
+                            )
+                        ORDER BY "created_at" ASC, "id" ASC
                         LIMIT :count
                     """,
                 ),
                 parameters={
                     "bedrock_server_id": bedrock_server_id,
+                    "since": since,
+                    "until": until,
+                    "after_created_at": after_created_at,
+                    "after_id": after_id,
                     "count": count,
                 },
             ).fetchall()
 
-            return [
-                BedrockPingRecord(
-                    id=str(row[0]),
-                    bedrock_server_id=str(row[1]),
-                    timeout=row[2],
-                    is_timeout=row[3],
-                    is_refused=row[4],
-                    version_protocol=row[5],
-                    version_brand=row[6],
-                    version_version=row[7],
-                    latency=row[8],
-                    players_online=row[9],
-                    players_max=row[10],
-                    motd=row[11],
-                    map=row[12],
-                    gamemode=row[13],
-                    created_at=row[14].isoformat(),
-                    updated_at=row[15].isoformat(),
-                )
-                for row in rows
-            ]
+            return build_bedrock_ping_record_dicts(rows=rows)
 
+    @observe_database_query_duration
     def create_bedrock_ping_record(
         self,
         bedrock_server_id: str,
@@ -132,12 +310,60 @@ class BedrockPingRecordRepositoryImpl(BedrockPingRecordRepository):
         map: str | None,
         gamemode: str | None,
     ) -> BedrockPingRecord:
+        ping_records = self._insert_bedrock_ping_records(
+            ping_records=[
+                CreateBedrockPingRecord(
+                    bedrock_server_id=bedrock_server_id,
+                    timeout=timeout,
+                    is_timeout=is_timeout,
+                    is_refused=is_refused,
+                    version_protocol=version_protocol,
+                    version_brand=version_brand,
+                    version_version=version_version,
+                    latency=latency,
+                    players_online=players_online,
+                    players_max=players_max,
+                    motd=motd,
+                    map=map,
+                    gamemode=gamemode,
+                ),
+            ],
+        )
+        if len(ping_records) == 0:
+            raise Exception("Failed to create a record of bedrock_ping_records")
+
+        return ping_records[0]
+
+    @observe_database_query_duration
+    def create_bedrock_ping_records(
+        self,
+        ping_records: list[CreateBedrockPingRecord],
+    ) -> list[BedrockPingRecord]:
+        return self._insert_bedrock_ping_records(ping_records=ping_records)
+
+    # Not observed itself, so that a single record is counted only once by
+    # create_bedrock_ping_record
+    def _insert_bedrock_ping_records(
+        self,
+        ping_records: list[CreateBedrockPingRecord],
+    ) -> list[BedrockPingRecord]:
+        if len(ping_records) == 0:
+            return []
+
+        # Generate IDs here to map the returned rows to the inputs
+        ping_record_ids = [str(uuid4()) for _ in ping_records]
+
         with self.engine.connect() as conn:
             with conn.begin():
-                row = conn.execute(
+                # Insert all the records with one statement by passing each column
+                # as an array. The records of the servers deleted since the sweep
+                # started are dropped, instead of failing the whole batch on the
+                # foreign key.
+                rows = conn.execute(
                     sql_text(
                         """
                             INSERT INTO "bedrock_ping_records"(
+                                "id",
                                 "bedrock_server_id",
                                 "timeout",
                                 "is_timeout",
@@ -151,58 +377,181 @@ class BedrockPingRecordRepositoryImpl(BedrockPingRecordRepository):
                                 "motd",
                                 "map",
                                 "gamemode"
-                            ) VALUES(
-                                :bedrock_server_id,
-                                :timeout,
-                                :is_timeout,
-                                :is_refused,
-                                :version_protocol,
-                                :version_brand,
-                                :version_version,
-                                :latency,
-                                :players_online,
-                                :players_max,
-                                :motd,
-                                :map,
-                                :gamemode
-                            ) RETURNING "id", "created_at", "updated_at"
+                            )
+                            SELECT "input".*
+                            FROM unnest(
+                                CAST(:id AS UUID[]),
+                                CAST(:bedrock_server_id AS UUID[]),
+                                CAST(:timeout AS NUMERIC[]),
+                                CAST(:is_timeout AS BOOLEAN[]),
+                                CAST(:is_refused AS BOOLEAN[]),
+                                CAST(:version_protocol AS INTEGER[]),
+                                CAST(:version_brand AS TEXT[]),
+                                CAST(:version_version AS TEXT[]),
+                                CAST(:latency AS NUMERIC[]),
+                                CAST(:players_online AS INTEGER[]),
+                                CAST(:players_max AS INTEGER[]),
+                                CAST(:motd AS TEXT[]),
+                                CAST(:map AS TEXT[]),
+                                CAST(:gamemode AS TEXT[])
+                            ) AS "input"(
+                                "id",
+                                "bedrock_server_id",
+                                "timeout",
+                                "is_timeout",
+                                "is_refused",
+                                "version_protocol",
+                                "version_brand",
+                                "version_version",
+                                "latency",
+                                "players_online",
+                                "players_max",
+                                "motd",
+                                "map",
+                                "gamemode"
+                            )
+                            INNER JOIN "bedrock_servers"
+                                ON "bedrock_servers"."id" = "input"."bedrock_server_id"
+                            RETURNING "id", "created_at", "updated_at"
                         """,
                     ),
                     parameters={
-                        "bedrock_server_id": bedrock_server_id,
-                        "timeout": timeout,
-                        "is_timeout": is_timeout,
-                        "is_refused": is_refused,
-                        "version_protocol": version_protocol,
-                        "version_brand": version_brand,
-                        "version_version": version_version,
-                        "latency": latency,
-                        "players_online": players_online,
-                        "players_max": players_max,
-                        "motd": motd,
-                        "map": map,
-                        "gamemode": gamemode,
+                        "id": ping_record_ids,
+                        "bedrock_server_id": [
+                            ping_record.bedrock_server_id
+                            for ping_record in ping_records
+                        ],
+                        "timeout": [
+                            ping_record.timeout for ping_record in ping_records
+                        ],
+                        "is_timeout": [
+                            ping_record.is_timeout for ping_record in ping_records
+                        ],
+                        "is_refused": [
+                            ping_record.is_refused for ping_record in ping_records
+                        ],
+                        "version_protocol": [
+                            ping_record.version_protocol for ping_record in ping_records
+                        ],
+                        "version_brand": [
+                            ping_record.version_brand for ping_record in ping_records
+                        ],
+                        "version_version": [
+                            ping_record.version_version for ping_record in ping_records
+                        ],
+                        "latency": [
+                            ping_record.latency for ping_record in ping_records
+                        ],
+                        "players_online": [
+                            ping_record.players_online for ping_record in ping_records
+                        ],
+                        "players_max": [
+                            ping_record.players_max for ping_record in ping_records
+                        ],
+                        "motd": [ping_record.motd for ping_record in ping_records],
+                        "map": [ping_record.map for ping_record in ping_records],
+                        "gamemode": [
+                            ping_record.gamemode for ping_record in ping_records
+                        ],
                     },
-                ).fetchone()
+                ).fetchall()
 
-                if row is None:
-                    raise Exception("Failed to create a record of bedrock_ping_records")
+                row_by_id = {str(row[0]): row for row in rows}
 
-                return BedrockPingRecord(
-                    id=str(row[0]),
-                    bedrock_server_id=bedrock_server_id,
-                    timeout=timeout,
-                    is_timeout=is_timeout,
-                    is_refused=is_refused,
-                    version_protocol=version_protocol,
-                    version_brand=version_brand,
-                    version_version=version_version,
-                    latency=latency,
-                    players_online=players_online,
-                    players_max=players_max,
-                    motd=motd,
-                    map=map,
-                    gamemode=gamemode,
-                    created_at=row[1].isoformat(),
-                    updated_at=row[2].isoformat(),
+                upsert_bedrock_ping_record_rollups(
+                    conn=conn,
+                    bedrock_ping_record_ids=[
+                        ping_record_id
+                        for ping_record_id in ping_record_ids
+                        if ping_record_id in row_by_id
+                    ],
+                    bedrock_ping_record_created_ats=[
+                        row_by_id[ping_record_id][1]
+                        for ping_record_id in ping_record_ids
+                        if ping_record_id in row_by_id
+                    ],
+                )
+
+                # Delivered to the listeners when the transaction commits
+                conn.execute(
+                    sql_text(
+                        """
+                            SELECT pg_notify(:channel, "bedrock_server_id")
+                            FROM unnest(CAST(:bedrock_server_ids AS TEXT[]))
+                                AS "bedrock_server_id"
+                        """,
+                    ),
+                    parameters={
+                        "channel": BEDROCK_PING_RECORD_CREATED_CHANNEL,
+                        "bedrock_server_ids": sorted(
+                            {
+                                ping_record.bedrock_server_id
+                                for ping_record_id, ping_record in zip(
+                                    ping_record_ids, ping_records, strict=True
+                                )
+                                if ping_record_id in row_by_id
+                            }
+                        ),
+                    },
                 )
+
+                return [
+                    BedrockPingRecord(
+                        id=ping_record_id,
+                        bedrock_server_id=ping_record.bedrock_server_id,
+                        timeout=ping_record.timeout,
+                        is_timeout=ping_record.is_timeout,
+                        is_refused=ping_record.is_refused,
+                        version_protocol=ping_record.version_protocol,
+                        version_brand=ping_record.version_brand,
+                        version_version=ping_record.version_version,
+                        latency=ping_record.latency,
+                        players_online=ping_record.players_online,
+                        players_max=ping_record.players_max,
+                        motd=ping_record.motd,
+                        map=ping_record.map,
+                        gamemode=ping_record.gamemode,
+                        created_at=row_by_id[ping_record_id][1].isoformat(),
+                        updated_at=row_by_id[ping_record_id][2].isoformat(),
+                    )
+                    for ping_record_id, ping_record in zip(
+                        ping_record_ids, ping_records, strict=True
+                    )
+                    # Skip the records of the deleted servers
+                    if ping_record_id in row_by_id
+                ]
+
+    @observe_database_query_duration
+    def delete_bedrock_ping_records_created_before(
+        self,
+        created_before: datetime,
+        count: int,
+    ) -> int:
+        # Delete the oldest records up to "count" to keep the transaction short.
+        # The outer "created_at" bound lets the planner skip the newer partitions.
+        with self.engine.connect() as conn:
+            with conn.begin():
+                result = conn.execute(
+                    sql_text(
+                        """
+                            DELETE FROM "bedrock_ping_records"
+                            WHERE
+                                "created_at" < :created_before
+                                AND ("id", "created_at") IN (
+                                    SELECT "id", "created_at"
+                                    FROM "bedrock_ping_records"
+                                    WHERE
+                                        "created_at" < :created_before
+                                    ORDER BY "created_at" ASC
+                                    LIMIT :count
+                                )
+                        """,
+                    ),
+                    parameters={
+                        "created_before": created_before,
+                        "count": count,
+                    },
+                )
+
+                deleted_count: int = result.rowcount
+                return deleted_count
@@ -0,0 +1,230 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+from sqlalchemy import Connection, Engine
+from sqlalchemy.sql import text as sql_text
+
+from ..util.metrics_utility import observe_database_query_duration
+
+BedrockPingRecordRollupGranularity = Literal["hour", "day"]
+
+
+class BedrockPingRecordRollup(BaseModel):
+    bedrock_server_id: str
+    granularity: BedrockPingRecordRollupGranularity
+    bucket_start: str
+    ping_count: int
+    success_count: int
+    timeout_count: int
+    refused_count: int
+    uptime_ratio: float
+    latency_min: float | None
+    latency_avg: float | None
+    latency_max: float | None
+    players_online_min: int | None
+    players_online_avg: float | None
+    players_online_max: int | None
+
+
+def upsert_bedrock_ping_record_rollups(
+    conn: Connection,
+    bedrock_ping_record_ids: list[str],
+    bedrock_ping_record_created_ats: list[datetime],
+) -> None:
+    """
+    Add the given ping records to the hourly and daily rollups.
+
+    Call this in the transaction inserting the records, so that each record is
+    counted exactly once. The "created_at" of the records bound the scan to their
+    partitions.
+    """
+    if len(bedrock_ping_record_ids) == 0:
+        return
+
+    conn.execute(
+        sql_text(
+            """
+                INSERT INTO "bedrock_ping_record_rollups"(
+                    "bedrock_server_id",
+                    "granularity",
+                    "bucket_start",
+                    "ping_count",
+                    "success_count",
+                    "timeout_count",
+                    "refused_count",
+                    "latency_min",
+                    "latency_max",
+                    "latency_sum",
+                    "latency_count",
+                    "players_online_min",
+                    "players_online_max",
+                    "players_online_sum",
+                    "players_online_count"
+                )
+                SELECT
+                    "bedrock_server_id",
+                    "granularity",
+                    date_trunc("granularity", "created_at", 'UTC'),
+                    COUNT(*),
+                    COUNT(*) FILTER (
+                        WHERE NOT "is_timeout" AND NOT COALESCE("is_refused", FALSE)
+                    ),
+                    COUNT(*) FILTER (WHERE "is_timeout"),
+                    COUNT(*) FILTER (WHERE COALESCE("is_refused", FALSE)),
+                    MIN("latency"),
+                    MAX("latency"),
+                    COALESCE(SUM("latency"), 0),
+                    COUNT("latency"),
+                    MIN("players_online"),
+                    MAX("players_online"),
+                    COALESCE(SUM("players_online"), 0),
+                    COUNT("players_online")
+                FROM "bedrock_ping_records"
+                CROSS JOIN unnest(ARRAY['hour', 'day']) AS "granularity"
+                WHERE
+                    "id" = ANY(CAST(:bedrock_ping_record_ids AS UUID[]))
+                    AND "created_at" >= :created_at_min
+                    AND "created_at" <= :created_at_max
+                GROUP BY 1, 2, 3
+                ON CONFLICT ("bedrock_server_id", "granularity", "bucket_start")
+                DO UPDATE SET
+                    "ping_count" = (
+                        "bedrock_ping_record_rollups"."ping_count"
+                        + EXCLUDED."ping_count"
+                    ),
+                    "success_count" = (
+                        "bedrock_ping_record_rollups"."success_count"
+                        + EXCLUDED."success_count"
+                    ),
+                    "timeout_count" = (
+                        "bedrock_ping_record_rollups"."timeout_count"
+                        + EXCLUDED."timeout_count"
+                    ),
+                    "refused_count" = (
+                        "bedrock_ping_record_rollups"."refused_count"
+                        + EXCLUDED."refused_count"
+                    ),
+                    "latency_min" = LEAST(
+                        "bedrock_ping_record_rollups"."latency_min",
+                        EXCLUDED."latency_min"
+                    ),
+                    "latency_max" = GREATEST(
+                        "bedrock_ping_record_rollups"."latency_max",
+                        EXCLUDED."latency_max"
+                    ),
+                    "latency_sum" = (
+                        "bedrock_ping_record_rollups"."latency_sum"
+                        + EXCLUDED."latency_sum"
+                    ),
+                    "latency_count" = (
+                        "bedrock_ping_record_rollups"."latency_count"
+                        + EXCLUDED."latency_count"
+                    ),
+                    "players_online_min" = LEAST(
+                        "bedrock_ping_record_rollups"."players_online_min",
+                        EXCLUDED."players_online_min"
+                    ),
+                    "players_online_max" = GREATEST(
+                        "bedrock_ping_record_rollups"."players_online_max",
+                        EXCLUDED."players_online_max"
+                    ),
+                    "players_online_sum" = (
+                        "bedrock_ping_record_rollups"."players_online_sum"
+                        + EXCLUDED."players_online_sum"
+                    ),
+                    "players_online_count" = (
+                        "bedrock_ping_record_rollups"."players_online_count"
+                        + EXCLUDED."players_online_count"
+                    )
+            """,
+        ),
+        parameters={
+            "bedrock_ping_record_ids": bedrock_ping_record_ids,
+            "created_at_min": min(bedrock_ping_record_created_ats),
+            "created_at_max": max(bedrock_ping_record_created_ats),
+        },
+    )
+
+
+class BedrockPingRecordRollupRepository(ABC):
+    @abstractmethod
+    def get_bedrock_ping_record_rollups(
+        self,
+        bedrock_server_id: str,
+        granularity: BedrockPingRecordRollupGranularity,
+        since: datetime,
+        until: datetime,
+    ) -> list[BedrockPingRecordRollup]: ...
+
+
+class BedrockPingRecordRollupRepositoryImpl(BedrockPingRecordRollupRepository):
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @observe_database_query_duration
+    def get_bedrock_ping_record_rollups(
+        self,
+        bedrock_server_id: str,
+        granularity: BedrockPingRecordRollupGranularity,
+        since: datetime,
+        until: datetime,
+    ) -> list[BedrockPingRecordRollup]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            "bedrock_server_id",
+                            "granularity",
+                            "bucket_start",
+                            "ping_count",
+                            "success_count",
+                            "timeout_count",
+                            "refused_count",
+                            "latency_min",
+                            "latency_sum" / NULLIF("latency_count", 0),
+                            "latency_max",
+                            "players_online_min",
+                            (
+                                "players_online_sum"
+                                / NULLIF("players_online_count", 0)::NUMERIC
+                            ),
+                            "players_online_max"
+                        FROM "bedrock_ping_record_rollups"
+                        WHERE
+                            "bedrock_server_id" = :bedrock_server_id
+                            AND "granularity" = :granularity
+                            AND "bucket_start" >= :since
+                            AND "bucket_start" < :until
+                        ORDER BY "bucket_start" ASC
+                    """,
+                ),
+                parameters={
+                    "bedrock_server_id": bedrock_server_id,
+                    "granularity": granularity,
+                    "since": since,
+                    "until": until,
+                },
+            ).fetchall()
+
+            return [
+                BedrockPingRecordRollup(
+                    bedrock_server_id=str(row[0]),
+                    granularity=row[1],
+                    bucket_start=row[2].isoformat(),
+                    ping_count=row[3],
+                    success_count=row[4],
+                    timeout_count=row[5],
+                    refused_count=row[6],
+                    uptime_ratio=row[4] / row[3] if row[3] > 0 else 0.0,
+                    latency_min=row[7],
+                    latency_avg=row[8],
+                    latency_max=row[9],
+                    players_online_min=row[10],
+                    players_online_avg=row[11],
+                    players_online_max=row[12],
+                )
+                for row in rows
+            ]
@@ -3,6 +3,8 @@ from abc import ABC, abstractmethod
 from mcstatus import BedrockServer
 from pydantic import BaseModel
 
+from .dns_resolver_repository import DnsResolverRepository
+
 
 class BedrockPingTimeoutError(Exception):
     pass
@@ -30,9 +32,18 @@ class BedrockPingRepository(ABC):
 
 
 class BedrockPingRepositoryImpl(BedrockPingRepository):
+    def __init__(self, dns_resolver_api: DnsResolverRepository):
+        self.dns_resolver_api = dns_resolver_api
+
     def ping(self, host: str, port: int, timeout: float) -> BedrockPingResult:
         try:
-            server = BedrockServer.lookup(address=f"{host}:{port}", timeout=timeout)
+            resolve_result = self.dns_resolver_api.resolve(host=host, timeout=timeout)
+
+            server = BedrockServer(
+                host=resolve_result.address,
+                port=port,
+                timeout=timeout,
+            )
             response = server.status()
 
             return BedrockPingResult(
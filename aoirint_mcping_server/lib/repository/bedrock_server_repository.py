@@ -1,27 +1,39 @@
 from abc import ABC, abstractmethod
 
 from pydantic import BaseModel
-from sqlalchemy import create_engine
+from sqlalchemy import Engine
 from sqlalchemy.sql import text as sql_text
 
+from ..util.metrics_utility import observe_database_query_duration
+
 
 class BedrockServer(BaseModel):
     id: str
     name: str
     host: str
     port: int
+    is_important: bool
+
+
+class BedrockServerListVersion(BaseModel):
+    count: int
+    last_updated_at: str | None
 
 
 class BedrockServerRepository(ABC):
     @abstractmethod
     def get_bedrock_servers(self) -> list[BedrockServer]: ...
 
+    @abstractmethod
+    def get_bedrock_server_list_version(self) -> BedrockServerListVersion: ...
+
     @abstractmethod
     def create_bedrock_server(
         self,
         name: str,
         host: str,
         port: int,
+        is_important: bool,
     ) -> BedrockServer: ...
 
     @abstractmethod
@@ -31,6 +43,7 @@ class BedrockServerRepository(ABC):
         name: str,
         host: str,
         port: int,
+        is_important: bool | None,
     ) -> BedrockServer: ...
 
     @abstractmethod
@@ -41,9 +54,10 @@ class BedrockServerRepository(ABC):
 
 
 class BedrockServerRepositoryImpl(BedrockServerRepository):
-    def __init__(self, database_url: str):
-        self.engine = create_engine(url=database_url)
+    def __init__(self, engine: Engine):
+        self.engine = engine
 
+    @observe_database_query_duration
     def get_bedrock_servers(self) -> list[BedrockServer]:
         with self.engine.connect() as conn:
             rows = conn.execute(
@@ -53,7 +67,8 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                             "id",
                             "name",
                             "host",
-                            "port"
+                            "port",
+                            "is_important"
                         FROM "bedrock_servers"
                         ORDER BY "created_at" ASC
                     """,
@@ -66,15 +81,39 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                     name=row[1],
                     host=row[2],
                     port=row[3],
+                    is_important=row[4],
                 )
                 for row in rows
             ]
 
+    @observe_database_query_duration
+    def get_bedrock_server_list_version(self) -> BedrockServerListVersion:
+        with self.engine.connect() as conn:
+            # Every create and update advances the latest updated_at, and every
+            # delete decreases the count
+            row = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            COUNT(*),
+                            MAX("updated_at")
+                        FROM "bedrock_servers"
+                    """,
+                ),
+            ).one()
+
+            return BedrockServerListVersion(
+                count=row[0],
+                last_updated_at=row[1].isoformat() if row[1] is not None else None,
+            )
+
+    @observe_database_query_duration
     def create_bedrock_server(
         self,
         name: str,
         host: str,
         port: int,
+        is_important: bool,
     ) -> BedrockServer:
         with self.engine.connect() as conn:
             with conn.begin():
@@ -84,11 +123,13 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                             INSERT INTO "bedrock_servers"(
                                 "name",
                                 "host",
-                                "port"
+                                "port",
+                                "is_important"
                             ) VALUES(
                                 :name,
                                 :host,
-                                :port
+                                :port,
+                                :is_important
                             ) RETURNING id
                         """,
                     ),
@@ -96,6 +137,7 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                         "name": name,
                         "host": host,
                         "port": port,
+                        "is_important": is_important,
                     },
                 ).fetchone()
 
@@ -107,14 +149,17 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                     name=name,
                     host=host,
                     port=port,
+                    is_important=is_important,
                 )
 
+    @observe_database_query_duration
     def update_bedrock_server(
         self,
         id: str,
         name: str,
         host: str,
         port: int,
+        is_important: bool | None,
     ) -> BedrockServer:
         with self.engine.connect() as conn:
             with conn.begin():
@@ -125,10 +170,14 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                             SET
                                 "name" = :name,
                                 "host" = :host,
-                                "port" = :port
+                                "port" = :port,
+                                "is_important" = COALESCE(
+                                    CAST(:is_important AS BOOLEAN),
+                                    "is_important"
+                                )
                             WHERE
                                 "id" = :id
-                            RETURNING "id"
+                            RETURNING "is_important"
                         """,
                     ),
                     parameters={
@@ -136,6 +185,7 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                         "name": name,
                         "host": host,
                         "port": port,
+                        "is_important": is_important,
                     },
                 ).fetchall()
 
@@ -147,8 +197,10 @@ class BedrockServerRepositoryImpl(BedrockServerRepository):
                     name=name,
                     host=host,
                     port=port,
+                    is_important=rows[0][0],
                 )
 
+    @observe_database_query_duration
     def delete_bedrock_server(
         self,
         id: str,
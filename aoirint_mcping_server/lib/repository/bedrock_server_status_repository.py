@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+
+from pydantic import BaseModel
+from sqlalchemy import Engine
+from sqlalchemy.sql import text as sql_text
+
+from ..util.metrics_utility import observe_database_query_duration
+from .bedrock_ping_record_repository import BedrockPingRecord
+from .bedrock_server_repository import BedrockServer
+
+
+class BedrockServerStatus(BaseModel):
+    server: BedrockServer
+    latest_ping_record: BedrockPingRecord | None
+
+
+class BedrockServerStatusRepository(ABC):
+    @abstractmethod
+    def get_bedrock_server_statuses(self) -> list[BedrockServerStatus]: ...
+
+
+class BedrockServerStatusRepositoryImpl(BedrockServerStatusRepository):
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @observe_database_query_duration
+    def get_bedrock_server_statuses(self) -> list[BedrockServerStatus]:
+        with self.engine.connect() as conn:
+            # One index probe per server for its latest record
+            rows = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            "bedrock_servers"."id",
+                            "bedrock_servers"."name",
+                            "bedrock_servers"."host",
+                            "bedrock_servers"."port",
+                            "bedrock_servers"."is_important",
+                            "latest_ping_record"."id",
+                            "latest_ping_record"."timeout",
+                            "latest_ping_record"."is_timeout",
+                            "latest_ping_record"."is_refused",
+                            "latest_ping_record"."version_protocol",
+                            "latest_ping_record"."version_brand",
+                            "latest_ping_record"."version_version",
+                            "latest_ping_record"."latency",
+                            "latest_ping_record"."players_online",
+                            "latest_ping_record"."players_max",
+                            "latest_ping_record"."motd",
+                            "latest_ping_record"."map",
+                            "latest_ping_record"."gamemode",
+                            "latest_ping_record"."created_at",
+                            "latest_ping_record"."updated_at"
+                        FROM "bedrock_servers"
+                        LEFT JOIN LATERAL (
+                            SELECT *
+                            FROM "bedrock_ping_records"
+                            WHERE
+                                "bedrock_ping_records"."bedrock_server_id"
+                                    = "bedrock_servers"."id"
+                            ORDER BY
+                                "bedrock_ping_records"."created_at" DESC,
+                                "bedrock_ping_records"."id" DESC
+                            LIMIT 1
+                        ) AS "latest_ping_record" ON TRUE
+                        ORDER BY "bedrock_servers"."created_at" ASC
+                    """,
+                ),
+            ).fetchall()
+
+            server_statuses: list[BedrockServerStatus] = []
+            for row in rows:
+                server = BedrockServer(
+                    id=str(row[0]),
+                    name=row[1],
+                    host=row[2],
+                    port=row[3],
+                    is_important=row[4],
+                )
+
+                latest_ping_record: BedrockPingRecord | None = None
+                if row[5] is not None:
+                    latest_ping_record = BedrockPingRecord(
+                        id=str(row[5]),
+                        bedrock_server_id=server.id,
+                        timeout=row[6],
+                        is_timeout=row[7],
+                        is_refused=row[8],
+                        version_protocol=row[9],
+                        version_brand=row[10],
+                        version_version=row[11],
+                        latency=row[12],
+                        players_online=row[13],
+                        players_max=row[14],
+                        motd=row[15],
+                        map=row[16],
+                        gamemode=row[17],
+                        created_at=row[18].isoformat(),
+                        updated_at=row[19].isoformat(),
+                    )
+
+                server_statuses.append(
+                    BedrockServerStatus(
+                        server=server,
+                        latest_ping_record=latest_ping_record,
+                    )
+                )
+
+            return server_statuses
@@ -0,0 +1,184 @@
+import ipaddress
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import dns.exception
+import dns.resolver
+from pydantic import BaseModel
+
+from ..util.metrics_utility import UPDATER_DNS_LOOKUPS
+
+
+class DnsResolveNotFoundError(Exception):
+    pass
+
+
+class DnsResolveResult(BaseModel):
+    address: str
+    ttl: float | None  # None when the source does not tell
+
+
+class DnsResolverStats(BaseModel):
+    hit_count: int
+    miss_count: int
+    negative_hit_count: int
+    entry_count: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookup_count = self.hit_count + self.negative_hit_count + self.miss_count
+        if lookup_count == 0:
+            return 0.0
+
+        return (self.hit_count + self.negative_hit_count) / lookup_count
+
+
+class DnsResolverRepository(ABC):
+    @abstractmethod
+    def resolve(self, host: str, timeout: float) -> DnsResolveResult:
+        """
+        Resolve a host name (or an IP address as is) into an IP address.
+
+        Raises DnsResolveNotFoundError when the name does not exist, and
+        TimeoutError when the resolution times out.
+        """
+        ...
+
+
+class DnsResolverRepositoryImpl(DnsResolverRepository):
+    def resolve(self, host: str, timeout: float) -> DnsResolveResult:
+        try:
+            return DnsResolveResult(address=str(ipaddress.ip_address(host)), ttl=None)
+        except ValueError:
+            pass
+
+        # False when DNS failed without telling that the name does not exist
+        is_not_found = False
+        # The A and AAAA queries share the timeout. A query started with no time
+        # left times out immediately.
+        deadline = time.monotonic() + timeout
+        try:
+            for rdtype in ("A", "AAAA"):
+                try:
+                    answer = dns.resolver.resolve(
+                        host,
+                        rdtype,
+                        lifetime=max(deadline - time.monotonic(), 0.0),
+                        search=True,
+                    )
+                except dns.resolver.NoAnswer:
+                    continue
+
+                if answer.rrset is None or len(answer.rrset) == 0:
+                    continue
+
+                return DnsResolveResult(
+                    address=answer.rrset[0].to_text(),
+                    ttl=answer.rrset.ttl,
+                )
+
+            is_not_found = True
+        except dns.resolver.NXDOMAIN:
+            is_not_found = True
+        except dns.resolver.NoNameservers:
+            pass
+        except dns.exception.Timeout as error:
+            raise TimeoutError(f"Timed out to resolve {host}") from error
+
+        # Names only in the hosts file (e.g. localhost) are not in DNS
+        try:
+            address_infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except socket.gaierror as error:
+            if is_not_found:
+                raise DnsResolveNotFoundError(f"Failed to resolve {host}") from error
+            raise
+
+        return DnsResolveResult(address=str(address_infos[0][4][0]), ttl=None)
+
+
+class CachedDnsResolverRepositoryImpl(DnsResolverRepository):
+    """
+    Cache the resolutions of another resolver, with the TTL of the records clamped
+    to [min_ttl, max_ttl] (min_ttl when unknown).
+
+    The names which do not exist are cached for negative_ttl. Timeouts are not
+    cached.
+    """
+
+    def __init__(
+        self,
+        resolver: DnsResolverRepository,
+        min_ttl: float,
+        max_ttl: float,
+        negative_ttl: float,
+        max_size: int = 4096,
+    ):
+        self.resolver = resolver
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+
+        # host -> (expires_at, result or None if not found)
+        self.entries: OrderedDict[str, tuple[float, DnsResolveResult | None]] = (
+            OrderedDict()
+        )
+        self.lock = threading.Lock()
+
+        self.hit_count = 0
+        self.miss_count = 0
+        self.negative_hit_count = 0
+
+    def resolve(self, host: str, timeout: float) -> DnsResolveResult:
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(host)
+            if entry is not None and now < entry[0]:
+                self.entries.move_to_end(host)
+                if entry[1] is None:
+                    self.negative_hit_count += 1
+                    UPDATER_DNS_LOOKUPS.labels(result="negative_hit").inc()
+                    raise DnsResolveNotFoundError(f"Failed to resolve {host} (cached)")
+
+                self.hit_count += 1
+                UPDATER_DNS_LOOKUPS.labels(result="hit").inc()
+                return entry[1]
+
+            self.miss_count += 1
+            UPDATER_DNS_LOOKUPS.labels(result="miss").inc()
+
+        try:
+            result = self.resolver.resolve(host=host, timeout=timeout)
+        except DnsResolveNotFoundError:
+            self.store(host=host, expires_at=now + self.negative_ttl, result=None)
+            raise
+
+        ttl = result.ttl if result.ttl is not None else self.min_ttl
+        ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+        self.store(host=host, expires_at=now + ttl, result=result)
+
+        return result
+
+    def store(
+        self,
+        host: str,
+        expires_at: float,
+        result: DnsResolveResult | None,
+    ) -> None:
+        with self.lock:
+            self.entries[host] = (expires_at, result)
+            self.entries.move_to_end(host)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get_stats(self) -> DnsResolverStats:
+        with self.lock:
+            return DnsResolverStats(
+                hit_count=self.hit_count,
+                miss_count=self.miss_count,
+                negative_hit_count=self.negative_hit_count,
+                entry_count=len(self.entries),
+            )
@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+
+from pydantic import BaseModel
+from sqlalchemy import Engine
+from sqlalchemy.sql import text as sql_text
+
+from ..util.metrics_utility import observe_database_query_duration
+
+
+class JavaFavicon(BaseModel):
+    hash: str
+    favicon: str  # Data URL
+
+
+class JavaFaviconRepository(ABC):
+    @abstractmethod
+    def get_latest_java_favicon_hash(
+        self,
+        java_server_id: str,
+    ) -> str | None: ...
+
+    @abstractmethod
+    def get_java_favicon(
+        self,
+        hash: str,
+    ) -> JavaFavicon | None: ...
+
+
+class JavaFaviconRepositoryImpl(JavaFaviconRepository):
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @observe_database_query_duration
+    def get_latest_java_favicon_hash(
+        self,
+        java_server_id: str,
+    ) -> str | None:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            "favicon_hash"
+                        FROM "java_server_latest_favicons"
+                        WHERE
+                            "java_server_id" = :java_server_id
+                    """,
+                ),
+                parameters={
+                    "java_server_id": java_server_id,
+                },
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            favicon_hash: str = row[0]
+            return favicon_hash
+
+    @observe_database_query_duration
+    def get_java_favicon(
+        self,
+        hash: str,
+    ) -> JavaFavicon | None:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            "hash",
+                            "favicon"
+                        FROM "java_favicons"
+                        WHERE
+                            "hash" = :hash
+                    """,
+                ),
+                parameters={
+                    "hash": hash,
+                },
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            return JavaFavicon(
+                hash=row[0],
+                favicon=row[1],
+            )
@@ -1,15 +1,44 @@
+import hashlib
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import Any
+from uuid import uuid4
 
 from pydantic import BaseModel
-from sqlalchemy import create_engine
+from sqlalchemy import Connection, Engine, Row
 from sqlalchemy.sql import text as sql_text
 
+from ..util.metrics_utility import observe_database_query_duration
+from .java_ping_record_rollup_repository import upsert_java_ping_record_rollups
+from .ping_record_partition_repository import get_month_start
+
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+# NOTIFY channel of the created ping records. The payload is the java_server_id.
+JAVA_PING_RECORD_CREATED_CHANNEL = "java_ping_record_created"
+
 
 class CreateJavaPingRecordJavaPingRecordPlayer(BaseModel):
     player_id: str
     name: str
 
 
+class CreateJavaPingRecord(BaseModel):
+    java_server_id: str
+    timeout: float
+    is_timeout: bool
+    is_refused: bool
+    version_protocol: int | None
+    version_name: str | None
+    latency: float | None
+    players_online: int | None
+    players_max: int | None
+    players_sample: list[CreateJavaPingRecordJavaPingRecordPlayer] | None
+    description: str | None
+    favicon: str | None  # Data URL
+
+
 class JavaPingRecordPlayer(BaseModel):
     id: str
     java_ping_record_id: str
@@ -31,17 +60,82 @@ class JavaPingRecord(BaseModel):
     players_sample: list[JavaPingRecordPlayer] | None
     description: str | None
     favicon: str | None  # Data URL
+    favicon_hash: str | None
     created_at: str
     updated_at: str
 
 
+def calculate_java_favicon_hash(favicon: str) -> str:
+    return hashlib.sha256(favicon.encode("utf-8")).hexdigest()
+
+
+# A ping record as plain values in the same shape as JavaPingRecord, which the Web
+# API encodes with orjson without building the models. The timestamps are kept as
+# datetimes, which orjson writes in the same format as isoformat().
+JavaPingRecordDict = dict[str, Any]
+
+
+def build_java_ping_record_dicts(
+    java_server_id: str,
+    ping_record_rows: Sequence[Row[Any]],
+    player_rows: Sequence[Row[Any]],
+) -> list[JavaPingRecordDict]:
+    players_by_ping_record_id: dict[str, list[dict[str, str]]] = {
+        ping_record_row[0]: [] for ping_record_row in ping_record_rows
+    }
+    for player_row in player_rows:
+        players_by_ping_record_id[player_row[1]].append(
+            {
+                "id": player_row[0],
+                "java_ping_record_id": player_row[1],
+                "player_id": player_row[2],
+                "name": player_row[3],
+            }
+        )
+
+    return [
+        {
+            "id": ping_record_row[0],
+            "java_server_id": java_server_id,
+            "timeout": ping_record_row[1],
+            "is_timeout": ping_record_row[2],
+            "is_refused": ping_record_row[3],
+            "version_protocol": ping_record_row[4],
+            "version_name": ping_record_row[5],
+            "latency": ping_record_row[6],
+            "players_online": ping_record_row[7],
+            "players_max": ping_record_row[8],
+            "players_sample": players_by_ping_record_id[ping_record_row[0]],
+            "description": ping_record_row[9],
+            "favicon": ping_record_row[10],
+            "favicon_hash": ping_record_row[13],
+            "created_at": ping_record_row[11],
+            "updated_at": ping_record_row[12],
+        }
+        for ping_record_row in ping_record_rows
+    ]
+
+
 class JavaPingRecordRepository(ABC):
     @abstractmethod
-    def get_latest_java_ping_record(
+    def get_latest_java_ping_record_dicts(
         self,
         java_server_id: str,
         count: int,
-    ) -> list[JavaPingRecord]: ...
+        include_favicon: bool,
+    ) -> list[JavaPingRecordDict]: ...
+
+    @abstractmethod
+    def get_java_ping_records_in_range_dicts(
+        self,
+        java_server_id: str,
+        since: datetime,
+        until: datetime,
+        after_created_at: datetime | None,
+        after_id: str | None,
+        count: int,
+        include_favicon: bool,
+    ) -> list[JavaPingRecordDict]: ...
 
     @abstractmethod
     def create_java_ping_record(
@@ -60,98 +154,247 @@ class JavaPingRecordRepository(ABC):
         favicon: str | None,
     ) -> JavaPingRecord: ...
 
+    @abstractmethod
+    def create_java_ping_records(
+        self,
+        ping_records: list[CreateJavaPingRecord],
+    ) -> list[JavaPingRecord]:
+        """
+        Create the records in one transaction. The records of the servers which no
+        longer exist are skipped and not returned.
+        """
+        ...
+
+    @abstractmethod
+    def delete_java_ping_records_created_before(
+        self,
+        created_before: datetime,
+        count: int,
+    ) -> int: ...
+
 
 class JavaPingRecordRepositoryImpl(JavaPingRecordRepository):
-    def __init__(self, database_url: str):
-        self.engine = create_engine(url=database_url)
+    def __init__(self, engine: Engine):
+        self.engine = engine
 
-    def get_latest_java_ping_record(
+    @observe_database_query_duration
+    def get_latest_java_ping_record_dicts(
         self,
         java_server_id: str,
         count: int,
-    ) -> list[JavaPingRecord]:
+        include_favicon: bool,
+    ) -> list[JavaPingRecordDict]:
+        # Look in the partition of the current month first, and in the older
+        # partitions only when it has fewer than "count" records of the server.
+        month_start = get_month_start(datetime.now(UTC))
+
+        with self.engine.connect() as conn:
+            ping_record_rows = list(
+                self._select_latest_java_ping_record_rows(
+                    conn=conn,
+                    java_server_id=java_server_id,
+                    created_since=month_start,
+                    created_before=None,
+                    count=count,
+                    include_favicon=include_favicon,
+                )
+            )
+            if len(ping_record_rows) < count:
+                ping_record_rows.extend(
+                    self._select_latest_java_ping_record_rows(
+                        conn=conn,
+                        java_server_id=java_server_id,
+                        created_since=None,
+                        created_before=month_start,
+                        count=count - len(ping_record_rows),
+                        include_favicon=include_favicon,
+                    )
+                )
+
+            return build_java_ping_record_dicts(
+                java_server_id=java_server_id,
+                ping_record_rows=ping_record_rows,
+                player_rows=self._select_java_ping_record_player_rows(
+                    conn=conn,
+                    ping_record_rows=ping_record_rows,
+                ),
+            )
+
+    def _select_latest_java_ping_record_rows(
+        self,
+        conn: Connection,
+        java_server_id: str,
+        created_since: datetime | None,
+        created_before: datetime | None,
+        count: int,
+        include_favicon: bool,
+    ) -> Sequence[Row[Any]]:
+        # A NULL bound folds to TRUE when planning, and a given bound prunes the
+        # partitions out of it.
+        return conn.execute(
+            sql_text(
+                """
+                    SELECT
+                        CAST("id" AS TEXT),
+                        CAST("timeout" AS DOUBLE PRECISION),
+                        "is_timeout",
+                        "is_refused",
+                        "version_protocol",
+                        "version_name",
+                        CAST("latency" AS DOUBLE PRECISION),
+                        "players_online",
+                        "players_max",
+                        "description",
+                        CASE WHEN :include_favicon THEN (
+                            SELECT "java_favicons"."favicon"
+                            FROM "java_favicons"
+                            WHERE
+                                "java_favicons"."hash"
+                                    = "java_ping_records"."favicon_hash"
+                        ) END,
+                        "created_at",
+                        "updated_at",
+                        "favicon_hash"
+                    FROM "java_ping_records"
+                    WHERE
+                        "java_server_id" = :java_server_id
+                        AND (
+                            CAST(:created_since AS TIMESTAMPTZ) IS NULL
+                            OR "created_at" >= :created_since
+                        )
+                        AND (
+                            CAST(:created_before AS TIMESTAMPTZ) IS NULL
+                            OR "created_at" < :created_before
+                        )
+                    ORDER BY "created_at" DESC
+                    LIMIT :count
+                """,
+            ),
+            parameters={
+                "java_server_id": java_server_id,
+                "created_since": created_since,
+                "created_before": created_before,
+                "count": count,
+                "include_favicon": include_favicon,
+            },
+        ).fetchall()
+
+    @observe_database_query_duration
+    def get_java_ping_records_in_range_dicts(
+        self,
+        java_server_id: str,
+        since: datetime,
+        until: datetime,
+        after_created_at: datetime | None,
+        after_id: str | None,
+        count: int,
+        include_favicon: bool,
+    ) -> list[JavaPingRecordDict]:
+        # Keyset pagination: continue from the last (created_at, id) of the previous
+        # page. The first page starts from "since" with the smallest UUID.
+        if after_created_at is None or after_id is None:
+            after_created_at = since
+            after_id = NIL_UUID
+
         with self.engine.connect() as conn:
             ping_record_rows = conn.execute(
                 sql_text(
                     """
                         SELECT
-                            "id",
-                            "timeout",
+                            CAST("id" AS TEXT),
+                            CAST("timeout" AS DOUBLE PRECISION),
                             "is_timeout",
                             "is_refused",
                             "version_protocol",
                             "version_name",
-                            "latency",
+                            CAST("latency" AS DOUBLE PRECISION),
                             "players_online",
                             "players_max",
                             "description",
-                            "favicon",
+                            CASE WHEN :include_favicon THEN (
+                                SELECT "java_favicons"."favicon"
+                                FROM "java_favicons"
+                                WHERE
+                                    "java_favicons"."hash"
+                                        = "java_ping_records"."favicon_hash"
+                            ) END,
                             "created_at",
-                            "updated_at"
+                            "updated_at",
+                            "favicon_hash"
                         FROM "java_ping_records"
                         WHERE
                             "java_server_id" = :java_server_id
-                        ORDER BY "created_at" DESC
+                            AND "created_at" >= :since
+                            AND "created_at" < :until
+                            AND ("created_at", "id") > (
+                                :after_created_at,
+                                CAST(:after_id AS UUID)
+                            )
+                        ORDER BY "created_at" ASC, "id" ASC
                         LIMIT :count
                     """,
                 ),
                 parameters={
                     "java_server_id": java_server_id,
+                    "since": since,
+                    "until": until,
+                    "after_created_at": after_created_at,
+                    "after_id": after_id,
                     "count": count,
+                    "include_favicon": include_favicon,
                 },
             ).fetchall()
 
-            ping_records: list[JavaPingRecord] = []
-            for ping_record_row in ping_record_rows:
-                ping_record_id = str(ping_record_row[0])
-
-                player_rows = conn.execute(
-                    sql_text(
-                        """
-                            SELECT
-                                "id",
-                                "player_id",
-                                "name"
-                            FROM "java_ping_record_players"
-                            WHERE
-                                "java_ping_record_id" = :java_ping_record_id
-                        """,
-                    ),
-                    parameters={
-                        "java_ping_record_id": ping_record_id,
-                    },
-                ).fetchall()
+            return build_java_ping_record_dicts(
+                java_server_id=java_server_id,
+                ping_record_rows=ping_record_rows,
+                player_rows=self._select_java_ping_record_player_rows(
+                    conn=conn,
+                    ping_record_rows=ping_record_rows,
+                ),
+            )
 
-                ping_records.append(
-                    JavaPingRecord(
-                        id=ping_record_id,
-                        java_server_id=java_server_id,
-                        timeout=ping_record_row[1],
-                        is_timeout=ping_record_row[2],
-                        is_refused=ping_record_row[3],
-                        version_protocol=ping_record_row[4],
-                        version_name=ping_record_row[5],
-                        latency=ping_record_row[6],
-                        players_online=ping_record_row[7],
-                        players_max=ping_record_row[8],
-                        players_sample=[
-                            JavaPingRecordPlayer(
-                                id=str(player_row[0]),
-                                java_ping_record_id=ping_record_id,
-                                player_id=player_row[1],
-                                name=player_row[2],
-                            )
-                            for player_row in player_rows
-                        ],
-                        description=ping_record_row[9],
-                        favicon=ping_record_row[10],
-                        created_at=ping_record_row[11].isoformat(),
-                        updated_at=ping_record_row[12].isoformat(),
-                    )
-                )
+    def _select_java_ping_record_player_rows(
+        self,
+        conn: Connection,
+        ping_record_rows: Sequence[Row[Any]],
+    ) -> Sequence[Row[Any]]:
+        # Fetch players of all the ping records at once to avoid N+1 queries.
+        # The "created_at" of the records bound the scan to their partitions.
+        if len(ping_record_rows) == 0:
+            return []
 
-            return ping_records
+        return conn.execute(
+            sql_text(
+                """
+                    SELECT
+                        CAST("id" AS TEXT),
+                        CAST("java_ping_record_id" AS TEXT),
+                        "player_id",
+                        "name"
+                    FROM "java_ping_record_players"
+                    WHERE
+                        "java_ping_record_id" = ANY(
+                            CAST(:java_ping_record_ids AS UUID[])
+                        )
+                        AND "java_ping_record_created_at" >= :created_at_min
+                        AND "java_ping_record_created_at" <= :created_at_max
+                """,
+            ),
+            parameters={
+                "java_ping_record_ids": [
+                    ping_record_row[0] for ping_record_row in ping_record_rows
+                ],
+                "created_at_min": min(
+                    ping_record_row[11] for ping_record_row in ping_record_rows
+                ),
+                "created_at_max": max(
+                    ping_record_row[11] for ping_record_row in ping_record_rows
+                ),
+            },
+        ).fetchall()
 
+    @observe_database_query_duration
     def create_java_ping_record(
         self,
         java_server_id: str,
@@ -167,12 +410,143 @@ class JavaPingRecordRepositoryImpl(JavaPingRecordRepository):
         description: str | None,
         favicon: str | None,
     ) -> JavaPingRecord:
+        ping_records = self._insert_java_ping_records(
+            ping_records=[
+                CreateJavaPingRecord(
+                    java_server_id=java_server_id,
+                    timeout=timeout,
+                    is_timeout=is_timeout,
+                    is_refused=is_refused,
+                    version_protocol=version_protocol,
+                    version_name=version_name,
+                    latency=latency,
+                    players_online=players_online,
+                    players_max=players_max,
+                    players_sample=players_sample,
+                    description=description,
+                    favicon=favicon,
+                ),
+            ],
+        )
+        if len(ping_records) == 0:
+            raise Exception("Failed to create a record of java_ping_records")
+
+        return ping_records[0]
+
+    @observe_database_query_duration
+    def create_java_ping_records(
+        self,
+        ping_records: list[CreateJavaPingRecord],
+    ) -> list[JavaPingRecord]:
+        return self._insert_java_ping_records(ping_records=ping_records)
+
+    # Not observed itself, so that a single record is counted only once by
+    # create_java_ping_record
+    def _insert_java_ping_records(
+        self,
+        ping_records: list[CreateJavaPingRecord],
+    ) -> list[JavaPingRecord]:
+        if len(ping_records) == 0:
+            return []
+
+        # Generate IDs here to map the returned rows to the inputs and to insert
+        # the players in the same way as the ping records
+        ping_record_ids = [str(uuid4()) for _ in ping_records]
+
+        players_sample_by_ping_record_id: dict[
+            str, list[JavaPingRecordPlayer] | None
+        ] = {}
+        for ping_record_id, ping_record in zip(
+            ping_record_ids, ping_records, strict=True
+        ):
+            if ping_record.players_sample is None:
+                players_sample_by_ping_record_id[ping_record_id] = None
+                continue
+
+            players_sample_by_ping_record_id[ping_record_id] = [
+                JavaPingRecordPlayer(
+                    id=str(uuid4()),
+                    java_ping_record_id=ping_record_id,
+                    player_id=player_sample.player_id,
+                    name=player_sample.name,
+                )
+                for player_sample in ping_record.players_sample
+            ]
+
+        players = [
+            player
+            for players_sample in players_sample_by_ping_record_id.values()
+            if players_sample is not None
+            for player in players_sample
+        ]
+
+        # Favicons rarely change, so they are stored once per content hash
+        favicon_hashes = [
+            calculate_java_favicon_hash(favicon=ping_record.favicon)
+            if ping_record.favicon is not None
+            else None
+            for ping_record in ping_records
+        ]
+        favicon_by_hash = {
+            favicon_hash: ping_record.favicon
+            for favicon_hash, ping_record in zip(
+                favicon_hashes, ping_records, strict=True
+            )
+            if favicon_hash is not None and ping_record.favicon is not None
+        }
+
         with self.engine.connect() as conn:
             with conn.begin():
-                ping_record_row = conn.execute(
+                if len(favicon_by_hash) > 0:
+                    existing_favicon_hash_rows = conn.execute(
+                        sql_text(
+                            """
+                                SELECT "hash"
+                                FROM "java_favicons"
+                                WHERE
+                                    "hash" = ANY(CAST(:hashes AS TEXT[]))
+                            """,
+                        ),
+                        parameters={
+                            "hashes": list(favicon_by_hash.keys()),
+                        },
+                    ).fetchall()
+
+                    # Send only the favicons not stored yet
+                    new_favicon_by_hash = dict(favicon_by_hash)
+                    for existing_favicon_hash_row in existing_favicon_hash_rows:
+                        new_favicon_by_hash.pop(existing_favicon_hash_row[0], None)
+
+                    if len(new_favicon_by_hash) > 0:
+                        conn.execute(
+                            sql_text(
+                                """
+                                    INSERT INTO "java_favicons"(
+                                        "hash",
+                                        "favicon"
+                                    )
+                                    SELECT * FROM unnest(
+                                        CAST(:hash AS TEXT[]),
+                                        CAST(:favicon AS TEXT[])
+                                    )
+                                    ON CONFLICT ("hash") DO NOTHING
+                                """,
+                            ),
+                            parameters={
+                                "hash": list(new_favicon_by_hash.keys()),
+                                "favicon": list(new_favicon_by_hash.values()),
+                            },
+                        )
+
+                # Insert all the records with one statement by passing each column
+                # as an array. The records of the servers deleted since the sweep
+                # started are dropped, instead of failing the whole batch on the
+                # foreign key.
+                ping_record_rows = conn.execute(
                     sql_text(
                         """
                             INSERT INTO "java_ping_records"(
+                                "id",
                                 "java_server_id",
                                 "timeout",
                                 "is_timeout",
@@ -183,96 +557,264 @@ class JavaPingRecordRepositoryImpl(JavaPingRecordRepository):
                                 "players_online",
                                 "players_max",
                                 "description",
-                                "favicon"
-                            ) VALUES(
-                                :java_server_id,
-                                :timeout,
-                                :is_timeout,
-                                :is_refused,
-                                :version_protocol,
-                                :version_name,
-                                :latency,
-                                :players_online,
-                                :players_max,
-                                :description,
-                                :favicon
-                            ) RETURNING "id", "created_at", "updated_at"
+                                "favicon_hash"
+                            )
+                            SELECT "input".*
+                            FROM unnest(
+                                CAST(:id AS UUID[]),
+                                CAST(:java_server_id AS UUID[]),
+                                CAST(:timeout AS NUMERIC[]),
+                                CAST(:is_timeout AS BOOLEAN[]),
+                                CAST(:is_refused AS BOOLEAN[]),
+                                CAST(:version_protocol AS INTEGER[]),
+                                CAST(:version_name AS TEXT[]),
+                                CAST(:latency AS NUMERIC[]),
+                                CAST(:players_online AS INTEGER[]),
+                                CAST(:players_max AS INTEGER[]),
+                                CAST(:description AS TEXT[]),
+                                CAST(:favicon_hash AS TEXT[])
+                            ) AS "input"(
+                                "id",
+                                "java_server_id",
+                                "timeout",
+                                "is_timeout",
+                                "is_refused",
+                                "version_protocol",
+                                "version_name",
+                                "latency",
+                                "players_online",
+                                "players_max",
+                                "description",
+                                "favicon_hash"
+                            )
+                            INNER JOIN "java_servers"
+                                ON "java_servers"."id" = "input"."java_server_id"
+                            RETURNING "id", "created_at", "updated_at"
                         """,
                     ),
                     parameters={
-                        "java_server_id": java_server_id,
-                        "timeout": timeout,
-                        "is_timeout": is_timeout,
-                        "is_refused": is_refused,
-                        "version_protocol": version_protocol,
-                        "version_name": version_name,
-                        "latency": latency,
-                        "players_online": players_online,
-                        "players_max": players_max,
-                        "description": description,
-                        "favicon": favicon,
+                        "id": ping_record_ids,
+                        "java_server_id": [
+                            ping_record.java_server_id for ping_record in ping_records
+                        ],
+                        "timeout": [
+                            ping_record.timeout for ping_record in ping_records
+                        ],
+                        "is_timeout": [
+                            ping_record.is_timeout for ping_record in ping_records
+                        ],
+                        "is_refused": [
+                            ping_record.is_refused for ping_record in ping_records
+                        ],
+                        "version_protocol": [
+                            ping_record.version_protocol for ping_record in ping_records
+                        ],
+                        "version_name": [
+                            ping_record.version_name for ping_record in ping_records
+                        ],
+                        "latency": [
+                            ping_record.latency for ping_record in ping_records
+                        ],
+                        "players_online": [
+                            ping_record.players_online for ping_record in ping_records
+                        ],
+                        "players_max": [
+                            ping_record.players_max for ping_record in ping_records
+                        ],
+                        "description": [
+                            ping_record.description for ping_record in ping_records
+                        ],
+                        "favicon_hash": favicon_hashes,
                     },
-                ).fetchone()
-
-                if ping_record_row is None:
-                    raise Exception("Failed to create a record of java_ping_records")
+                ).fetchall()
 
-                ping_record_id = str(ping_record_row[0])
+                ping_record_row_by_id = {
+                    str(ping_record_row[0]): ping_record_row
+                    for ping_record_row in ping_record_rows
+                }
+                created_ping_record_ids = [
+                    ping_record_id
+                    for ping_record_id in ping_record_ids
+                    if ping_record_id in ping_record_row_by_id
+                ]
+                players = [
+                    player
+                    for player in players
+                    if player.java_ping_record_id in ping_record_row_by_id
+                ]
 
-                ret_players_sample: list[JavaPingRecordPlayer] | None = None
-                if players_sample is not None:
-                    ret_players_sample = []
+                if len(players) > 0:
+                    conn.execute(
+                        sql_text(
+                            """
+                                INSERT INTO "java_ping_record_players"(
+                                    "id",
+                                    "java_ping_record_id",
+                                    "java_ping_record_created_at",
+                                    "player_id",
+                                    "name"
+                                )
+                                SELECT * FROM unnest(
+                                    CAST(:id AS UUID[]),
+                                    CAST(:java_ping_record_id AS UUID[]),
+                                    CAST(:java_ping_record_created_at AS TIMESTAMPTZ[]),
+                                    CAST(:player_id AS TEXT[]),
+                                    CAST(:name AS TEXT[])
+                                )
+                            """,
+                        ),
+                        parameters={
+                            "id": [player.id for player in players],
+                            "java_ping_record_id": [
+                                player.java_ping_record_id for player in players
+                            ],
+                            # The partition key of the players
+                            "java_ping_record_created_at": [
+                                ping_record_row_by_id[player.java_ping_record_id][1]
+                                for player in players
+                            ],
+                            "player_id": [player.player_id for player in players],
+                            "name": [player.name for player in players],
+                        },
+                    )
 
-                    for player_sample in players_sample:
-                        ping_record_player_row = conn.execute(
-                            sql_text(
-                                """
-                                    INSERT INTO "java_ping_record_players"(
-                                        "java_ping_record_id",
-                                        "player_id",
-                                        "name"
-                                    ) VALUES(
-                                        :java_ping_record_id,
-                                        :player_id,
-                                        :name
-                                    ) RETURNING id
-                                """,
+                # The latest favicon of each server, for the favicon endpoint. The
+                # row is not rewritten while the favicon stays the same.
+                latest_favicon_hash_by_java_server_id = {
+                    ping_record.java_server_id: favicon_hash
+                    for ping_record_id, ping_record, favicon_hash in zip(
+                        ping_record_ids, ping_records, favicon_hashes, strict=True
+                    )
+                    if ping_record_id in ping_record_row_by_id
+                    and favicon_hash is not None
+                }
+                if len(latest_favicon_hash_by_java_server_id) > 0:
+                    conn.execute(
+                        sql_text(
+                            """
+                                INSERT INTO "java_server_latest_favicons"(
+                                    "java_server_id",
+                                    "favicon_hash"
+                                )
+                                SELECT * FROM unnest(
+                                    CAST(:java_server_id AS UUID[]),
+                                    CAST(:favicon_hash AS TEXT[])
+                                )
+                                ON CONFLICT ("java_server_id") DO UPDATE SET
+                                    "favicon_hash" = EXCLUDED."favicon_hash"
+                                WHERE
+                                    "java_server_latest_favicons"."favicon_hash"
+                                        <> EXCLUDED."favicon_hash"
+                            """,
+                        ),
+                        parameters={
+                            "java_server_id": list(
+                                latest_favicon_hash_by_java_server_id.keys()
                             ),
-                            parameters={
-                                "java_ping_record_id": ping_record_id,
-                                "player_id": player_sample.player_id,
-                                "name": player_sample.name,
-                            },
-                        ).fetchone()
+                            "favicon_hash": list(
+                                latest_favicon_hash_by_java_server_id.values()
+                            ),
+                        },
+                    )
 
-                        if ping_record_player_row is None:
-                            raise Exception(
-                                "Failed to create a record of java_ping_record_players"
-                            )
+                upsert_java_ping_record_rollups(
+                    conn=conn,
+                    java_ping_record_ids=created_ping_record_ids,
+                    java_ping_record_created_ats=[
+                        ping_record_row_by_id[ping_record_id][1]
+                        for ping_record_id in created_ping_record_ids
+                    ],
+                )
 
-                        ret_players_sample.append(
-                            JavaPingRecordPlayer(
-                                id=str(ping_record_player_row[0]),
-                                java_ping_record_id=ping_record_id,
-                                player_id=player_sample.player_id,
-                                name=player_sample.name,
-                            )
+                # Delivered to the listeners when the transaction commits
+                conn.execute(
+                    sql_text(
+                        """
+                            SELECT pg_notify(:channel, "java_server_id")
+                            FROM unnest(CAST(:java_server_ids AS TEXT[]))
+                                AS "java_server_id"
+                        """,
+                    ),
+                    parameters={
+                        "channel": JAVA_PING_RECORD_CREATED_CHANNEL,
+                        "java_server_ids": sorted(
+                            {
+                                ping_record.java_server_id
+                                for ping_record_id, ping_record in zip(
+                                    ping_record_ids, ping_records, strict=True
+                                )
+                                if ping_record_id in ping_record_row_by_id
+                            }
+                        ),
+                    },
+                )
+
+                ret_ping_records: list[JavaPingRecord] = []
+                for ping_record_id, ping_record, favicon_hash in zip(
+                    ping_record_ids, ping_records, favicon_hashes, strict=True
+                ):
+                    ping_record_row = ping_record_row_by_id.get(ping_record_id)
+                    if ping_record_row is None:
+                        # The server was deleted
+                        continue
+
+                    ret_ping_records.append(
+                        JavaPingRecord(
+                            id=ping_record_id,
+                            java_server_id=ping_record.java_server_id,
+                            timeout=ping_record.timeout,
+                            is_timeout=ping_record.is_timeout,
+                            is_refused=ping_record.is_refused,
+                            version_protocol=ping_record.version_protocol,
+                            version_name=ping_record.version_name,
+                            latency=ping_record.latency,
+                            players_online=ping_record.players_online,
+                            players_max=ping_record.players_max,
+                            players_sample=players_sample_by_ping_record_id[
+                                ping_record_id
+                            ],
+                            description=ping_record.description,
+                            favicon=ping_record.favicon,
+                            favicon_hash=favicon_hash,
+                            created_at=ping_record_row[1].isoformat(),
+                            updated_at=ping_record_row[2].isoformat(),
                         )
+                    )
 
-                return JavaPingRecord(
-                    id=ping_record_id,
-                    java_server_id=java_server_id,
-                    timeout=timeout,
-                    is_timeout=is_timeout,
-                    is_refused=is_refused,
-                    version_protocol=version_protocol,
-                    version_name=version_name,
-                    latency=latency,
-                    players_online=players_online,
-                    players_max=players_max,
-                    players_sample=ret_players_sample,
-                    description=description,
-                    favicon=favicon,
-                    created_at=ping_record_row[1].isoformat(),
-                    updated_at=ping_record_row[2].isoformat(),
+                return ret_ping_records
+
+    @observe_database_query_duration
+    def delete_java_ping_records_created_before(
+        self,
+        created_before: datetime,
+        count: int,
+    ) -> int:
+        # Delete the oldest records up to "count" to keep the transaction short.
+        # The outer "created_at" bound lets the planner skip the newer partitions.
+        # The players of the records are deleted by ON DELETE CASCADE.
+        with self.engine.connect() as conn:
+            with conn.begin():
+                result = conn.execute(
+                    sql_text(
+                        """
+                            DELETE FROM "java_ping_records"
+                            WHERE
+                                "created_at" < :created_before
+                                AND ("id", "created_at") IN (
+                                    SELECT "id", "created_at"
+                                    FROM "java_ping_records"
+                                    WHERE
+                                        "created_at" < :created_before
+                                    ORDER BY "created_at" ASC
+                                    LIMIT :count
+                                )
+                        """,
+                    ),
+                    parameters={
+                        "created_before": created_before,
+                        "count": count,
+                    },
                 )
+
+                deleted_count: int = result.rowcount
+                return deleted_count
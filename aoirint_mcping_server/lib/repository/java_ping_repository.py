@@ -1,8 +1,14 @@
 from abc import ABC, abstractmethod
 
-from mcstatus import JavaServer
+from mcstatus.address import Address
+from mcstatus.pinger import ServerPinger
+from mcstatus.protocol.connection import TCPSocketConnection
+from mcstatus.status_response import JavaStatusResponse
+from mcstatus.utils import retry
 from pydantic import BaseModel
 
+from .dns_resolver_repository import DnsResolverRepository
+
 
 class JavaPingTimeoutError(Exception):
     pass
@@ -33,11 +39,39 @@ class JavaPingRepository(ABC):
     def ping(self, host: str, port: int, timeout: float) -> JavaPingResult: ...
 
 
+@retry(tries=3)
+def read_java_status(
+    connection: TCPSocketConnection,
+    address: Address,
+) -> JavaStatusResponse:
+    pinger = ServerPinger(connection, address=address)
+    pinger.handshake()
+    return pinger.read_status()
+
+
 class JavaPingRepositoryImpl(JavaPingRepository):
+    def __init__(self, dns_resolver_api: DnsResolverRepository):
+        self.dns_resolver_api = dns_resolver_api
+
     def ping(self, host: str, port: int, timeout: float) -> JavaPingResult:
         try:
-            server = JavaServer.lookup(address=f"{host}:{port}", timeout=timeout)
-            response = server.status()
+            # The port is always given, so there is no SRV lookup as in the client
+            address = Address.parse_address(f"{host}:{port}")
+            resolve_result = self.dns_resolver_api.resolve(
+                host=address.host,
+                timeout=timeout,
+            )
+
+            # Connect to the resolved address, but send the host name in the
+            # handshake for the proxies routing by it
+            with TCPSocketConnection(
+                (resolve_result.address, address.port),
+                timeout,
+            ) as connection:
+                response = read_java_status(
+                    connection=connection,
+                    address=address,
+                )
 
             # sample is None when no player logged in
             players_sample = (
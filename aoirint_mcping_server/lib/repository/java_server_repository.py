@@ -1,27 +1,39 @@
 from abc import ABC, abstractmethod
 
 from pydantic import BaseModel
-from sqlalchemy import create_engine
+from sqlalchemy import Engine
 from sqlalchemy.sql import text as sql_text
 
+from ..util.metrics_utility import observe_database_query_duration
+
 
 class JavaServer(BaseModel):
     id: str
     name: str
     host: str
     port: int
+    is_important: bool
+
+
+class JavaServerListVersion(BaseModel):
+    count: int
+    last_updated_at: str | None
 
 
 class JavaServerRepository(ABC):
     @abstractmethod
     def get_java_servers(self) -> list[JavaServer]: ...
 
+    @abstractmethod
+    def get_java_server_list_version(self) -> JavaServerListVersion: ...
+
     @abstractmethod
     def create_java_server(
         self,
         name: str,
         host: str,
         port: int,
+        is_important: bool,
     ) -> JavaServer: ...
 
     @abstractmethod
@@ -31,6 +43,7 @@ class JavaServerRepository(ABC):
         name: str,
         host: str,
         port: int,
+        is_important: bool | None,
     ) -> JavaServer: ...
 
     @abstractmethod
@@ -41,9 +54,10 @@ class JavaServerRepository(ABC):
 
 
 class JavaServerRepositoryImpl(JavaServerRepository):
-    def __init__(self, database_url: str):
-        self.engine = create_engine(url=database_url)
+    def __init__(self, engine: Engine):
+        self.engine = engine
 
+    @observe_database_query_duration
     def get_java_servers(self) -> list[JavaServer]:
         with self.engine.connect() as conn:
             rows = conn.execute(
@@ -53,7 +67,8 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                             "id",
                             "name",
                             "host",
-                            "port"
+                            "port",
+                            "is_important"
                         FROM "java_servers"
                         ORDER BY "created_at" ASC
                     """,
@@ -66,15 +81,39 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                     name=row[1],
                     host=row[2],
                     port=row[3],
+                    is_important=row[4],
                 )
                 for row in rows
             ]
 
+    @observe_database_query_duration
+    def get_java_server_list_version(self) -> JavaServerListVersion:
+        with self.engine.connect() as conn:
+            # Every create and update advances the latest updated_at, and every
+            # delete decreases the count
+            row = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            COUNT(*),
+                            MAX("updated_at")
+                        FROM "java_servers"
+                    """,
+                ),
+            ).one()
+
+            return JavaServerListVersion(
+                count=row[0],
+                last_updated_at=row[1].isoformat() if row[1] is not None else None,
+            )
+
+    @observe_database_query_duration
     def create_java_server(
         self,
         name: str,
         host: str,
         port: int,
+        is_important: bool,
     ) -> JavaServer:
         with self.engine.connect() as conn:
             with conn.begin():
@@ -84,11 +123,13 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                             INSERT INTO "java_servers"(
                                 "name",
                                 "host",
-                                "port"
+                                "port",
+                                "is_important"
                             ) VALUES(
                                 :name,
                                 :host,
-                                :port
+                                :port,
+                                :is_important
                             ) RETURNING id
                         """,
                     ),
@@ -96,6 +137,7 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                         "name": name,
                         "host": host,
                         "port": port,
+                        "is_important": is_important,
                     },
                 ).fetchone()
 
@@ -107,14 +149,17 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                     name=name,
                     host=host,
                     port=port,
+                    is_important=is_important,
                 )
 
+    @observe_database_query_duration
     def update_java_server(
         self,
         id: str,
         name: str,
         host: str,
         port: int,
+        is_important: bool | None,
     ) -> JavaServer:
         with self.engine.connect() as conn:
             with conn.begin():
@@ -125,10 +170,14 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                             SET
                                 "name" = :name,
                                 "host" = :host,
-                                "port" = :port
+                                "port" = :port,
+                                "is_important" = COALESCE(
+                                    CAST(:is_important AS BOOLEAN),
+                                    "is_important"
+                                )
                             WHERE
                                 "id" = :id
-                            RETURNING "id"
+                            RETURNING "is_important"
                         """,
                     ),
                     parameters={
@@ -136,6 +185,7 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                         "name": name,
                         "host": host,
                         "port": port,
+                        "is_important": is_important,
                     },
                 ).fetchall()
 
@@ -147,8 +197,10 @@ class JavaServerRepositoryImpl(JavaServerRepository):
                     name=name,
                     host=host,
                     port=port,
+                    is_important=rows[0][0],
                 )
 
+    @observe_database_query_duration
     def delete_java_server(
         self,
         id: str,
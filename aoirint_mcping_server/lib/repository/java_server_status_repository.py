@@ -0,0 +1,162 @@
+from abc import ABC, abstractmethod
+
+from pydantic import BaseModel
+from sqlalchemy import Engine
+from sqlalchemy.sql import text as sql_text
+
+from ..util.metrics_utility import observe_database_query_duration
+from .java_ping_record_repository import JavaPingRecord, JavaPingRecordPlayer
+from .java_server_repository import JavaServer
+
+
+class JavaServerStatus(BaseModel):
+    server: JavaServer
+    latest_ping_record: JavaPingRecord | None
+
+
+class JavaServerStatusRepository(ABC):
+    @abstractmethod
+    def get_java_server_statuses(
+        self,
+        include_favicon: bool,
+    ) -> list[JavaServerStatus]: ...
+
+
+class JavaServerStatusRepositoryImpl(JavaServerStatusRepository):
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @observe_database_query_duration
+    def get_java_server_statuses(
+        self,
+        include_favicon: bool,
+    ) -> list[JavaServerStatus]:
+        with self.engine.connect() as conn:
+            # One index probe per server for its latest record. The players are
+            # aggregated into JSON to keep this one query.
+            rows = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            "java_servers"."id",
+                            "java_servers"."name",
+                            "java_servers"."host",
+                            "java_servers"."port",
+                            "java_servers"."is_important",
+                            "latest_ping_record"."id",
+                            "latest_ping_record"."timeout",
+                            "latest_ping_record"."is_timeout",
+                            "latest_ping_record"."is_refused",
+                            "latest_ping_record"."version_protocol",
+                            "latest_ping_record"."version_name",
+                            "latest_ping_record"."latency",
+                            "latest_ping_record"."players_online",
+                            "latest_ping_record"."players_max",
+                            "latest_ping_record"."description",
+                            CASE WHEN :include_favicon THEN (
+                                SELECT "favicon"
+                                FROM "java_favicons"
+                                WHERE
+                                    "hash" = "latest_ping_record"."favicon_hash"
+                            ) END,
+                            "latest_ping_record"."favicon_hash",
+                            "latest_ping_record"."created_at",
+                            "latest_ping_record"."updated_at",
+                            (
+                                SELECT json_agg(
+                                    json_build_object(
+                                        'id', "player"."id",
+                                        'player_id', "player"."player_id",
+                                        'name', "player"."name"
+                                    )
+                                )
+                                FROM "java_ping_record_players" AS "player"
+                                WHERE
+                                    "player"."java_ping_record_id"
+                                        = "latest_ping_record"."id"
+                                    AND "player"."java_ping_record_created_at"
+                                        = "latest_ping_record"."created_at"
+                            )
+                        FROM "java_servers"
+                        LEFT JOIN LATERAL (
+                            SELECT
+                                "java_ping_records"."id",
+                                "java_ping_records"."timeout",
+                                "java_ping_records"."is_timeout",
+                                "java_ping_records"."is_refused",
+                                "java_ping_records"."version_protocol",
+                                "java_ping_records"."version_name",
+                                "java_ping_records"."latency",
+                                "java_ping_records"."players_online",
+                                "java_ping_records"."players_max",
+                                "java_ping_records"."description",
+                                "java_ping_records"."favicon_hash",
+                                "java_ping_records"."created_at",
+                                "java_ping_records"."updated_at"
+                            FROM "java_ping_records"
+                            WHERE
+                                "java_ping_records"."java_server_id"
+                                    = "java_servers"."id"
+                            ORDER BY
+                                "java_ping_records"."created_at" DESC,
+                                "java_ping_records"."id" DESC
+                            LIMIT 1
+                        ) AS "latest_ping_record" ON TRUE
+                        ORDER BY "java_servers"."created_at" ASC
+                    """,
+                ),
+                parameters={
+                    "include_favicon": include_favicon,
+                },
+            ).fetchall()
+
+            server_statuses: list[JavaServerStatus] = []
+            for row in rows:
+                server = JavaServer(
+                    id=str(row[0]),
+                    name=row[1],
+                    host=row[2],
+                    port=row[3],
+                    is_important=row[4],
+                )
+
+                latest_ping_record: JavaPingRecord | None = None
+                if row[5] is not None:
+                    ping_record_id = str(row[5])
+                    player_objects = row[19] if row[19] is not None else []
+
+                    latest_ping_record = JavaPingRecord(
+                        id=ping_record_id,
+                        java_server_id=server.id,
+                        timeout=row[6],
+                        is_timeout=row[7],
+                        is_refused=row[8],
+                        version_protocol=row[9],
+                        version_name=row[10],
+                        latency=row[11],
+                        players_online=row[12],
+                        players_max=row[13],
+                        players_sample=[
+                            JavaPingRecordPlayer(
+                                id=player_object["id"],
+                                java_ping_record_id=ping_record_id,
+                                player_id=player_object["player_id"],
+                                name=player_object["name"],
+                            )
+                            for player_object in player_objects
+                        ],
+                        description=row[14],
+                        favicon=row[15],
+                        favicon_hash=row[16],
+                        created_at=row[17].isoformat(),
+                        updated_at=row[18].isoformat(),
+                    )
+
+                server_statuses.append(
+                    JavaServerStatus(
+                        server=server,
+                        latest_ping_record=latest_ping_record,
+                    )
+                )
+
+            return server_statuses
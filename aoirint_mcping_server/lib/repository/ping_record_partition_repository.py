@@ -0,0 +1,184 @@
+import re
+from abc import ABC, abstractmethod
+from datetime import UTC, datetime
+from typing import Literal
+
+from pydantic import BaseModel
+from sqlalchemy import Engine
+from sqlalchemy.sql import text as sql_text
+
+from ..util.metrics_utility import observe_database_query_duration
+
+# The tables partitioned by month of the ping record "created_at".
+# java_ping_record_players references java_ping_records, so its partitions must be
+# dropped first.
+PingRecordPartitionedTable = Literal[
+    "java_ping_record_players",
+    "java_ping_records",
+    "bedrock_ping_records",
+]
+
+PING_RECORD_PARTITIONED_TABLES: list[PingRecordPartitionedTable] = [
+    "java_ping_record_players",
+    "java_ping_records",
+    "bedrock_ping_records",
+]
+
+# The tables written by the Java and Bedrock updaters
+JAVA_PING_RECORD_PARTITIONED_TABLES: list[PingRecordPartitionedTable] = [
+    "java_ping_record_players",
+    "java_ping_records",
+]
+
+BEDROCK_PING_RECORD_PARTITIONED_TABLES: list[PingRecordPartitionedTable] = [
+    "bedrock_ping_records",
+]
+
+# Months of partitions the updaters create ahead of the current month. An insert
+# fails when its month has no partition, so the writes must not depend on the
+# pruner creating them.
+UPDATER_FUTURE_PARTITIONS = 1
+
+# "<table>_pYYYYMM", named by create_monthly_partition() in the database
+PING_RECORD_PARTITION_NAME_PATTERN = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+class PingRecordPartition(BaseModel):
+    table: PingRecordPartitionedTable
+    name: str
+    range_start: datetime
+    range_end: datetime
+
+
+def get_month_start(value: datetime) -> datetime:
+    value = value.astimezone(UTC)
+    return datetime(value.year, value.month, 1, tzinfo=UTC)
+
+
+def add_months(month_start: datetime, months: int) -> datetime:
+    month_index = month_start.year * 12 + (month_start.month - 1) + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=UTC)
+
+
+class PingRecordPartitionRepository(ABC):
+    @abstractmethod
+    def get_ping_record_partitions(
+        self,
+        table: PingRecordPartitionedTable,
+    ) -> list[PingRecordPartition]: ...
+
+    @abstractmethod
+    def create_ping_record_partitions(
+        self,
+        table: PingRecordPartitionedTable,
+        months_ahead: int,
+    ) -> None: ...
+
+    @abstractmethod
+    def drop_ping_record_partition(
+        self,
+        partition: PingRecordPartition,
+    ) -> None: ...
+
+
+class PingRecordPartitionRepositoryImpl(PingRecordPartitionRepository):
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @observe_database_query_duration
+    def get_ping_record_partitions(
+        self,
+        table: PingRecordPartitionedTable,
+    ) -> list[PingRecordPartition]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                sql_text(
+                    """
+                        SELECT
+                            "pg_class"."relname"
+                        FROM "pg_inherits"
+                        INNER JOIN "pg_class"
+                            ON "pg_class"."oid" = "pg_inherits"."inhrelid"
+                        WHERE
+                            "pg_inherits"."inhparent" = CAST(:table AS REGCLASS)
+                        ORDER BY "pg_class"."relname" ASC
+                    """,
+                ),
+                parameters={
+                    "table": table,
+                },
+            ).fetchall()
+
+            partitions: list[PingRecordPartition] = []
+            for row in rows:
+                name: str = row[0]
+
+                # Skip the partitions not created by create_monthly_partition()
+                match = PING_RECORD_PARTITION_NAME_PATTERN.search(name)
+                if match is None or name[: match.start()] != table:
+                    continue
+
+                range_start = datetime(
+                    int(match.group(1)), int(match.group(2)), 1, tzinfo=UTC
+                )
+                partitions.append(
+                    PingRecordPartition(
+                        table=table,
+                        name=name,
+                        range_start=range_start,
+                        range_end=add_months(range_start, 1),
+                    )
+                )
+
+            return partitions
+
+    @observe_database_query_duration
+    def create_ping_record_partitions(
+        self,
+        table: PingRecordPartitionedTable,
+        months_ahead: int,
+    ) -> None:
+        # Create the partitions from the current month to "months_ahead" months later
+        # if not exist
+        with self.engine.connect() as conn:
+            with conn.begin():
+                conn.execute(
+                    sql_text(
+                        """
+                            SELECT create_monthly_partitions(
+                                :table,
+                                CURRENT_TIMESTAMP,
+                                :months_ahead
+                            )
+                        """,
+                    ),
+                    parameters={
+                        "table": table,
+                        "months_ahead": months_ahead,
+                    },
+                )
+
+    @observe_database_query_duration
+    def drop_ping_record_partition(
+        self,
+        partition: PingRecordPartition,
+    ) -> None:
+        # Detach first: a partition referenced by a foreign key cannot be dropped
+        # directly, and detaching checks that no rows reference it
+        with self.engine.connect() as conn:
+            with conn.begin():
+                conn.execute(
+                    sql_text(
+                        f"""
+                            ALTER TABLE "{partition.table}"
+                            DETACH PARTITION "{partition.name}"
+                        """,
+                    ),
+                )
+                conn.execute(
+                    sql_text(
+                        f"""
+                            DROP TABLE "{partition.name}"
+                        """,
+                    ),
+                )
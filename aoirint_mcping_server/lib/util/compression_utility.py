@@ -0,0 +1,164 @@
+import gzip
+
+import brotli
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Supported content encodings, preferred first when accepted with the same quality
+CONTENT_ENCODINGS = ("br", "gzip")
+
+# Compressing a large body blocks the event loop, so it is done in a thread
+THREAD_COMPRESSION_MIN_SIZE = 64 * 1024
+
+# Bodies already compressed, or streamed
+INCOMPRESSIBLE_MEDIA_TYPE_PREFIXES = ("image/", "text/event-stream")
+
+
+def select_content_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Choose the supported content encoding with the highest quality in
+    Accept-Encoding, or None for the identity.
+    """
+    if accept_encoding is None:
+        return None
+
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if coding == "":
+            continue
+
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+
+        qualities[coding] = quality
+
+    content_encoding: str | None = None
+    content_encoding_quality = 0.0
+    for candidate in CONTENT_ENCODINGS:
+        quality = qualities.get(candidate, qualities.get("*", 0.0))
+        if quality > content_encoding_quality:
+            content_encoding = candidate
+            content_encoding_quality = quality
+
+    return content_encoding
+
+
+def compress(
+    body: bytes,
+    content_encoding: str,
+    gzip_level: int,
+    brotli_quality: int,
+) -> bytes:
+    if content_encoding == "br":
+        compressed: bytes = brotli.compress(body, quality=brotli_quality)
+        return compressed
+
+    # No timestamp in the header, so that the same body compresses the same
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress the responses with brotli or gzip as negotiated by Accept-Encoding.
+
+    Only the responses sent in one body are compressed. The streams pass through as
+    they are, because a compressor would hold back the Server-Sent Events until its
+    buffer fills.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        gzip_level: int,
+        brotli_quality: int,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_encoding = select_content_encoding(
+            Headers(scope=scope).get("Accept-Encoding")
+        )
+        start_message: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                # Held until the first body tells whether to compress
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start = start_message
+            start_message = None
+
+            body: bytes = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "Content-Encoding" in headers
+                or headers.get("Content-Type", "").startswith(
+                    INCOMPRESSIBLE_MEDIA_TYPE_PREFIXES
+                )
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            # Also for the identity, so that caches keep the encodings apart
+            headers.add_vary_header("Accept-Encoding")
+
+            if content_encoding is not None:
+                if len(body) >= THREAD_COMPRESSION_MIN_SIZE:
+                    body = await run_in_threadpool(
+                        compress,
+                        body=body,
+                        content_encoding=content_encoding,
+                        gzip_level=self.gzip_level,
+                        brotli_quality=self.brotli_quality,
+                    )
+                else:
+                    body = compress(
+                        body=body,
+                        content_encoding=content_encoding,
+                        gzip_level=self.gzip_level,
+                        brotli_quality=self.brotli_quality,
+                    )
+
+                headers["Content-Encoding"] = content_encoding
+                headers["Content-Length"] = str(len(body))
+
+                # A strong ETag identifies the exact bytes, which differ by the
+                # encoding. If-None-Match uses the weak comparison, so the
+                # revalidation still works.
+                etag = headers.get("ETag")
+                if etag is not None and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+
+                message = {**message, "body": body}
+
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,45 @@
+import base64
+import binascii
+from urllib.parse import unquote_to_bytes
+
+from pydantic import BaseModel
+
+
+class DataUrlParseError(Exception):
+    pass
+
+
+class DataUrl(BaseModel):
+    media_type: str
+    data: bytes
+
+
+def parse_data_url(data_url: str) -> DataUrl:
+    # data:[<media-type>][;base64],<data>
+    if not data_url.startswith("data:"):
+        raise DataUrlParseError("Not a data URL")
+
+    header, separator, body = data_url[len("data:") :].partition(",")
+    if separator == "":
+        raise DataUrlParseError("Data URL without a comma")
+
+    is_base64 = header.endswith(";base64")
+    if is_base64:
+        header = header[: -len(";base64")]
+
+    media_type = header.split(";", 1)[0] if header != "" else "text/plain"
+
+    if is_base64:
+        # Some servers send base64 data wrapped with newlines
+        body = "".join(body.split())
+        try:
+            data = base64.b64decode(body, validate=True)
+        except binascii.Error as error:
+            raise DataUrlParseError("Invalid base64 data") from error
+    else:
+        data = unquote_to_bytes(body)
+
+    return DataUrl(
+        media_type=media_type,
+        data=data,
+    )
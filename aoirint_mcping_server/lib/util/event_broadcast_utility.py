@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class EventSubscription(Generic[T]):
+    """
+    Queue of the events for one subscriber, consumed on its event loop.
+
+    None is queued once to end the subscription, when the broadcaster is closed
+    or when the subscriber falls "max_size" events behind.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_size: int):
+        self.loop = loop
+        self.max_size = max_size
+
+        self.queue: asyncio.Queue[T | None] = asyncio.Queue()
+        self.is_closed = False
+
+    def put(self, event: T | None) -> None:
+        # Called on the event loop of the subscriber
+        if self.is_closed:
+            return
+
+        if event is None or self.queue.qsize() >= self.max_size:
+            self.is_closed = True
+            self.queue.put_nowait(None)
+            return
+
+        self.queue.put_nowait(event)
+
+    async def get(self) -> T | None:
+        return await self.queue.get()
+
+
+class EventBroadcaster(Generic[T]):
+    """
+    Fan out the events published from any thread to the subscribers on their
+    event loops.
+    """
+
+    def __init__(self, max_queue_size: int):
+        self.max_queue_size = max_queue_size
+
+        self.subscriptions: set[EventSubscription[T]] = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self) -> EventSubscription[T]:
+        """
+        Called on the event loop which consumes the events.
+        """
+        subscription: EventSubscription[T] = EventSubscription(
+            loop=asyncio.get_running_loop(),
+            max_size=self.max_queue_size,
+        )
+        with self.lock:
+            self.subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription[T]) -> None:
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def has_subscribers(self) -> bool:
+        with self.lock:
+            return len(self.subscriptions) > 0
+
+    def publish(self, event: T) -> None:
+        self.put(event=event)
+
+    def close(self) -> None:
+        self.put(event=None)
+
+    def put(self, event: T | None) -> None:
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The event loop is already closed
+                self.unsubscribe(subscription)
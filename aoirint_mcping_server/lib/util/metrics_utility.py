@@ -0,0 +1,115 @@
+import functools
+from collections.abc import Callable
+from typing import ParamSpec, TypeVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Buckets in seconds, from a cached query to a ping which times out after retries
+DURATION_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "mcping_http_request_duration_seconds",
+    "Duration of the Web API requests until the response headers",
+    ["method", "route", "status_code"],
+    buckets=DURATION_BUCKETS,
+)
+
+DATABASE_QUERY_DURATION = Histogram(
+    "mcping_database_query_duration_seconds",
+    "Duration of the repository methods querying the database",
+    ["repository", "method"],
+    buckets=DURATION_BUCKETS,
+)
+
+UPDATER_SWEEP_DURATION = Histogram(
+    "mcping_updater_sweep_duration_seconds",
+    "Duration of the sweeps, from the first ping to the end of the write",
+    ["updater"],
+    buckets=DURATION_BUCKETS,
+)
+
+UPDATER_PING_DURATION = Histogram(
+    "mcping_updater_ping_duration_seconds",
+    "Duration of the pings including the DNS resolution and the retries",
+    ["edition"],
+    buckets=DURATION_BUCKETS,
+)
+
+UPDATER_SERVER_PING_DURATION = Gauge(
+    "mcping_updater_server_ping_duration_seconds",
+    "Duration of the last ping of each server",
+    ["edition", "server_id"],
+)
+
+UPDATER_PINGS = Counter(
+    "mcping_updater_pings",
+    "Pings by the result (success, timeout, refused or error)",
+    ["edition", "result"],
+)
+
+UPDATER_DNS_LOOKUPS = Counter(
+    "mcping_updater_dns_lookups",
+    "Lookups of the DNS cache by the result (hit, negative_hit or miss)",
+    ["result"],
+)
+
+UPDATER_WRITE_DURATION = Histogram(
+    "mcping_updater_write_duration_seconds",
+    "Duration of writing the ping records of a sweep",
+    ["edition"],
+    buckets=DURATION_BUCKETS,
+)
+
+
+def observe_database_query_duration(func: Callable[P, R]) -> Callable[P, R]:
+    """
+    Decorate a repository method to observe its duration, labeled by the class
+    and the method name.
+    """
+    repository, method = func.__qualname__.split(".")[-2:]
+    histogram = DATABASE_QUERY_DURATION.labels(repository=repository, method=method)
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with histogram.time():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def observe_ping(edition: str, server_id: str, result: str, duration: float) -> None:
+    UPDATER_PING_DURATION.labels(edition=edition).observe(duration)
+    UPDATER_SERVER_PING_DURATION.labels(edition=edition, server_id=server_id).set(
+        duration
+    )
+    UPDATER_PINGS.labels(edition=edition, result=result).inc()
+
+
+def remove_server_ping_metrics(edition: str, server_ids: set[str]) -> None:
+    """
+    Drop the per-server series of the deleted servers.
+    """
+    for server_id in server_ids:
+        try:
+            UPDATER_SERVER_PING_DURATION.remove(edition, server_id)
+        except KeyError:
+            # Deleted before its first ping
+            pass
@@ -0,0 +1,156 @@
+import heapq
+import random
+
+from pydantic import BaseModel
+
+
+class PingScheduleConfig(BaseModel):
+    interval: float
+    important_interval: float
+    max_backoff_interval: float
+    jitter: float  # Ratio of the interval
+
+
+class PingScheduleEntry(BaseModel):
+    is_important: bool
+    failure_count: int
+    due_time: float | None  # None while the ping is in flight
+
+
+class PingScheduler:
+    """
+    Decide when to ping each server next, in a priority queue keyed by the due
+    time.
+
+    Important servers are pinged at a shorter interval. The interval doubles on
+    each consecutive failure (timeout or refused) up to max_backoff_interval, and
+    every interval is randomized by the jitter ratio to spread the pings.
+
+    Times are given by the caller (e.g. time.monotonic()).
+    """
+
+    def __init__(self, config: PingScheduleConfig, rng: random.Random | None = None):
+        self.config = config
+        self.rng = rng if rng is not None else random.Random()
+
+        self.entries: dict[str, PingScheduleEntry] = {}
+        # (due_time, server_id). Entries rescheduled or removed leave stale items
+        # behind, which are skipped on pop.
+        self.queue: list[tuple[float, str]] = []
+
+    def update_servers(
+        self,
+        is_important_by_server_id: dict[str, bool],
+        now: float,
+    ) -> None:
+        for server_id in list(self.entries.keys()):
+            if server_id not in is_important_by_server_id:
+                del self.entries[server_id]
+
+        for server_id, is_important in is_important_by_server_id.items():
+            entry = self.entries.get(server_id)
+            if entry is None:
+                # Spread the first pings of the new servers
+                first_delay = self.rng.uniform(
+                    0,
+                    self.config.jitter * self.config.interval,
+                )
+                self.push(
+                    server_id=server_id,
+                    entry=PingScheduleEntry(
+                        is_important=is_important,
+                        failure_count=0,
+                        due_time=None,
+                    ),
+                    due_time=now + first_delay,
+                )
+                continue
+
+            if entry.is_important == is_important:
+                continue
+
+            entry.is_important = is_important
+            if entry.due_time is not None:
+                # Apply the new interval without waiting for the old one
+                due_time = now + self.get_delay(entry=entry)
+                if due_time < entry.due_time:
+                    self.push(server_id=server_id, entry=entry, due_time=due_time)
+
+    def pop_due_servers(self, now: float) -> list[str]:
+        server_ids: list[str] = []
+        while len(self.queue) > 0 and self.queue[0][0] <= now:
+            due_time, server_id = heapq.heappop(self.queue)
+
+            entry = self.entries.get(server_id)
+            if entry is None or entry.due_time != due_time:
+                continue
+
+            entry.due_time = None
+            server_ids.append(server_id)
+
+        return server_ids
+
+    def report(self, server_id: str, is_failed: bool, now: float) -> None:
+        entry = self.entries.get(server_id)
+        if entry is None:
+            # Removed while in flight
+            return
+
+        entry.failure_count = entry.failure_count + 1 if is_failed else 0
+        self.push(
+            server_id=server_id,
+            entry=entry,
+            due_time=now + self.get_delay(entry=entry),
+        )
+
+    def reschedule(self, server_id: str, now: float) -> None:
+        """
+        Schedule the next ping without counting the last one, e.g. when its record
+        could not be written.
+        """
+        entry = self.entries.get(server_id)
+        if entry is None:
+            # Removed while in flight
+            return
+
+        self.push(
+            server_id=server_id,
+            entry=entry,
+            due_time=now + self.get_delay(entry=entry),
+        )
+
+    def get_next_due_time(self) -> float | None:
+        while len(self.queue) > 0:
+            due_time, server_id = self.queue[0]
+
+            entry = self.entries.get(server_id)
+            if entry is not None and entry.due_time == due_time:
+                return due_time
+
+            heapq.heappop(self.queue)
+
+        return None
+
+    def get_delay(self, entry: PingScheduleEntry) -> float:
+        interval = (
+            self.config.important_interval
+            if entry.is_important
+            else self.config.interval
+        )
+
+        # The first failure may be transient, so the backoff starts from the second
+        if entry.failure_count > 1:
+            interval = min(
+                interval * 2 ** min(entry.failure_count - 1, 32),
+                max(interval, self.config.max_backoff_interval),
+            )
+
+        return interval * self.rng.uniform(
+            1 - self.config.jitter,
+            1 + self.config.jitter,
+        )
+
+    def push(self, server_id: str, entry: PingScheduleEntry, due_time: float) -> None:
+        entry.due_time = due_time
+        self.entries[server_id] = entry
+        heapq.heappush(self.queue, (due_time, server_id))
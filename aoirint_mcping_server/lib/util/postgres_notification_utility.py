@@ -0,0 +1,148 @@
+import logging
+import select
+import threading
+from collections.abc import Callable
+
+from pydantic import BaseModel
+from sqlalchemy import NullPool, create_engine
+
+
+class PostgresNotification(BaseModel):
+    channel: str
+    payload: str
+
+
+class PostgresNotificationListener:
+    """
+    LISTEN on PostgreSQL channels with one dedicated connection in a background
+    thread, and pass each notification to the subscribed callbacks.
+
+    The callbacks run in the listener thread. Notifications sent while the
+    connection is lost are missed, so the connect callbacks are called on each
+    (re)connection to let the subscribers discard what they derived before.
+    The connection state and the failed callbacks are logged with "logger" of the
+    caller.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        channels: list[str],
+        logger: logging.Logger,
+        reconnect_interval: float = 5.0,
+    ):
+        self.channels = channels
+        self.logger = logger
+        self.reconnect_interval = reconnect_interval
+
+        # The listening connection is held for the lifetime of the listener, so it
+        # is not taken from the connection pool of the requests
+        self.engine = create_engine(url=database_url, poolclass=NullPool)
+
+        self.notification_callbacks: list[Callable[[PostgresNotification], None]] = []
+        self.connect_callbacks: list[Callable[[], None]] = []
+        self.callbacks_lock = threading.Lock()
+
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+        self.is_listening = False
+
+    def subscribe(
+        self,
+        callback: Callable[[PostgresNotification], None],
+    ) -> None:
+        with self.callbacks_lock:
+            self.notification_callbacks.append(callback)
+
+    def unsubscribe(
+        self,
+        callback: Callable[[PostgresNotification], None],
+    ) -> None:
+        with self.callbacks_lock:
+            self.notification_callbacks.remove(callback)
+
+    def subscribe_connect(
+        self,
+        callback: Callable[[], None],
+    ) -> None:
+        with self.callbacks_lock:
+            self.connect_callbacks.append(callback)
+
+    def start(self) -> None:
+        self.stop_event.clear()
+        self.thread = threading.Thread(
+            target=self.run,
+            name="postgres_notification_listener",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        self.engine.dispose()
+
+    def run(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self.listen()
+            except Exception:
+                self.logger.exception("Lost the connection to listen notifications")
+            finally:
+                self.is_listening = False
+
+            self.stop_event.wait(timeout=self.reconnect_interval)
+
+    def listen(self) -> None:
+        raw_conn = self.engine.raw_connection()
+        try:
+            # psycopg2 connection
+            conn = raw_conn.driver_connection
+            if conn is None:
+                raise Exception("The connection is already closed")
+
+            conn.autocommit = True
+
+            cursor = conn.cursor()
+            for channel in self.channels:
+                # Channel names are identifiers given by the code, not by users
+                cursor.execute(f'LISTEN "{channel}"')
+
+            self.is_listening = True
+            self.logger.info(f"Listening notifications on {', '.join(self.channels)}")
+
+            with self.callbacks_lock:
+                connect_callbacks = list(self.connect_callbacks)
+            for connect_callback in connect_callbacks:
+                connect_callback()
+
+            while not self.stop_event.is_set():
+                # Wake up regularly to check the stop event
+                readable, _, _ = select.select([conn], [], [], 1.0)
+                if len(readable) == 0:
+                    continue
+
+                conn.poll()
+                while len(conn.notifies) > 0:
+                    notify = conn.notifies.pop(0)
+                    self.dispatch(
+                        notification=PostgresNotification(
+                            channel=notify.channel,
+                            payload=notify.payload,
+                        ),
+                    )
+        finally:
+            raw_conn.close()
+
+    def dispatch(self, notification: PostgresNotification) -> None:
+        with self.callbacks_lock:
+            notification_callbacks = list(self.notification_callbacks)
+
+        for notification_callback in notification_callbacks:
+            try:
+                notification_callback(notification)
+            except Exception:
+                self.logger.exception("Failed to handle a notification")
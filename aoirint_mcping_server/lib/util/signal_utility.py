@@ -0,0 +1,24 @@
+import logging
+import signal
+import threading
+from types import FrameType
+
+
+def install_stop_signal_handlers(
+    stop_event: threading.Event,
+    logger: logging.Logger,
+) -> None:
+    """
+    Set the event on SIGTERM (e.g. docker stop) and SIGINT, instead of
+    interrupting the work in progress. The signal is logged with "logger" of the
+    caller.
+
+    Call this in the main thread.
+    """
+
+    def handle_stop_signal(signum: int, frame: FrameType | None) -> None:
+        logger.info(f"Received {signal.Signals(signum).name}, stopping")
+        stop_event.set()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, handle_stop_signal)
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+G = TypeVar("G", bound=Hashable)
+V = TypeVar("V")
+
+
+class TtlCache(Generic[G, K, V]):
+    """
+    Thread-safe LRU cache whose entries expire after a TTL.
+
+    Each entry belongs to a group, and all the entries of a group can be
+    invalidated at once (e.g. all the cached queries of one server).
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.entries: OrderedDict[tuple[G, K], tuple[float, V]] = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Incremented on each invalidation. A value read from the source before an
+        # invalidation may be stale, so it is not stored (see "set").
+        self.version = 0
+
+    def get(self, group: G, key: K) -> V | None:
+        with self.lock:
+            entry = self.entries.get((group, key))
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+
+            self.entries.move_to_end((group, key))
+            return entry[1]
+
+    def set(self, group: G, key: K, value: V, version: int) -> None:
+        """
+        Store a value read from the source after "version" was taken.
+        """
+        if self.ttl <= 0:
+            return
+
+        with self.lock:
+            if version != self.version:
+                return
+
+            self.entries[(group, key)] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end((group, key))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, group: G) -> None:
+        with self.lock:
+            self.version += 1
+            for entry_key in [
+                entry_key for entry_key in self.entries if entry_key[0] == group
+            ]:
+                del self.entries[entry_key]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+from ..repository.dns_resolver_repository import CachedDnsResolverRepositoryImpl
+from ..repository.ping_record_partition_repository import (
+    UPDATER_FUTURE_PARTITIONS,
+    PingRecordPartitionedTable,
+    PingRecordPartitionRepository,
+)
+from .metrics_utility import remove_server_ping_metrics
+from .ping_schedule_utility import PingScheduleConfig, PingScheduler
+
+# Seconds between the reloads of the server lists in the loop
+SERVER_RELOAD_INTERVAL = 60
+
+
+def run_update_loop(
+    stop_event: threading.Event,
+    editions: list[str],
+    ping_schedule_config: PingScheduleConfig,
+    ping_record_partition_api: PingRecordPartitionRepository,
+    partitioned_tables: list[PingRecordPartitionedTable],
+    dns_resolver_api: CachedDnsResolverRepositoryImpl,
+    reload_servers: Callable[[], dict[str, dict[str, bool]]],
+    sweep: Callable[[dict[str, list[str]]], dict[str, list[bool]]],
+    logger: logging.Logger,
+) -> None:
+    """
+    Ping the servers of the editions as they become due until "stop_event" is set.
+
+    "reload_servers" loads the servers, and returns whether each server is
+    important by the server id for each edition. "sweep" pings and writes the
+    due servers given by the server ids for each edition, and returns whether each
+    ping failed in the same order. The sweep in progress is finished before
+    stopping.
+
+    The errors of the reloads and the sweeps are logged, and the loop keeps
+    running.
+    """
+    # Each server has its own due time instead of one global interval, so that the
+    # servers failing for a long time back off and the important ones come first.
+    # The server ids of the editions are scheduled separately.
+    scheduler_by_edition = {
+        edition: PingScheduler(config=ping_schedule_config) for edition in editions
+    }
+    server_ids_by_edition: dict[str, set[str]] = {
+        edition: set() for edition in editions
+    }
+    servers_reloaded_at: float | None = None
+
+    while not stop_event.is_set():
+        now = time.monotonic()
+        if (
+            servers_reloaded_at is None
+            or now - servers_reloaded_at >= SERVER_RELOAD_INTERVAL
+        ):
+            # The database errors are retried on the next reload, with the servers
+            # loaded last time
+            servers_reloaded_at = now
+
+            # Create the partitions of the next month before it starts, without
+            # waiting for the pruner
+            try:
+                for table in partitioned_tables:
+                    ping_record_partition_api.create_ping_record_partitions(
+                        table=table,
+                        months_ahead=UPDATER_FUTURE_PARTITIONS,
+                    )
+            except Exception:
+                logger.exception("Failed to create the partitions")
+
+            try:
+                is_important_by_server_id_by_edition = reload_servers()
+            except Exception:
+                logger.exception("Failed to reload the servers")
+                is_important_by_server_id_by_edition = None
+
+            if is_important_by_server_id_by_edition is not None:
+                for edition in editions:
+                    is_important_by_server_id = is_important_by_server_id_by_edition[
+                        edition
+                    ]
+                    remove_server_ping_metrics(
+                        edition=edition,
+                        server_ids=(
+                            server_ids_by_edition[edition]
+                            - is_important_by_server_id.keys()
+                        ),
+                    )
+                    server_ids_by_edition[edition] = set(
+                        is_important_by_server_id.keys()
+                    )
+                    scheduler_by_edition[edition].update_servers(
+                        is_important_by_server_id=is_important_by_server_id,
+                        now=now,
+                    )
+
+            dns_resolver_stats = dns_resolver_api.get_stats()
+            logger.info(
+                f"DNS cache: hit ratio {dns_resolver_stats.hit_ratio:.3f}, "
+                f"{dns_resolver_stats.hit_count} hits, "
+                f"{dns_resolver_stats.negative_hit_count} negative hits, "
+                f"{dns_resolver_stats.miss_count} misses, "
+                f"{dns_resolver_stats.entry_count} entries"
+            )
+
+        due_server_ids_by_edition = {
+            edition: scheduler.pop_due_servers(now=now)
+            for edition, scheduler in scheduler_by_edition.items()
+        }
+        if all(
+            len(due_server_ids) == 0
+            for due_server_ids in due_server_ids_by_edition.values()
+        ):
+            next_due_times = [
+                due_time
+                for due_time in (
+                    scheduler.get_next_due_time()
+                    for scheduler in scheduler_by_edition.values()
+                )
+                if due_time is not None
+            ]
+            next_due_time = (
+                min(next_due_times)
+                if len(next_due_times) > 0
+                else now + SERVER_RELOAD_INTERVAL
+            )
+
+            # Wake up at least every second to pick up the new servers
+            stop_event.wait(timeout=min(max(next_due_time - now, 0.0), 1.0))
+            continue
+
+        # The servers due at once are pinged concurrently and written together. A
+        # stop signal is handled after this.
+        try:
+            is_failed_by_edition = sweep(due_server_ids_by_edition)
+        except Exception:
+            # Keep running on a write error (e.g. the database is down). The pings
+            # of the sweep are lost, and the servers are pinged again after their
+            # interval without counting it as their failure.
+            logger.exception("Failed to sweep the servers")
+
+            now = time.monotonic()
+            for edition, due_server_ids in due_server_ids_by_edition.items():
+                for server_id in due_server_ids:
+                    scheduler_by_edition[edition].reschedule(
+                        server_id=server_id,
+                        now=now,
+                    )
+            continue
+
+        now = time.monotonic()
+        for edition, due_server_ids in due_server_ids_by_edition.items():
+            for server_id, is_failed in zip(
+                due_server_ids, is_failed_by_edition[edition], strict=True
+            ):
+                scheduler_by_edition[edition].report(
+                    server_id=server_id,
+                    is_failed=is_failed,
+                    now=now,
+                )
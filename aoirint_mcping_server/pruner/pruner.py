@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+import schedule
+from pydantic import BaseModel
+from sqlalchemy import create_engine
+
+from .. import __version__ as APP_VERSION
+from ..lib.repository.bedrock_ping_record_repository import (
+    BedrockPingRecordRepositoryImpl,
+)
+from ..lib.repository.java_ping_record_repository import (
+    JavaPingRecordRepositoryImpl,
+)
+from ..lib.repository.ping_record_partition_repository import (
+    PING_RECORD_PARTITIONED_TABLES,
+    PingRecordPartitionRepositoryImpl,
+)
+from ..lib.util.logging_utility import setup_logger
+from ..lib.util.signal_utility import install_stop_signal_handlers
+
+logger = logging.Logger(name="pruner")
+
+
+class PrunerConfig(BaseModel):
+    database_url: str
+    interval: int
+    retention_days: int
+    batch_size: int
+    batch_interval: float
+    future_partitions: int
+
+
+def prune_in_batches(
+    config: PrunerConfig,
+    delete_batch: Callable[[int], int],
+) -> int:
+    total_deleted_count = 0
+
+    while True:
+        deleted_count = delete_batch(config.batch_size)
+        total_deleted_count += deleted_count
+
+        if deleted_count < config.batch_size:
+            return total_deleted_count
+
+        # Give the other transactions a chance to run between the batches
+        time.sleep(config.batch_interval)
+
+
+def prune(config: PrunerConfig) -> None:
+    engine = create_engine(url=config.database_url)
+
+    try:
+        bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(engine=engine)
+        java_ping_record_api = JavaPingRecordRepositoryImpl(engine=engine)
+
+        ping_record_partition_api = PingRecordPartitionRepositoryImpl(engine=engine)
+
+        for table in PING_RECORD_PARTITIONED_TABLES:
+            ping_record_partition_api.create_ping_record_partitions(
+                table=table,
+                months_ahead=config.future_partitions,
+            )
+
+        created_before = datetime.now(UTC) - timedelta(days=config.retention_days)
+        logger.info(f"Pruning ping records created before {created_before.isoformat()}")
+
+        # Drop the partitions whose all records are expired. The rest of the expired
+        # records are in the oldest remaining partition and deleted in batches below.
+        for table in PING_RECORD_PARTITIONED_TABLES:
+            for partition in ping_record_partition_api.get_ping_record_partitions(
+                table=table,
+            ):
+                if partition.range_end > created_before:
+                    continue
+
+                ping_record_partition_api.drop_ping_record_partition(
+                    partition=partition
+                )
+                logger.info(f"Dropped partition {partition.name}")
+
+        deleted_bedrock_ping_record_count = prune_in_batches(
+            config=config,
+            delete_batch=lambda count: (
+                bedrock_ping_record_api.delete_bedrock_ping_records_created_before(
+                    created_before=created_before,
+                    count=count,
+                )
+            ),
+        )
+        logger.info(f"Deleted {deleted_bedrock_ping_record_count} bedrock ping records")
+
+        deleted_java_ping_record_count = prune_in_batches(
+            config=config,
+            delete_batch=lambda count: (
+                java_ping_record_api.delete_java_ping_records_created_before(
+                    created_before=created_before,
+                    count=count,
+                )
+            ),
+        )
+        logger.info(f"Deleted {deleted_java_ping_record_count} java ping records")
+    finally:
+        engine.dispose()
+
+
+def prune_or_log_error(config: PrunerConfig) -> None:
+    try:
+        prune(config=config)
+    except Exception:
+        # Keep the loop running to retry at the next interval (e.g. after the
+        # database is back)
+        logger.exception("Failed to prune")
+
+
+def prune_loop(config: PrunerConfig) -> None:
+    """
+    Run as a daemon until SIGTERM or SIGINT. The prune in progress is finished
+    before stopping.
+    """
+    stop_event = threading.Event()
+    install_stop_signal_handlers(stop_event=stop_event, logger=logger)
+
+    schedule.every(interval=config.interval).seconds.do(
+        prune_or_log_error,
+        config=config,
+    )
+
+    logger.info("Started")
+    while not stop_event.is_set():
+        schedule.run_pending()
+        stop_event.wait(timeout=1)
+
+    logger.info("Stopped")
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--database_url",
+        type=str,
+        default=os.environ.get("MCPING_PRUNER_DATABASE_URL"),
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=os.environ.get("MCPING_PRUNER_INTERVAL", "3600"),
+    )
+    parser.add_argument(
+        "--retention_days",
+        type=int,
+        default=os.environ.get("MCPING_PRUNER_RETENTION_DAYS", "90"),
+        help="Ping records older than this are deleted",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=os.environ.get("MCPING_PRUNER_BATCH_SIZE", "5000"),
+        help="Number of ping records deleted in one transaction",
+    )
+    parser.add_argument(
+        "--batch_interval",
+        type=float,
+        default=os.environ.get("MCPING_PRUNER_BATCH_INTERVAL", "0.5"),
+        help="Seconds to wait between the batches",
+    )
+    parser.add_argument(
+        "--future_partitions",
+        type=int,
+        default=os.environ.get("MCPING_PRUNER_FUTURE_PARTITIONS", "3"),
+        help="Number of monthly partitions created ahead of the current month",
+    )
+    parser.add_argument(
+        "-l",
+        "--loop",
+        action="store_true",
+        default=os.environ.get("MCPING_PRUNER_LOOP") == "1",
+    )
+    parser.add_argument(
+        "--log_level",
+        type=int,
+        default=os.environ.get("MCPING_PRUNER_LOG_LEVEL", logging.INFO),
+    )
+    parser.add_argument(
+        "--log_file",
+        type=str,
+        default=os.environ.get("MCPING_PRUNER_LOG_FILE"),
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {APP_VERSION}"
+    )
+    args = parser.parse_args()
+
+    log_level: int = args.log_level
+    log_file: str | None = args.log_file
+    database_url: str = args.database_url
+    interval: int = args.interval
+    retention_days: int = args.retention_days
+    batch_size: int = args.batch_size
+    batch_interval: float = args.batch_interval
+    future_partitions: int = args.future_partitions
+    loop: bool = args.loop
+
+    logging.basicConfig(
+        level=log_level,
+    )
+    setup_logger(logger=logger, log_level=log_level, log_file=log_file)
+
+    config = PrunerConfig(
+        database_url=database_url,
+        interval=interval,
+        retention_days=retention_days,
+        batch_size=batch_size,
+        batch_interval=batch_interval,
+        future_partitions=future_partitions,
+    )
+
+    if loop:
+        prune_loop(config=config)
+    else:
+        prune(config=config)
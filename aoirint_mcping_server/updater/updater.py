@@ -0,0 +1,450 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import start_http_server
+from pydantic import BaseModel
+from sqlalchemy import create_engine
+
+from .. import __version__ as APP_VERSION
+from ..bedrock_updater.bedrock_updater import ping_bedrock_server
+from ..java_updater.java_updater import ping_java_server
+from ..lib.repository.bedrock_ping_record_repository import (
+    BedrockPingRecordRepository,
+    BedrockPingRecordRepositoryImpl,
+    CreateBedrockPingRecord,
+)
+from ..lib.repository.bedrock_ping_repository import (
+    BedrockPingRepository,
+    BedrockPingRepositoryImpl,
+)
+from ..lib.repository.bedrock_server_repository import (
+    BedrockServer,
+    BedrockServerRepositoryImpl,
+)
+from ..lib.repository.dns_resolver_repository import (
+    CachedDnsResolverRepositoryImpl,
+    DnsResolverRepositoryImpl,
+)
+from ..lib.repository.java_ping_record_repository import (
+    CreateJavaPingRecord,
+    JavaPingRecordRepository,
+    JavaPingRecordRepositoryImpl,
+)
+from ..lib.repository.java_ping_repository import (
+    JavaPingRepository,
+    JavaPingRepositoryImpl,
+)
+from ..lib.repository.java_server_repository import (
+    JavaServer,
+    JavaServerRepositoryImpl,
+)
+from ..lib.repository.ping_record_partition_repository import (
+    PING_RECORD_PARTITIONED_TABLES,
+    UPDATER_FUTURE_PARTITIONS,
+    PingRecordPartitionRepositoryImpl,
+)
+from ..lib.util.logging_utility import setup_logger
+from ..lib.util.metrics_utility import (
+    UPDATER_SWEEP_DURATION,
+    UPDATER_WRITE_DURATION,
+)
+from ..lib.util.ping_schedule_utility import PingScheduleConfig
+from ..lib.util.signal_utility import install_stop_signal_handlers
+from ..lib.util.update_loop_utility import run_update_loop
+
+logger = logging.Logger(name="updater")
+
+
+class UpdaterConfig(BaseModel):
+    database_url: str
+    interval: int
+    important_interval: int
+    max_backoff_interval: int
+    jitter: float
+    dns_min_ttl: int
+    dns_max_ttl: int
+    dns_negative_ttl: int
+    timeout: float
+    concurrency: int
+    metrics_host: str
+    metrics_port: int | None
+
+
+class SweepResult(BaseModel):
+    java_ping_records: list[CreateJavaPingRecord | None]
+    bedrock_ping_records: list[CreateBedrockPingRecord | None]
+
+
+def sweep(
+    executor: ThreadPoolExecutor,
+    java_ping_api: JavaPingRepository,
+    java_ping_record_api: JavaPingRecordRepository,
+    bedrock_ping_api: BedrockPingRepository,
+    bedrock_ping_record_api: BedrockPingRecordRepository,
+    java_servers: list[JavaServer],
+    bedrock_servers: list[BedrockServer],
+    timeout: float,
+) -> SweepResult:
+    """
+    Ping the servers of both editions in one executor, so that they share its
+    concurrency limit, and write their records together.
+    """
+    started_at = time.monotonic()
+
+    java_futures = [
+        executor.submit(
+            ping_java_server,
+            java_ping_api=java_ping_api,
+            java_server=java_server,
+            timeout=timeout,
+            logger=logger,
+        )
+        for java_server in java_servers
+    ]
+    bedrock_futures = [
+        executor.submit(
+            ping_bedrock_server,
+            bedrock_ping_api=bedrock_ping_api,
+            bedrock_server=bedrock_server,
+            timeout=timeout,
+            logger=logger,
+        )
+        for bedrock_server in bedrock_servers
+    ]
+    result = SweepResult(
+        java_ping_records=[java_future.result() for java_future in java_futures],
+        bedrock_ping_records=[
+            bedrock_future.result() for bedrock_future in bedrock_futures
+        ],
+    )
+    pinged_at = time.monotonic()
+
+    created_java_ping_records = [
+        ping_record
+        for ping_record in result.java_ping_records
+        if ping_record is not None
+    ]
+    created_bedrock_ping_records = [
+        ping_record
+        for ping_record in result.bedrock_ping_records
+        if ping_record is not None
+    ]
+    java_ping_record_api.create_java_ping_records(
+        ping_records=created_java_ping_records,
+    )
+    java_written_at = time.monotonic()
+    bedrock_ping_record_api.create_bedrock_ping_records(
+        ping_records=created_bedrock_ping_records,
+    )
+    written_at = time.monotonic()
+    UPDATER_WRITE_DURATION.labels(edition="java").observe(java_written_at - pinged_at)
+    UPDATER_WRITE_DURATION.labels(edition="bedrock").observe(
+        written_at - java_written_at
+    )
+    UPDATER_SWEEP_DURATION.labels(updater=logger.name).observe(written_at - started_at)
+
+    timeout_count = sum(
+        1 for ping_record in created_java_ping_records if ping_record.is_timeout
+    ) + sum(1 for ping_record in created_bedrock_ping_records if ping_record.is_timeout)
+    refused_count = sum(
+        1 for ping_record in created_java_ping_records if ping_record.is_refused
+    ) + sum(1 for ping_record in created_bedrock_ping_records if ping_record.is_refused)
+    server_count = len(java_servers) + len(bedrock_servers)
+    record_count = len(created_java_ping_records) + len(created_bedrock_ping_records)
+    logger.info(
+        f"Swept {len(java_servers)} Java and {len(bedrock_servers)} Bedrock servers "
+        f"in {written_at - started_at:.3f}s "
+        f"(ping {pinged_at - started_at:.3f}s, write {written_at - pinged_at:.3f}s): "
+        f"{record_count} records, {timeout_count} timeouts, "
+        f"{refused_count} refused, {server_count - record_count} skipped"
+    )
+
+    return result
+
+
+def update(config: UpdaterConfig) -> None:
+    engine = create_engine(url=config.database_url)
+    try:
+        dns_resolver_api = DnsResolverRepositoryImpl()
+
+        ping_record_partition_api = PingRecordPartitionRepositoryImpl(engine=engine)
+        for table in PING_RECORD_PARTITIONED_TABLES:
+            ping_record_partition_api.create_ping_record_partitions(
+                table=table,
+                months_ahead=UPDATER_FUTURE_PARTITIONS,
+            )
+
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+            sweep(
+                executor=executor,
+                java_ping_api=JavaPingRepositoryImpl(
+                    dns_resolver_api=dns_resolver_api,
+                ),
+                java_ping_record_api=JavaPingRecordRepositoryImpl(engine=engine),
+                bedrock_ping_api=BedrockPingRepositoryImpl(
+                    dns_resolver_api=dns_resolver_api,
+                ),
+                bedrock_ping_record_api=BedrockPingRecordRepositoryImpl(
+                    engine=engine,
+                ),
+                java_servers=JavaServerRepositoryImpl(
+                    engine=engine,
+                ).get_java_servers(),
+                bedrock_servers=BedrockServerRepositoryImpl(
+                    engine=engine,
+                ).get_bedrock_servers(),
+                timeout=config.timeout,
+            )
+    finally:
+        engine.dispose()
+
+
+def update_loop(config: UpdaterConfig) -> None:
+    """
+    Run as a daemon for both editions until SIGTERM or SIGINT, like the loops of
+    the Java and Bedrock updaters.
+    """
+    stop_event = threading.Event()
+    install_stop_signal_handlers(stop_event=stop_event, logger=logger)
+
+    if config.metrics_port is not None:
+        start_http_server(port=config.metrics_port, addr=config.metrics_host)
+
+    # The database is used only from this thread, one query at a time
+    engine = create_engine(url=config.database_url, pool_size=1)
+
+    java_server_api = JavaServerRepositoryImpl(engine=engine)
+    bedrock_server_api = BedrockServerRepositoryImpl(engine=engine)
+    ping_record_partition_api = PingRecordPartitionRepositoryImpl(engine=engine)
+    # Resolve each host once per TTL instead of on every ping
+    dns_resolver_api = CachedDnsResolverRepositoryImpl(
+        resolver=DnsResolverRepositoryImpl(),
+        min_ttl=config.dns_min_ttl,
+        max_ttl=config.dns_max_ttl,
+        negative_ttl=config.dns_negative_ttl,
+    )
+    java_ping_api = JavaPingRepositoryImpl(dns_resolver_api=dns_resolver_api)
+    bedrock_ping_api = BedrockPingRepositoryImpl(dns_resolver_api=dns_resolver_api)
+    java_ping_record_api = JavaPingRecordRepositoryImpl(engine=engine)
+    bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(engine=engine)
+
+    java_servers_by_id: dict[str, JavaServer] = {}
+    bedrock_servers_by_id: dict[str, BedrockServer] = {}
+
+    def reload_servers() -> dict[str, dict[str, bool]]:
+        java_servers = java_server_api.get_java_servers()
+        bedrock_servers = bedrock_server_api.get_bedrock_servers()
+        java_servers_by_id.clear()
+        java_servers_by_id.update(
+            (java_server.id, java_server) for java_server in java_servers
+        )
+        bedrock_servers_by_id.clear()
+        bedrock_servers_by_id.update(
+            (bedrock_server.id, bedrock_server) for bedrock_server in bedrock_servers
+        )
+        return {
+            "java": {
+                java_server.id: java_server.is_important for java_server in java_servers
+            },
+            "bedrock": {
+                bedrock_server.id: bedrock_server.is_important
+                for bedrock_server in bedrock_servers
+            },
+        }
+
+    logger.info("Started")
+    try:
+        with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+
+            def sweep_due_servers(
+                server_ids_by_edition: dict[str, list[str]],
+            ) -> dict[str, list[bool]]:
+                result = sweep(
+                    executor=executor,
+                    java_ping_api=java_ping_api,
+                    java_ping_record_api=java_ping_record_api,
+                    bedrock_ping_api=bedrock_ping_api,
+                    bedrock_ping_record_api=bedrock_ping_record_api,
+                    java_servers=[
+                        java_servers_by_id[server_id]
+                        for server_id in server_ids_by_edition["java"]
+                    ],
+                    bedrock_servers=[
+                        bedrock_servers_by_id[server_id]
+                        for server_id in server_ids_by_edition["bedrock"]
+                    ],
+                    timeout=config.timeout,
+                )
+                return {
+                    "java": [
+                        ping_record is None
+                        or ping_record.is_timeout
+                        or ping_record.is_refused
+                        for ping_record in result.java_ping_records
+                    ],
+                    "bedrock": [
+                        ping_record is None
+                        or ping_record.is_timeout
+                        or ping_record.is_refused
+                        for ping_record in result.bedrock_ping_records
+                    ],
+                }
+
+            run_update_loop(
+                stop_event=stop_event,
+                editions=["java", "bedrock"],
+                ping_schedule_config=PingScheduleConfig(
+                    interval=config.interval,
+                    important_interval=config.important_interval,
+                    max_backoff_interval=config.max_backoff_interval,
+                    jitter=config.jitter,
+                ),
+                ping_record_partition_api=ping_record_partition_api,
+                partitioned_tables=PING_RECORD_PARTITIONED_TABLES,
+                dns_resolver_api=dns_resolver_api,
+                reload_servers=reload_servers,
+                sweep=sweep_due_servers,
+                logger=logger,
+            )
+    finally:
+        engine.dispose()
+
+    logger.info("Stopped")
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--database_url",
+        type=str,
+        default=os.environ.get("MCPING_UPDATER_DATABASE_URL"),
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_INTERVAL", "300"),
+    )
+    parser.add_argument(
+        "--important_interval",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_IMPORTANT_INTERVAL", "60"),
+        help="Interval for the servers flagged as important",
+    )
+    parser.add_argument(
+        "--max_backoff_interval",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_MAX_BACKOFF_INTERVAL", "3600"),
+        help="Upper bound of the interval for the servers failing consecutively",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=os.environ.get("MCPING_UPDATER_JITTER", "0.1"),
+        help="Ratio of the interval to randomize",
+    )
+    parser.add_argument(
+        "--dns_min_ttl",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_DNS_MIN_TTL", "60"),
+        help="Lower bound of the seconds to cache a DNS resolution",
+    )
+    parser.add_argument(
+        "--dns_max_ttl",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_DNS_MAX_TTL", "3600"),
+        help="Upper bound of the seconds to cache a DNS resolution",
+    )
+    parser.add_argument(
+        "--dns_negative_ttl",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_DNS_NEGATIVE_TTL", "300"),
+        help="Seconds to cache a host name which does not exist",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=os.environ.get("MCPING_UPDATER_TIMEOUT", "3"),
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_CONCURRENCY", "32"),
+        help="Number of the pings in flight, shared by both editions",
+    )
+    parser.add_argument(
+        "--metrics_host",
+        type=str,
+        default=os.environ.get("MCPING_UPDATER_METRICS_HOST", "0.0.0.0"),
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_METRICS_PORT"),
+        help="Port to serve the Prometheus metrics in the loop (disabled if unset)",
+    )
+    parser.add_argument(
+        "-l",
+        "--loop",
+        action="store_true",
+        default=os.environ.get("MCPING_UPDATER_LOOP") == "1",
+    )
+    parser.add_argument(
+        "--log_level",
+        type=int,
+        default=os.environ.get("MCPING_UPDATER_LOG_LEVEL", logging.INFO),
+    )
+    parser.add_argument(
+        "--log_file",
+        type=str,
+        default=os.environ.get("MCPING_UPDATER_LOG_FILE"),
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {APP_VERSION}"
+    )
+    args = parser.parse_args()
+
+    log_level: int = args.log_level
+    log_file: str | None = args.log_file
+    database_url: str = args.database_url
+    interval: int = args.interval
+    important_interval: int = args.important_interval
+    max_backoff_interval: int = args.max_backoff_interval
+    jitter: float = args.jitter
+    dns_min_ttl: int = args.dns_min_ttl
+    dns_max_ttl: int = args.dns_max_ttl
+    dns_negative_ttl: int = args.dns_negative_ttl
+    timeout: float = args.timeout
+    concurrency: int = args.concurrency
+    metrics_host: str = args.metrics_host
+    metrics_port: int | None = args.metrics_port
+    loop: bool = args.loop
+
+    logging.basicConfig(
+        level=log_level,
+    )
+    setup_logger(logger=logger, log_level=log_level, log_file=log_file)
+
+    config = UpdaterConfig(
+        database_url=database_url,
+        interval=interval,
+        important_interval=important_interval,
+        max_backoff_interval=max_backoff_interval,
+        jitter=jitter,
+        dns_min_ttl=dns_min_ttl,
+        dns_max_ttl=dns_max_ttl,
+        dns_negative_ttl=dns_negative_ttl,
+        timeout=timeout,
+        concurrency=concurrency,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
+    )
+
+    if loop:
+        update_loop(config=config)
+    else:
+        update(config=config)
@@ -1,30 +1,308 @@
+import asyncio
+import base64
+import binascii
+import email.utils
+import hashlib
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Annotated, Any, Literal
 
+import orjson
 import uvicorn
-from fastapi import Depends, FastAPI, Header, HTTPException
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel, ValidationError, create_model
+from sqlalchemy import Engine, create_engine
 
 from .. import __version__ as APP_VERSION
 from ..lib.repository.bedrock_ping_record_repository import (
+    BEDROCK_PING_RECORD_CREATED_CHANNEL,
     BedrockPingRecord,
+    BedrockPingRecordDict,
+    BedrockPingRecordRepository,
     BedrockPingRecordRepositoryImpl,
 )
+from ..lib.repository.bedrock_ping_record_rollup_repository import (
+    BedrockPingRecordRollup,
+    BedrockPingRecordRollupGranularity,
+    BedrockPingRecordRollupRepository,
+    BedrockPingRecordRollupRepositoryImpl,
+)
 from ..lib.repository.bedrock_server_repository import (
     BedrockServer,
+    BedrockServerRepository,
     BedrockServerRepositoryImpl,
 )
+from ..lib.repository.bedrock_server_status_repository import (
+    BedrockServerStatus,
+    BedrockServerStatusRepository,
+    BedrockServerStatusRepositoryImpl,
+)
+from ..lib.repository.java_favicon_repository import (
+    JavaFaviconRepository,
+    JavaFaviconRepositoryImpl,
+)
 from ..lib.repository.java_ping_record_repository import (
+    JAVA_PING_RECORD_CREATED_CHANNEL,
     JavaPingRecord,
+    JavaPingRecordDict,
+    JavaPingRecordRepository,
     JavaPingRecordRepositoryImpl,
 )
-from ..lib.repository.java_server_repository import JavaServer, JavaServerRepositoryImpl
+from ..lib.repository.java_ping_record_rollup_repository import (
+    JavaPingRecordRollup,
+    JavaPingRecordRollupGranularity,
+    JavaPingRecordRollupRepository,
+    JavaPingRecordRollupRepositoryImpl,
+)
+from ..lib.repository.java_server_repository import (
+    JavaServer,
+    JavaServerRepository,
+    JavaServerRepositoryImpl,
+)
+from ..lib.repository.java_server_status_repository import (
+    JavaServerStatus,
+    JavaServerStatusRepository,
+    JavaServerStatusRepositoryImpl,
+)
+from ..lib.util.compression_utility import CompressionMiddleware
+from ..lib.util.data_url_utility import DataUrl, DataUrlParseError, parse_data_url
+from ..lib.util.event_broadcast_utility import EventBroadcaster
 from ..lib.util.logging_utility import setup_logger
+from ..lib.util.metrics_utility import HTTP_REQUEST_DURATION
+from ..lib.util.postgres_notification_utility import (
+    PostgresNotification,
+    PostgresNotificationListener,
+)
+from ..lib.util.ttl_cache_utility import TtlCache
 
 logger = logging.Logger(name="web_api")
 
 FASTAPI_HEADER_NONE: str | None = Header(None)
 
+ROLLUP_BUCKET_INTERVALS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+def as_utc(value: datetime) -> datetime:
+    """
+    Treat a datetime without a timezone (e.g. "2026-10-10T00:00:00") as UTC.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+# Number of decoded favicon images kept in memory
+FAVICON_CACHE_SIZE = 1024
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def is_etag_matched(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # If-None-Match uses the weak comparison
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+
+    return False
+
+
+def is_modified_since_matched(
+    if_modified_since: str | None,
+    last_modified: datetime | None,
+) -> bool:
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        modified_since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        # An invalid date is ignored
+        return False
+
+    if modified_since.tzinfo is None:
+        modified_since = modified_since.replace(tzinfo=UTC)
+
+    # HTTP dates have a precision of one second
+    return last_modified.replace(microsecond=0) <= modified_since
+
+
+def is_not_modified(
+    if_none_match: str | None,
+    if_modified_since: str | None,
+    etag: str,
+    last_modified: datetime | None,
+) -> bool:
+    # If-Modified-Since is ignored when If-None-Match is given
+    if if_none_match is not None:
+        return is_etag_matched(if_none_match=if_none_match, etag=etag)
+
+    return is_modified_since_matched(
+        if_modified_since=if_modified_since,
+        last_modified=last_modified,
+    )
+
+
+def create_etag(parts: list[str]) -> str:
+    digest = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def create_conditional_headers(
+    etag: str,
+    last_modified: datetime | None,
+) -> dict[str, str]:
+    # The clients revalidate on every use, which costs a 304 without a body
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = email.utils.format_datetime(
+            last_modified.astimezone(UTC),
+            usegmt=True,
+        )
+
+    return headers
+
+
+# Send a comment at this interval so that proxies keep idle streams open
+STREAM_KEEPALIVE_INTERVAL = 15.0
+
+# The streams stay open until the clients disconnect, so they are cut after this
+# timeout on shutdown
+GRACEFUL_SHUTDOWN_TIMEOUT = 10
+
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Disable the response buffering of nginx
+    "X-Accel-Buffering": "no",
+}
+
+
+async def iterate_ping_record_events(
+    broadcaster: EventBroadcaster[dict[str, Any]],
+    event_name: str,
+    get_server_id: Callable[[dict[str, Any]], str],
+    server_id: str | None,
+) -> AsyncIterator[str]:
+    """
+    Yield the published ping records as Server-Sent Events, optionally only
+    those of one server.
+
+    The stream ends when the subscriber falls behind or the app shuts down, and
+    EventSource reconnects by itself.
+    """
+    subscription = broadcaster.subscribe()
+    try:
+        yield ": connected\n\n"
+
+        while True:
+            try:
+                record = await asyncio.wait_for(
+                    subscription.get(),
+                    timeout=STREAM_KEEPALIVE_INTERVAL,
+                )
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if record is None:
+                break
+
+            if server_id is not None and get_server_id(record) != server_id:
+                continue
+
+            yield (
+                f"event: {event_name}\n"
+                f"id: {record['id']}\n"
+                f"data: {orjson.dumps(record).decode()}\n\n"
+            )
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+class PingRecordCursor(BaseModel):
+    created_at: datetime
+    id: str
+
+
+def encode_ping_record_cursor(created_at: datetime, id: str) -> str:
+    cursor = PingRecordCursor(created_at=created_at, id=id)
+    return base64.urlsafe_b64encode(cursor.model_dump_json().encode("utf-8")).decode(
+        "ascii"
+    )
+
+
+def decode_ping_record_cursor(cursor: str) -> PingRecordCursor:
+    try:
+        return PingRecordCursor.model_validate_json(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+    except (binascii.Error, UnicodeError, ValidationError) as error:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from error
+
+
+# "columns" returns an array per field instead of an object per record, which
+# repeats no field name and loads directly into the plotting libraries
+HistoryFormat = Literal["records", "columns"]
+
+
+def create_columns_model(model: type[BaseModel]) -> type[BaseModel]:
+    """
+    Create the model of the records of "model" in the "columns" format, for the
+    OpenAPI schema. The fields are optional since "fields" selects them.
+    """
+    field_definitions: dict[str, Any] = {
+        name: (list[field.annotation] | None, None)  # type: ignore[name-defined]
+        for name, field in model.model_fields.items()
+    }
+    return create_model(f"{model.__name__}Columns", **field_definitions)
+
+
+def parse_columns_fields(model: type[BaseModel], fields: str | None) -> list[str]:
+    """
+    Parse the comma-separated fields to return in the "columns" format, all the
+    fields of "model" when not given.
+    """
+    if fields is None:
+        return list(model.model_fields)
+
+    columns_fields = [field.strip() for field in fields.split(",")]
+    unknown_fields = [
+        field for field in columns_fields if field not in model.model_fields
+    ]
+    if len(unknown_fields) > 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown_fields)}",
+        )
+
+    return columns_fields
+
+
+def transpose_records(
+    records: Sequence[Mapping[str, Any]],
+    fields: list[str],
+) -> dict[str, list[Any]]:
+    return {field: [record[field] for record in records] for field in fields}
+
 
 class WebApiConfig(BaseModel):
     host: str
@@ -33,15 +311,298 @@ class WebApiConfig(BaseModel):
     read_api_key: str | None
     write_api_key: str | None
     max_latest_count: int
+    max_range_count: int
     database_url: str
+    database_pool_size: int
+    database_max_overflow: int
+    database_pool_pre_ping: bool
+    database_pool_recycle: int
+    favicon_max_age: int
+    latest_cache_ttl: float
+    latest_cache_size: int
+    stream_queue_size: int
+    compression_minimum_size: int
+    gzip_level: int
+    brotli_quality: int
 
 
 def create_asgi_app(config: WebApiConfig) -> FastAPI:
+    # Latest ping records per server, keyed by the query parameters. The updaters
+    # NOTIFY the servers they wrote, and the TTL bounds the staleness when the
+    # notifications are missed.
+    bedrock_latest_cache: TtlCache[str, int, list[BedrockPingRecordDict]] = TtlCache(
+        ttl=config.latest_cache_ttl,
+        max_size=config.latest_cache_size,
+    )
+    java_latest_cache: TtlCache[str, tuple[int, bool], list[JavaPingRecordDict]] = (
+        TtlCache(
+            ttl=config.latest_cache_ttl,
+            max_size=config.latest_cache_size,
+        )
+    )
+
+    def on_ping_record_created(notification: PostgresNotification) -> None:
+        if notification.channel == BEDROCK_PING_RECORD_CREATED_CHANNEL:
+            bedrock_latest_cache.invalidate(notification.payload)
+        elif notification.channel == JAVA_PING_RECORD_CREATED_CHANNEL:
+            java_latest_cache.invalidate(notification.payload)
+
+    def on_notification_listener_connect() -> None:
+        # Notifications may have been missed while disconnected
+        bedrock_latest_cache.clear()
+        java_latest_cache.clear()
+
+    # New ping records pushed to the stream subscribers. Each notification is read
+    # once per process, not once per subscriber.
+    bedrock_ping_record_broadcaster: EventBroadcaster[BedrockPingRecordDict] = (
+        EventBroadcaster(max_queue_size=config.stream_queue_size)
+    )
+    java_ping_record_broadcaster: EventBroadcaster[JavaPingRecordDict] = (
+        EventBroadcaster(max_queue_size=config.stream_queue_size)
+    )
+    # Skip re-reading the same latest record on close notifications of one server
+    last_published_ping_record_ids: dict[tuple[str, str], str] = {}
+    # The servers whose latest record is waiting for the publisher worker. The
+    # notifications of a server arriving while it waits are merged into one read.
+    pending_publish_keys: set[tuple[str, str]] = set()
+    pending_publish_keys_lock = threading.Lock()
+
+    def submit_ping_record_created(
+        executor: ThreadPoolExecutor,
+        engine: Engine,
+        notification: PostgresNotification,
+    ) -> None:
+        # Called in the listener thread, which must not wait for the database to
+        # keep dispatching the notifications (and invalidating the caches)
+        key = (notification.channel, notification.payload)
+        with pending_publish_keys_lock:
+            if key in pending_publish_keys:
+                return
+
+            pending_publish_keys.add(key)
+
+        executor.submit(
+            publish_ping_record_created,
+            engine=engine,
+            notification=notification,
+        )
+
+    def publish_ping_record_created(
+        engine: Engine,
+        notification: PostgresNotification,
+    ) -> None:
+        # Called in the single publisher worker, which keeps the events of each
+        # server in order. The notifications arriving from here are read again.
+        with pending_publish_keys_lock:
+            pending_publish_keys.discard((notification.channel, notification.payload))
+
+        try:
+            publish_latest_ping_record(engine=engine, notification=notification)
+        except Exception:
+            logger.exception("Failed to publish a ping record")
+
+    def publish_latest_ping_record(
+        engine: Engine,
+        notification: PostgresNotification,
+    ) -> None:
+        # Read after the cache invalidation, so the records read here are fresh and
+        # fill the cache again
+        if (
+            notification.channel == BEDROCK_PING_RECORD_CREATED_CHANNEL
+            and bedrock_ping_record_broadcaster.has_subscribers()
+        ):
+            bedrock_records = get_latest_bedrock_ping_records(
+                bedrock_ping_record_api=BedrockPingRecordRepositoryImpl(engine=engine),
+                bedrock_server_id=notification.payload,
+                count=1,
+            )
+            for bedrock_record in bedrock_records:
+                key = (notification.channel, notification.payload)
+                if last_published_ping_record_ids.get(key) == bedrock_record["id"]:
+                    continue
+
+                last_published_ping_record_ids[key] = bedrock_record["id"]
+                bedrock_ping_record_broadcaster.publish(bedrock_record)
+        elif (
+            notification.channel == JAVA_PING_RECORD_CREATED_CHANNEL
+            and java_ping_record_broadcaster.has_subscribers()
+        ):
+            # Favicons are omitted to keep the events small. Use the favicon_hash
+            # and /java_server/{id}/favicon.png.
+            java_records = get_latest_java_ping_records(
+                java_ping_record_api=JavaPingRecordRepositoryImpl(engine=engine),
+                java_server_id=notification.payload,
+                count=1,
+                include_favicon=False,
+            )
+            for java_record in java_records:
+                key = (notification.channel, notification.payload)
+                if last_published_ping_record_ids.get(key) == java_record["id"]:
+                    continue
+
+                last_published_ping_record_ids[key] = java_record["id"]
+                java_ping_record_broadcaster.publish(java_record)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Share one engine (and its connection pool) across all requests
+        engine = create_engine(
+            url=config.database_url,
+            pool_size=config.database_pool_size,
+            max_overflow=config.database_max_overflow,
+            pool_pre_ping=config.database_pool_pre_ping,
+            pool_recycle=config.database_pool_recycle,
+        )
+        app.state.engine = engine
+
+        notification_listener = PostgresNotificationListener(
+            database_url=config.database_url,
+            channels=[
+                BEDROCK_PING_RECORD_CREATED_CHANNEL,
+                JAVA_PING_RECORD_CREATED_CHANNEL,
+            ],
+            logger=logger,
+        )
+        ping_record_publisher = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="ping_record_publisher",
+        )
+
+        notification_listener.subscribe(on_ping_record_created)
+        notification_listener.subscribe(
+            lambda notification: submit_ping_record_created(
+                executor=ping_record_publisher,
+                engine=engine,
+                notification=notification,
+            )
+        )
+        notification_listener.subscribe_connect(on_notification_listener_connect)
+        notification_listener.start()
+        app.state.notification_listener = notification_listener
+
+        try:
+            yield
+        finally:
+            bedrock_ping_record_broadcaster.close()
+            java_ping_record_broadcaster.close()
+            notification_listener.stop()
+            ping_record_publisher.shutdown(cancel_futures=True)
+            engine.dispose()
+
     app = FastAPI(
         title="aoirint_mcping_server Web API",
         version=APP_VERSION,
+        lifespan=lifespan,
     )
 
+    # Added before the duration middleware, which then includes the compression
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=config.compression_minimum_size,
+        gzip_level=config.gzip_level,
+        brotli_quality=config.brotli_quality,
+    )
+
+    @app.middleware("http")
+    async def observe_request_duration(
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        started_at = time.perf_counter()
+        status_code = 500
+        try:
+            # Returns when the headers are ready, so the streams are measured to
+            # their first byte, not to their end
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # Label by the route template, not the path, to bound the series
+            route = request.scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=request.method,
+                route=route.path if isinstance(route, APIRoute) else "unmatched",
+                status_code=str(status_code),
+            ).observe(time.perf_counter() - started_at)
+
+    def get_engine(request: Request) -> Engine:
+        engine: Engine = request.app.state.engine
+        return engine
+
+    def get_bedrock_server_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> BedrockServerRepository:
+        return BedrockServerRepositoryImpl(engine=engine)
+
+    def get_bedrock_ping_record_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> BedrockPingRecordRepository:
+        return BedrockPingRecordRepositoryImpl(engine=engine)
+
+    def get_bedrock_ping_record_rollup_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> BedrockPingRecordRollupRepository:
+        return BedrockPingRecordRollupRepositoryImpl(engine=engine)
+
+    def get_java_server_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> JavaServerRepository:
+        return JavaServerRepositoryImpl(engine=engine)
+
+    def get_java_ping_record_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> JavaPingRecordRepository:
+        return JavaPingRecordRepositoryImpl(engine=engine)
+
+    def get_java_ping_record_rollup_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> JavaPingRecordRollupRepository:
+        return JavaPingRecordRollupRepositoryImpl(engine=engine)
+
+    def get_bedrock_server_status_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> BedrockServerStatusRepository:
+        return BedrockServerStatusRepositoryImpl(engine=engine)
+
+    def get_java_server_status_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> JavaServerStatusRepository:
+        return JavaServerStatusRepositoryImpl(engine=engine)
+
+    def get_java_favicon_api(
+        engine: Annotated[Engine, Depends(get_engine)],
+    ) -> JavaFaviconRepository:
+        return JavaFaviconRepositoryImpl(engine=engine)
+
+    BedrockServerApi = Annotated[
+        BedrockServerRepository, Depends(get_bedrock_server_api)
+    ]
+    BedrockPingRecordApi = Annotated[
+        BedrockPingRecordRepository, Depends(get_bedrock_ping_record_api)
+    ]
+    BedrockPingRecordRollupApi = Annotated[
+        BedrockPingRecordRollupRepository,
+        Depends(get_bedrock_ping_record_rollup_api),
+    ]
+    JavaServerApi = Annotated[JavaServerRepository, Depends(get_java_server_api)]
+    JavaPingRecordApi = Annotated[
+        JavaPingRecordRepository, Depends(get_java_ping_record_api)
+    ]
+    JavaPingRecordRollupApi = Annotated[
+        JavaPingRecordRollupRepository, Depends(get_java_ping_record_rollup_api)
+    ]
+    JavaFaviconApi = Annotated[JavaFaviconRepository, Depends(get_java_favicon_api)]
+    BedrockServerStatusApi = Annotated[
+        BedrockServerStatusRepository, Depends(get_bedrock_server_status_api)
+    ]
+    JavaServerStatusApi = Annotated[
+        JavaServerStatusRepository, Depends(get_java_server_status_api)
+    ]
+
+    # Decoded favicon images keyed by the favicon hash (LRU)
+    favicon_image_cache: OrderedDict[str, DataUrl] = OrderedDict()
+    favicon_image_cache_lock = threading.Lock()
+
     async def verify_read_api_key(
         x_read_api_key: str | None = FASTAPI_HEADER_NONE,
     ) -> str | None:
@@ -66,15 +627,42 @@ def create_asgi_app(config: WebApiConfig) -> FastAPI:
             )
         return x_write_api_key
 
+    # Handlers calling the synchronous repositories are declared with plain `def`
+    # so that FastAPI runs them in its thread pool instead of the event loop.
+
     @app.post(
         "/bedrock_server/list",
         response_model=list[BedrockServer],
         dependencies=[Depends(verify_read_api_key)],
     )
-    async def bedrock_server_list() -> list[BedrockServer]:
-        bedrock_server_api = BedrockServerRepositoryImpl(
-            database_url=config.database_url
+    def bedrock_server_list(
+        bedrock_server_api: BedrockServerApi,
+    ) -> list[BedrockServer]:
+        return bedrock_server_api.get_bedrock_servers()
+
+    @app.get(
+        "/bedrock_server/list",
+        response_model=list[BedrockServer],
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def bedrock_server_list_get(
+        bedrock_server_api: BedrockServerApi,
+        response: Response,
+        if_none_match: Annotated[str | None, Header()] = None,
+    ) -> list[BedrockServer] | Response:
+        list_version = bedrock_server_api.get_bedrock_server_list_version()
+
+        # No Last-Modified because a delete does not advance any timestamp
+        headers = create_conditional_headers(
+            etag=create_etag(
+                [str(list_version.count), list_version.last_updated_at or ""]
+            ),
+            last_modified=None,
         )
+        if is_etag_matched(if_none_match=if_none_match, etag=headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        response.headers.update(headers)
         return bedrock_server_api.get_bedrock_servers()
 
     @app.post(
@@ -82,18 +670,18 @@ def create_asgi_app(config: WebApiConfig) -> FastAPI:
         response_model=BedrockServer,
         dependencies=[Depends(verify_write_api_key)],
     )
-    async def bedrock_server_create(
+    def bedrock_server_create(
+        bedrock_server_api: BedrockServerApi,
         name: str,
         host: str,
         port: int,
+        is_important: bool = False,
     ) -> BedrockServer:
-        bedrock_server_api = BedrockServerRepositoryImpl(
-            database_url=config.database_url
-        )
         return bedrock_server_api.create_bedrock_server(
             name=name,
             host=host,
             port=port,
+            is_important=is_important,
         )
 
     @app.post(
@@ -101,20 +689,23 @@ def create_asgi_app(config: WebApiConfig) -> FastAPI:
         response_model=BedrockServer,
         dependencies=[Depends(verify_write_api_key)],
     )
-    async def bedrock_server_update(
+    def bedrock_server_update(
+        bedrock_server_api: BedrockServerApi,
         id: str,
         name: str,
         host: str,
         port: int,
+        is_important: bool | None = None,
     ) -> BedrockServer:
-        bedrock_server_api = BedrockServerRepositoryImpl(
-            database_url=config.database_url
-        )
+        """
+        is_important is kept as is when not given.
+        """
         return bedrock_server_api.update_bedrock_server(
             id=id,
             name=name,
             host=host,
             port=port,
+            is_important=is_important,
         )
 
     class DeleteBedrockServerResponse(BaseModel):
@@ -125,48 +716,297 @@ def create_asgi_app(config: WebApiConfig) -> FastAPI:
         response_model=DeleteBedrockServerResponse,
         dependencies=[Depends(verify_write_api_key)],
     )
-    async def bedrock_server_delete(
+    def bedrock_server_delete(
+        bedrock_server_api: BedrockServerApi,
         id: str,
     ) -> DeleteBedrockServerResponse:
-        bedrock_server_api = BedrockServerRepositoryImpl(
-            database_url=config.database_url
+        deleted_id = bedrock_server_api.delete_bedrock_server(
+            id=id,
         )
+        bedrock_latest_cache.invalidate(deleted_id)
+
         return DeleteBedrockServerResponse(
-            id=bedrock_server_api.delete_bedrock_server(
-                id=id,
-            ),
+            id=deleted_id,
         )
 
+    # The ping record endpoints encode the plain dicts from the repositories with
+    # orjson, skipping the validation and the serialization through the models,
+    # which would copy every record several times on large responses. The models
+    # are kept as the response_model for the OpenAPI schema only.
+    def get_latest_bedrock_ping_records(
+        bedrock_ping_record_api: BedrockPingRecordRepository,
+        bedrock_server_id: str,
+        count: int,
+    ) -> list[BedrockPingRecordDict]:
+        if count > config.max_latest_count:
+            raise Exception(
+                f'"count" must be less than or equal to {config.max_latest_count}'
+            )
+
+        records = bedrock_latest_cache.get(bedrock_server_id, count)
+        if records is not None:
+            return records
+
+        cache_version = bedrock_latest_cache.version
+        records = bedrock_ping_record_api.get_latest_bedrock_ping_record_dicts(
+            bedrock_server_id=bedrock_server_id,
+            count=count,
+        )
+        bedrock_latest_cache.set(
+            bedrock_server_id, count, records, version=cache_version
+        )
+
+        return records
+
     @app.post(
         "/bedrock_ping_record/latest",
         response_model=list[BedrockPingRecord],
         dependencies=[Depends(verify_read_api_key)],
     )
-    async def bedrock_ping_record_latest(
+    def bedrock_ping_record_latest(
+        bedrock_ping_record_api: BedrockPingRecordApi,
         bedrock_server_id: str,
         count: int = 5,
-    ) -> list[BedrockPingRecord]:
-        if count > config.max_latest_count:
-            raise Exception(
-                f'"count" must be less than or equal to {config.max_latest_count}'
+    ) -> Response:
+        return ORJSONResponse(
+            content=get_latest_bedrock_ping_records(
+                bedrock_ping_record_api=bedrock_ping_record_api,
+                bedrock_server_id=bedrock_server_id,
+                count=count,
+            ),
+        )
+
+    @app.get(
+        "/bedrock_ping_record/latest",
+        response_model=list[BedrockPingRecord],
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def bedrock_ping_record_latest_get(
+        bedrock_ping_record_api: BedrockPingRecordApi,
+        bedrock_server_id: str,
+        count: int = 5,
+        if_none_match: Annotated[str | None, Header()] = None,
+        if_modified_since: Annotated[str | None, Header()] = None,
+    ) -> Response:
+        records = get_latest_bedrock_ping_records(
+            bedrock_ping_record_api=bedrock_ping_record_api,
+            bedrock_server_id=bedrock_server_id,
+            count=count,
+        )
+
+        # Ping records are never updated, so the ids identify the content
+        last_modified = records[0]["created_at"] if len(records) > 0 else None
+        headers = create_conditional_headers(
+            etag=create_etag([record["id"] for record in records]),
+            last_modified=last_modified,
+        )
+        if is_not_modified(
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+            etag=headers["ETag"],
+            last_modified=last_modified,
+        ):
+            return Response(status_code=304, headers=headers)
+
+        return ORJSONResponse(content=records, headers=headers)
+
+    @app.get(
+        "/bedrock_ping_record/stream",
+        response_class=StreamingResponse,
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    async def bedrock_ping_record_stream(
+        bedrock_server_id: str | None = None,
+    ) -> StreamingResponse:
+        """
+        Server-Sent Events of the new ping records, of all the servers when
+        bedrock_server_id is not given.
+        """
+        return StreamingResponse(
+            content=iterate_ping_record_events(
+                broadcaster=bedrock_ping_record_broadcaster,
+                event_name="bedrock_ping_record",
+                get_server_id=lambda record: record["bedrock_server_id"],
+                server_id=bedrock_server_id,
+            ),
+            media_type="text/event-stream",
+            headers=STREAM_HEADERS,
+        )
+
+    class BedrockPingRecordRangeResponse(BaseModel):
+        records: list[BedrockPingRecord]
+        next_cursor: str | None
+
+    BedrockPingRecordRangeColumnsResponse = create_model(
+        "BedrockPingRecordRangeColumnsResponse",
+        columns=(create_columns_model(BedrockPingRecord), ...),
+        next_cursor=(str | None, ...),
+    )
+
+    @app.post(
+        "/bedrock_ping_record/range",
+        response_model=(
+            BedrockPingRecordRangeResponse | BedrockPingRecordRangeColumnsResponse
+        ),
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def bedrock_ping_record_range(
+        bedrock_ping_record_api: BedrockPingRecordApi,
+        bedrock_server_id: str,
+        since: datetime,
+        until: datetime | None = None,
+        cursor: str | None = None,
+        count: int = 100,
+        format: HistoryFormat = "records",
+        fields: str | None = None,
+    ) -> Response:
+        """
+        Ping records in the range, from the oldest. Follow "next_cursor" for the
+        next page. The "columns" format returns the comma-separated "fields" (all
+        by default) as arrays.
+        """
+        if count > config.max_range_count:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f'"count" must be less than or equal to {config.max_range_count}'
+                ),
             )
 
-        bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(
-            database_url=config.database_url
+        columns_fields = (
+            parse_columns_fields(model=BedrockPingRecord, fields=fields)
+            if format == "columns"
+            else None
         )
 
-        return bedrock_ping_record_api.get_latest_bedrock_ping_record(
+        after = decode_ping_record_cursor(cursor) if cursor is not None else None
+
+        # Fetch one more record to know whether the next page exists
+        records = bedrock_ping_record_api.get_bedrock_ping_records_in_range_dicts(
             bedrock_server_id=bedrock_server_id,
-            count=count,
+            since=as_utc(since),
+            until=as_utc(until) if until is not None else datetime.now(UTC),
+            after_created_at=after.created_at if after is not None else None,
+            after_id=after.id if after is not None else None,
+            count=count + 1,
+        )
+
+        next_cursor: str | None = None
+        if len(records) > count:
+            records = records[:count]
+            next_cursor = encode_ping_record_cursor(
+                created_at=records[-1]["created_at"],
+                id=records[-1]["id"],
+            )
+
+        if columns_fields is not None:
+            return ORJSONResponse(
+                content={
+                    "columns": transpose_records(
+                        records=records,
+                        fields=columns_fields,
+                    ),
+                    "next_cursor": next_cursor,
+                },
+            )
+
+        return ORJSONResponse(
+            content={
+                "records": records,
+                "next_cursor": next_cursor,
+            },
+        )
+
+    BedrockPingRecordRollupColumns = create_columns_model(BedrockPingRecordRollup)
+
+    @app.post(
+        "/bedrock_ping_record/rollup",
+        response_model=list[BedrockPingRecordRollup] | BedrockPingRecordRollupColumns,
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def bedrock_ping_record_rollup(
+        bedrock_ping_record_rollup_api: BedrockPingRecordRollupApi,
+        bedrock_server_id: str,
+        granularity: BedrockPingRecordRollupGranularity,
+        since: datetime,
+        until: datetime | None = None,
+        format: HistoryFormat = "records",
+        fields: str | None = None,
+    ) -> list[BedrockPingRecordRollup] | Response:
+        """
+        The "columns" format returns the comma-separated "fields" (all by default)
+        as arrays.
+        """
+        columns_fields = (
+            parse_columns_fields(model=BedrockPingRecordRollup, fields=fields)
+            if format == "columns"
+            else None
         )
 
+        since = as_utc(since)
+        until = as_utc(until) if until is not None else datetime.now(UTC)
+
+        if (until - since) / ROLLUP_BUCKET_INTERVALS[granularity] > (
+            config.max_range_count
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"The range must contain at most {config.max_range_count} "
+                    f'"{granularity}" buckets'
+                ),
+            )
+
+        rollups = bedrock_ping_record_rollup_api.get_bedrock_ping_record_rollups(
+            bedrock_server_id=bedrock_server_id,
+            granularity=granularity,
+            since=since,
+            until=until,
+        )
+
+        if columns_fields is not None:
+            return ORJSONResponse(
+                content=transpose_records(
+                    records=[rollup.model_dump() for rollup in rollups],
+                    fields=columns_fields,
+                ),
+            )
+
+        return rollups
+
     @app.post(
         "/java_server/list",
         response_model=list[JavaServer],
         dependencies=[Depends(verify_read_api_key)],
     )
-    async def java_server_list() -> list[JavaServer]:
-        java_server_api = JavaServerRepositoryImpl(database_url=config.database_url)
+    def java_server_list(
+        java_server_api: JavaServerApi,
+    ) -> list[JavaServer]:
+        return java_server_api.get_java_servers()
+
+    @app.get(
+        "/java_server/list",
+        response_model=list[JavaServer],
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def java_server_list_get(
+        java_server_api: JavaServerApi,
+        response: Response,
+        if_none_match: Annotated[str | None, Header()] = None,
+    ) -> list[JavaServer] | Response:
+        list_version = java_server_api.get_java_server_list_version()
+
+        # No Last-Modified because a delete does not advance any timestamp
+        headers = create_conditional_headers(
+            etag=create_etag(
+                [str(list_version.count), list_version.last_updated_at or ""]
+            ),
+            last_modified=None,
+        )
+        if is_etag_matched(if_none_match=if_none_match, etag=headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        response.headers.update(headers)
         return java_server_api.get_java_servers()
 
     @app.post(
@@ -174,16 +1014,18 @@ def create_asgi_app(config: WebApiConfig) -> FastAPI:
         response_model=JavaServer,
         dependencies=[Depends(verify_write_api_key)],
     )
-    async def java_server_create(
+    def java_server_create(
+        java_server_api: JavaServerApi,
         name: str,
         host: str,
         port: int,
+        is_important: bool = False,
     ) -> JavaServer:
-        java_server_api = JavaServerRepositoryImpl(database_url=config.database_url)
         return java_server_api.create_java_server(
             name=name,
             host=host,
             port=port,
+            is_important=is_important,
         )
 
     @app.post(
@@ -191,18 +1033,23 @@ def create_asgi_app(config: WebApiConfig) -> FastAPI:
         response_model=JavaServer,
         dependencies=[Depends(verify_write_api_key)],
     )
-    async def java_server_update(
+    def java_server_update(
+        java_server_api: JavaServerApi,
         id: str,
         name: str,
         host: str,
         port: int,
+        is_important: bool | None = None,
     ) -> JavaServer:
-        java_server_api = JavaServerRepositoryImpl(database_url=config.database_url)
+        """
+        is_important is kept as is when not given.
+        """
         return java_server_api.update_java_server(
             id=id,
             name=name,
             host=host,
             port=port,
+            is_important=is_important,
         )
 
     class DeleteJavaServerResponse(BaseModel):
@@ -213,39 +1060,385 @@ def create_asgi_app(config: WebApiConfig) -> FastAPI:
         response_model=DeleteJavaServerResponse,
         dependencies=[Depends(verify_write_api_key)],
     )
-    async def java_server_delete(
+    def java_server_delete(
+        java_server_api: JavaServerApi,
         id: str,
     ) -> DeleteJavaServerResponse:
-        java_server_api = JavaServerRepositoryImpl(database_url=config.database_url)
+        deleted_id = java_server_api.delete_java_server(
+            id=id,
+        )
+        java_latest_cache.invalidate(deleted_id)
+
         return DeleteJavaServerResponse(
-            id=java_server_api.delete_java_server(
-                id=id,
+            id=deleted_id,
+        )
+
+    def get_latest_java_ping_records(
+        java_ping_record_api: JavaPingRecordRepository,
+        java_server_id: str,
+        count: int,
+        include_favicon: bool,
+    ) -> list[JavaPingRecordDict]:
+        if count > config.max_latest_count:
+            raise Exception(
+                f'"count" must be less than or equal to {config.max_latest_count}'
             )
+
+        records = java_latest_cache.get(java_server_id, (count, include_favicon))
+        if records is not None:
+            return records
+
+        cache_version = java_latest_cache.version
+        records = java_ping_record_api.get_latest_java_ping_record_dicts(
+            java_server_id=java_server_id,
+            count=count,
+            include_favicon=include_favicon,
+        )
+        java_latest_cache.set(
+            java_server_id, (count, include_favicon), records, version=cache_version
         )
 
+        return records
+
     @app.post(
         "/java_ping_record/latest",
         response_model=list[JavaPingRecord],
         dependencies=[Depends(verify_read_api_key)],
     )
-    async def java_ping_record_latest(
+    def java_ping_record_latest(
+        java_ping_record_api: JavaPingRecordApi,
         java_server_id: str,
         count: int = 5,
-    ) -> list[JavaPingRecord]:
-        if count > config.max_latest_count:
-            raise Exception(
-                f'"count" must be less than or equal to {config.max_latest_count}'
+        include_favicon: bool = True,
+    ) -> Response:
+        return ORJSONResponse(
+            content=get_latest_java_ping_records(
+                java_ping_record_api=java_ping_record_api,
+                java_server_id=java_server_id,
+                count=count,
+                include_favicon=include_favicon,
+            ),
+        )
+
+    @app.get(
+        "/java_ping_record/latest",
+        response_model=list[JavaPingRecord],
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def java_ping_record_latest_get(
+        java_ping_record_api: JavaPingRecordApi,
+        java_server_id: str,
+        count: int = 5,
+        include_favicon: bool = True,
+        if_none_match: Annotated[str | None, Header()] = None,
+        if_modified_since: Annotated[str | None, Header()] = None,
+    ) -> Response:
+        records = get_latest_java_ping_records(
+            java_ping_record_api=java_ping_record_api,
+            java_server_id=java_server_id,
+            count=count,
+            include_favicon=include_favicon,
+        )
+
+        # Ping records are never updated, so the ids identify the content
+        last_modified = records[0]["created_at"] if len(records) > 0 else None
+        headers = create_conditional_headers(
+            etag=create_etag([record["id"] for record in records]),
+            last_modified=last_modified,
+        )
+        if is_not_modified(
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+            etag=headers["ETag"],
+            last_modified=last_modified,
+        ):
+            return Response(status_code=304, headers=headers)
+
+        return ORJSONResponse(content=records, headers=headers)
+
+    @app.get(
+        "/java_ping_record/stream",
+        response_class=StreamingResponse,
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    async def java_ping_record_stream(
+        java_server_id: str | None = None,
+    ) -> StreamingResponse:
+        """
+        Server-Sent Events of the new ping records without favicons, of all the
+        servers when java_server_id is not given.
+        """
+        return StreamingResponse(
+            content=iterate_ping_record_events(
+                broadcaster=java_ping_record_broadcaster,
+                event_name="java_ping_record",
+                get_server_id=lambda record: record["java_server_id"],
+                server_id=java_server_id,
+            ),
+            media_type="text/event-stream",
+            headers=STREAM_HEADERS,
+        )
+
+    class JavaPingRecordRangeResponse(BaseModel):
+        records: list[JavaPingRecord]
+        next_cursor: str | None
+
+    JavaPingRecordRangeColumnsResponse = create_model(
+        "JavaPingRecordRangeColumnsResponse",
+        columns=(create_columns_model(JavaPingRecord), ...),
+        next_cursor=(str | None, ...),
+    )
+
+    @app.post(
+        "/java_ping_record/range",
+        response_model=(
+            JavaPingRecordRangeResponse | JavaPingRecordRangeColumnsResponse
+        ),
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def java_ping_record_range(
+        java_ping_record_api: JavaPingRecordApi,
+        java_server_id: str,
+        since: datetime,
+        until: datetime | None = None,
+        cursor: str | None = None,
+        count: int = 100,
+        include_favicon: bool = False,
+        format: HistoryFormat = "records",
+        fields: str | None = None,
+    ) -> Response:
+        """
+        Ping records in the range, from the oldest. Follow "next_cursor" for the
+        next page. The "columns" format returns the comma-separated "fields" (all
+        by default) as arrays.
+        """
+        if count > config.max_range_count:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f'"count" must be less than or equal to {config.max_range_count}'
+                ),
             )
 
-        java_ping_record_api = JavaPingRecordRepositoryImpl(
-            database_url=config.database_url
+        columns_fields = (
+            parse_columns_fields(model=JavaPingRecord, fields=fields)
+            if format == "columns"
+            else None
         )
 
-        return java_ping_record_api.get_latest_java_ping_record(
+        after = decode_ping_record_cursor(cursor) if cursor is not None else None
+
+        # Fetch one more record to know whether the next page exists
+        records = java_ping_record_api.get_java_ping_records_in_range_dicts(
             java_server_id=java_server_id,
-            count=count,
+            since=as_utc(since),
+            until=as_utc(until) if until is not None else datetime.now(UTC),
+            after_created_at=after.created_at if after is not None else None,
+            after_id=after.id if after is not None else None,
+            count=count + 1,
+            include_favicon=include_favicon,
+        )
+
+        next_cursor: str | None = None
+        if len(records) > count:
+            records = records[:count]
+            next_cursor = encode_ping_record_cursor(
+                created_at=records[-1]["created_at"],
+                id=records[-1]["id"],
+            )
+
+        if columns_fields is not None:
+            return ORJSONResponse(
+                content={
+                    "columns": transpose_records(
+                        records=records,
+                        fields=columns_fields,
+                    ),
+                    "next_cursor": next_cursor,
+                },
+            )
+
+        return ORJSONResponse(
+            content={
+                "records": records,
+                "next_cursor": next_cursor,
+            },
         )
 
+    JavaPingRecordRollupColumns = create_columns_model(JavaPingRecordRollup)
+
+    @app.post(
+        "/java_ping_record/rollup",
+        response_model=list[JavaPingRecordRollup] | JavaPingRecordRollupColumns,
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def java_ping_record_rollup(
+        java_ping_record_rollup_api: JavaPingRecordRollupApi,
+        java_server_id: str,
+        granularity: JavaPingRecordRollupGranularity,
+        since: datetime,
+        until: datetime | None = None,
+        format: HistoryFormat = "records",
+        fields: str | None = None,
+    ) -> list[JavaPingRecordRollup] | Response:
+        """
+        The "columns" format returns the comma-separated "fields" (all by default)
+        as arrays.
+        """
+        columns_fields = (
+            parse_columns_fields(model=JavaPingRecordRollup, fields=fields)
+            if format == "columns"
+            else None
+        )
+
+        since = as_utc(since)
+        until = as_utc(until) if until is not None else datetime.now(UTC)
+
+        if (until - since) / ROLLUP_BUCKET_INTERVALS[granularity] > (
+            config.max_range_count
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"The range must contain at most {config.max_range_count} "
+                    f'"{granularity}" buckets'
+                ),
+            )
+
+        rollups = java_ping_record_rollup_api.get_java_ping_record_rollups(
+            java_server_id=java_server_id,
+            granularity=granularity,
+            since=since,
+            until=until,
+        )
+
+        if columns_fields is not None:
+            return ORJSONResponse(
+                content=transpose_records(
+                    records=[rollup.model_dump() for rollup in rollups],
+                    fields=columns_fields,
+                ),
+            )
+
+        return rollups
+
+    @app.get(
+        "/java_server/{id}/favicon.png",
+        response_class=Response,
+        responses={
+            200: {"content": {"image/png": {}}},
+            304: {"description": "Not modified"},
+        },
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def java_server_favicon(
+        java_favicon_api: JavaFaviconApi,
+        id: str,
+        if_none_match: Annotated[str | None, Header()] = None,
+    ) -> Response:
+        favicon_hash = java_favicon_api.get_latest_java_favicon_hash(
+            java_server_id=id,
+        )
+        if favicon_hash is None:
+            raise HTTPException(status_code=404, detail="Favicon not found")
+
+        # The hash identifies the favicon content, so it is a strong ETag
+        headers = {
+            "ETag": f'"{favicon_hash}"',
+            "Cache-Control": f"max-age={config.favicon_max_age}",
+            "X-Content-Type-Options": "nosniff",
+        }
+
+        if is_etag_matched(if_none_match=if_none_match, etag=headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        with favicon_image_cache_lock:
+            favicon_image = favicon_image_cache.get(favicon_hash)
+            if favicon_image is not None:
+                favicon_image_cache.move_to_end(favicon_hash)
+
+        if favicon_image is None:
+            java_favicon = java_favicon_api.get_java_favicon(hash=favicon_hash)
+            if java_favicon is None:
+                raise HTTPException(status_code=404, detail="Favicon not found")
+
+            try:
+                favicon_image = parse_data_url(data_url=java_favicon.favicon)
+            except DataUrlParseError as error:
+                raise HTTPException(
+                    status_code=500, detail="Favicon is not a valid data URL"
+                ) from error
+
+            # The favicons come from the pinged servers. Serve nothing but PNG, so
+            # that e.g. an HTML favicon is never rendered on the origin of the API.
+            if favicon_image.media_type.lower() != "image/png" or (
+                not favicon_image.data.startswith(PNG_SIGNATURE)
+            ):
+                raise HTTPException(status_code=404, detail="Favicon is not a PNG")
+
+            with favicon_image_cache_lock:
+                favicon_image_cache[favicon_hash] = favicon_image
+                while len(favicon_image_cache) > FAVICON_CACHE_SIZE:
+                    favicon_image_cache.popitem(last=False)
+
+        return Response(
+            content=favicon_image.data,
+            media_type="image/png",
+            headers=headers,
+        )
+
+    @app.post(
+        "/status/bedrock",
+        response_model=list[BedrockServerStatus],
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def status_bedrock(
+        bedrock_server_status_api: BedrockServerStatusApi,
+    ) -> list[BedrockServerStatus]:
+        return bedrock_server_status_api.get_bedrock_server_statuses()
+
+    @app.post(
+        "/status/java",
+        response_model=list[JavaServerStatus],
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def status_java(
+        java_server_status_api: JavaServerStatusApi,
+        include_favicon: bool = False,
+    ) -> list[JavaServerStatus]:
+        return java_server_status_api.get_java_server_statuses(
+            include_favicon=include_favicon,
+        )
+
+    class StatusAllResponse(BaseModel):
+        bedrock: list[BedrockServerStatus]
+        java: list[JavaServerStatus]
+
+    @app.post(
+        "/status/all",
+        response_model=StatusAllResponse,
+        dependencies=[Depends(verify_read_api_key)],
+    )
+    def status_all(
+        bedrock_server_status_api: BedrockServerStatusApi,
+        java_server_status_api: JavaServerStatusApi,
+        include_favicon: bool = False,
+    ) -> StatusAllResponse:
+        return StatusAllResponse(
+            bedrock=bedrock_server_status_api.get_bedrock_server_statuses(),
+            java=java_server_status_api.get_java_server_statuses(
+                include_favicon=include_favicon,
+            ),
+        )
+
+    @app.get(
+        "/metrics",
+        dependencies=[Depends(verify_read_api_key)],
+        include_in_schema=False,
+    )
+    def metrics() -> Response:
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
     return app
 
 
@@ -255,6 +1448,7 @@ def web_api_loop(config: WebApiConfig) -> None:
         host=config.host,
         port=config.port,
         reload=config.reload,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
     )
 
 
@@ -267,6 +1461,26 @@ def main() -> None:
         type=str,
         default=os.environ.get("MCPING_WEB_API_DATABASE_URL"),
     )
+    parser.add_argument(
+        "--database_pool_size",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_DATABASE_POOL_SIZE", "5"),
+    )
+    parser.add_argument(
+        "--database_max_overflow",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_DATABASE_MAX_OVERFLOW", "10"),
+    )
+    parser.add_argument(
+        "--database_pool_pre_ping",
+        action="store_true",
+        default=os.environ.get("MCPING_WEB_API_DATABASE_POOL_PRE_PING") == "1",
+    )
+    parser.add_argument(
+        "--database_pool_recycle",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_DATABASE_POOL_RECYCLE", "1800"),
+    )
     parser.add_argument(
         "--host",
         type=str,
@@ -297,6 +1511,53 @@ def main() -> None:
         type=int,
         default=os.environ.get("MCPING_WEB_API_MAX_LATEST_COUNT", "20"),
     )
+    parser.add_argument(
+        "--max_range_count",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_MAX_RANGE_COUNT", "1000"),
+    )
+    parser.add_argument(
+        "--favicon_max_age",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_FAVICON_MAX_AGE", "3600"),
+    )
+    parser.add_argument(
+        "--latest_cache_ttl",
+        type=float,
+        default=os.environ.get("MCPING_WEB_API_LATEST_CACHE_TTL", "300"),
+        help=(
+            "Seconds to cache the latest ping records (0 to disable). "
+            "Set to the interval of the updaters."
+        ),
+    )
+    parser.add_argument(
+        "--latest_cache_size",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_LATEST_CACHE_SIZE", "4096"),
+    )
+    parser.add_argument(
+        "--stream_queue_size",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_STREAM_QUEUE_SIZE", "1024"),
+        help="Events queued per stream before a slow subscriber is disconnected",
+    )
+    parser.add_argument(
+        "--compression_minimum_size",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_COMPRESSION_MINIMUM_SIZE", "1024"),
+        help="Bytes of the smallest response body to compress with brotli or gzip",
+    )
+    parser.add_argument(
+        "--gzip_level",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_GZIP_LEVEL", "6"),
+    )
+    parser.add_argument(
+        "--brotli_quality",
+        type=int,
+        default=os.environ.get("MCPING_WEB_API_BROTLI_QUALITY", "4"),
+        help="0 to 11. The higher qualities are too slow to compress each response.",
+    )
     parser.add_argument(
         "--log_level",
         type=int,
@@ -315,12 +1576,24 @@ def main() -> None:
     log_level: int = args.log_level
     log_file: str | None = args.log_file
     database_url: str = args.database_url
+    database_pool_size: int = args.database_pool_size
+    database_max_overflow: int = args.database_max_overflow
+    database_pool_pre_ping: bool = args.database_pool_pre_ping
+    database_pool_recycle: int = args.database_pool_recycle
     host: str = args.host
     port: int = args.port
     reload: bool = args.reload
     read_api_key: str | None = args.read_api_key
     write_api_key: str | None = args.write_api_key
     max_latest_count: int = args.max_latest_count
+    max_range_count: int = args.max_range_count
+    favicon_max_age: int = args.favicon_max_age
+    latest_cache_ttl: float = args.latest_cache_ttl
+    latest_cache_size: int = args.latest_cache_size
+    stream_queue_size: int = args.stream_queue_size
+    compression_minimum_size: int = args.compression_minimum_size
+    gzip_level: int = args.gzip_level
+    brotli_quality: int = args.brotli_quality
 
     logging.basicConfig(
         level=log_level,
@@ -334,7 +1607,19 @@ def main() -> None:
         read_api_key=read_api_key,
         write_api_key=write_api_key,
         max_latest_count=max_latest_count,
+        max_range_count=max_range_count,
         database_url=database_url,
+        database_pool_size=database_pool_size,
+        database_max_overflow=database_max_overflow,
+        database_pool_pre_ping=database_pool_pre_ping,
+        database_pool_recycle=database_pool_recycle,
+        favicon_max_age=favicon_max_age,
+        latest_cache_ttl=latest_cache_ttl,
+        latest_cache_size=latest_cache_size,
+        stream_queue_size=stream_queue_size,
+        compression_minimum_size=compression_minimum_size,
+        gzip_level=gzip_level,
+        brotli_quality=brotli_quality,
     )
 
     web_api_loop(config=config)
@@ -0,0 +1,4 @@
+from aoirint_mcping_server.updater.updater import main
+
+if __name__ == "__main__":
+    main()
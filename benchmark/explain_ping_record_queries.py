@@ -0,0 +1,429 @@
+"""
+Check the query plans of the ping record read queries against a seeded database.
+
+The statements are captured from the actual repository calls and re-run with
+EXPLAIN, so this fails when a query or an index change makes PostgreSQL fall back
+to a sequential scan or a sort of all the records of a server.
+"""
+
+import json
+import sys
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.sql import text as sql_text
+
+from aoirint_mcping_server.lib.repository.bedrock_ping_record_repository import (
+    BedrockPingRecordRepositoryImpl,
+)
+from aoirint_mcping_server.lib.repository.java_ping_record_repository import (
+    JavaPingRecordRepositoryImpl,
+    calculate_java_favicon_hash,
+)
+
+SEED_HOST = "explain-check.invalid"
+SEED_FAVICON = "data:image/png;base64,iVBORw0KGgo="
+
+PING_RECORD_INDEX_NAMES = {
+    "bedrock_ping_records": (
+        "bedrock_ping_records__bedrock_server_id__created_at__id__index"
+    ),
+    "java_ping_records": "java_ping_records__java_server_id__created_at__id__index",
+}
+
+
+class CapturedStatement(BaseModel):
+    statement: str
+    parameters: dict[str, Any]
+
+
+class PlanCheckResult(BaseModel):
+    name: str
+    errors: list[str]
+
+
+def seed(engine: Engine, servers: int, records: int) -> None:
+    with engine.connect() as conn:
+        with conn.begin():
+            for table in ("bedrock_servers", "java_servers"):
+                conn.execute(
+                    sql_text(
+                        f"""
+                            INSERT INTO "{table}"("name", "host", "port")
+                            SELECT
+                                'explain-check-' || i,
+                                :host,
+                                i
+                            FROM generate_series(1, :servers) AS i
+                        """,
+                    ),
+                    parameters={
+                        "host": SEED_HOST,
+                        "servers": servers,
+                    },
+                )
+
+            conn.execute(
+                sql_text(
+                    """
+                        INSERT INTO "java_favicons"("hash", "favicon")
+                        VALUES (:hash, :favicon)
+                        ON CONFLICT ("hash") DO NOTHING
+                    """,
+                ),
+                parameters={
+                    "hash": calculate_java_favicon_hash(favicon=SEED_FAVICON),
+                    "favicon": SEED_FAVICON,
+                },
+            )
+
+            for table, server_table, server_id_column in (
+                ("bedrock_ping_records", "bedrock_servers", "bedrock_server_id"),
+                ("java_ping_records", "java_servers", "java_server_id"),
+            ):
+                # The seeded records may be older than the existing partitions
+                conn.execute(
+                    sql_text(
+                        """
+                            SELECT create_monthly_partitions(
+                                :table,
+                                CURRENT_TIMESTAMP - make_interval(mins => :records * 5),
+                                0
+                            )
+                        """,
+                    ),
+                    parameters={
+                        "table": table,
+                        "records": records,
+                    },
+                )
+
+                conn.execute(
+                    sql_text(
+                        f"""
+                            INSERT INTO "{table}"(
+                                "{server_id_column}",
+                                "timeout",
+                                "is_timeout",
+                                "created_at"
+                            )
+                            SELECT
+                                "{server_table}"."id",
+                                3,
+                                FALSE,
+                                CURRENT_TIMESTAMP - make_interval(mins => i * 5)
+                            FROM "{server_table}"
+                            CROSS JOIN generate_series(1, :records) AS i
+                            WHERE "{server_table}"."host" = :host
+                        """,
+                    ),
+                    parameters={
+                        "host": SEED_HOST,
+                        "records": records,
+                    },
+                )
+
+            # Most Java servers send a favicon
+            conn.execute(
+                sql_text(
+                    """
+                        UPDATE "java_ping_records"
+                        SET "favicon_hash" = :favicon_hash
+                        FROM "java_servers"
+                        WHERE
+                            "java_servers"."id" = "java_ping_records"."java_server_id"
+                            AND "java_servers"."host" = :host
+                    """,
+                ),
+                parameters={
+                    "host": SEED_HOST,
+                    "favicon_hash": calculate_java_favicon_hash(favicon=SEED_FAVICON),
+                },
+            )
+
+        for table in ("bedrock_ping_records", "java_ping_records"):
+            conn.execute(sql_text(f'ANALYZE "{table}"'))
+        conn.commit()
+
+
+def cleanup(engine: Engine) -> None:
+    with engine.connect() as conn:
+        with conn.begin():
+            for table in ("bedrock_servers", "java_servers"):
+                conn.execute(
+                    sql_text(f'DELETE FROM "{table}" WHERE "host" = :host'),
+                    parameters={
+                        "host": SEED_HOST,
+                    },
+                )
+
+
+def get_seeded_server_id(engine: Engine, table: str) -> str:
+    with engine.connect() as conn:
+        row = conn.execute(
+            sql_text(
+                f"""
+                    SELECT "id"
+                    FROM "{table}"
+                    WHERE "host" = :host
+                    ORDER BY "port" ASC
+                    LIMIT 1
+                """,
+            ),
+            parameters={
+                "host": SEED_HOST,
+            },
+        ).fetchone()
+
+        if row is None:
+            raise Exception(f"No seeded server in {table}")
+
+        return str(row[0])
+
+
+def get_partition_names(engine: Engine, parent_name: str) -> set[str]:
+    """
+    Return the names of the partitions of a table or an index, including itself.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(
+            sql_text(
+                """
+                    SELECT "pg_class"."relname"
+                    FROM "pg_inherits"
+                    INNER JOIN "pg_class"
+                        ON "pg_class"."oid" = "pg_inherits"."inhrelid"
+                    WHERE
+                        "pg_inherits"."inhparent" = CAST(:parent_name AS REGCLASS)
+                """,
+            ),
+            parameters={
+                "parent_name": parent_name,
+            },
+        ).fetchall()
+
+        return {parent_name} | {row[0] for row in rows}
+
+
+def walk_plan(plan: dict[str, Any]) -> list[dict[str, Any]]:
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes.extend(walk_plan(child))
+    return nodes
+
+
+def explain(engine: Engine, captured: CapturedStatement) -> dict[str, Any]:
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        cursor.execute(
+            "EXPLAIN (FORMAT JSON) " + captured.statement,
+            captured.parameters,
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise Exception("EXPLAIN returned no rows")
+
+        plan_json = row[0]
+        if isinstance(plan_json, str):
+            plan_json = json.loads(plan_json)
+
+        plan: dict[str, Any] = plan_json[0]["Plan"]
+        return plan
+    finally:
+        raw_conn.close()
+
+
+def check_plan(
+    name: str,
+    plan: dict[str, Any],
+    ping_record_relation_names: set[str],
+    composite_index_names: set[str],
+) -> PlanCheckResult:
+    errors: list[str] = []
+    used_index_names: set[str] = set()
+
+    for node in walk_plan(plan):
+        node_type = node.get("Node Type")
+        relation_name = node.get("Relation Name")
+
+        if node_type == "Sort":
+            errors.append("sorts the records instead of reading them in index order")
+
+        if relation_name in ping_record_relation_names:
+            if node_type == "Seq Scan":
+                errors.append(f"scans {relation_name} sequentially")
+
+            index_name = node.get("Index Name")
+            if index_name is not None:
+                used_index_names.add(index_name)
+
+    if len(used_index_names & composite_index_names) == 0:
+        errors.append(
+            f"does not use the composite index (used: {sorted(used_index_names)})"
+        )
+
+    return PlanCheckResult(name=name, errors=errors)
+
+
+def capture_statements(
+    engine: Engine,
+    call: Any,
+) -> list[CapturedStatement]:
+    captured: list[CapturedStatement] = []
+
+    def before_cursor_execute(
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        captured.append(
+            CapturedStatement(
+                statement=statement,
+                parameters=dict(parameters),
+            )
+        )
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return captured
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--database_url",
+        type=str,
+        required=True,
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        default=200,
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        default=500,
+        help="Number of ping records per server",
+    )
+    args = parser.parse_args()
+
+    database_url: str = args.database_url
+    servers: int = args.servers
+    records: int = args.records
+
+    engine = create_engine(url=database_url)
+
+    cleanup(engine=engine)
+    seed(engine=engine, servers=servers, records=records)
+
+    try:
+        bedrock_server_id = get_seeded_server_id(engine=engine, table="bedrock_servers")
+        java_server_id = get_seeded_server_id(engine=engine, table="java_servers")
+
+        bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(engine=engine)
+        java_ping_record_api = JavaPingRecordRepositoryImpl(engine=engine)
+
+        now = datetime.now(UTC)
+
+        calls: dict[str, Any] = {
+            "get_latest_bedrock_ping_record_dicts": (
+                lambda: bedrock_ping_record_api.get_latest_bedrock_ping_record_dicts(
+                    bedrock_server_id=bedrock_server_id,
+                    count=20,
+                )
+            ),
+            "get_bedrock_ping_records_in_range_dicts": (
+                lambda: bedrock_ping_record_api.get_bedrock_ping_records_in_range_dicts(
+                    bedrock_server_id=bedrock_server_id,
+                    since=now - timedelta(days=1),
+                    until=now,
+                    after_created_at=None,
+                    after_id=None,
+                    count=100,
+                )
+            ),
+            "get_latest_java_ping_record_dicts": (
+                lambda: java_ping_record_api.get_latest_java_ping_record_dicts(
+                    java_server_id=java_server_id,
+                    count=20,
+                    include_favicon=True,
+                )
+            ),
+            "get_java_ping_records_in_range_dicts": (
+                lambda: java_ping_record_api.get_java_ping_records_in_range_dicts(
+                    java_server_id=java_server_id,
+                    since=now - timedelta(days=1),
+                    until=now,
+                    after_created_at=None,
+                    after_id=None,
+                    count=100,
+                    include_favicon=False,
+                )
+            ),
+        }
+
+        # The ping record tables are partitioned, so the plans refer to the
+        # partitions and their indexes
+        ping_record_relation_names: set[str] = set()
+        composite_index_names: set[str] = set()
+        for table, index_name in PING_RECORD_INDEX_NAMES.items():
+            ping_record_relation_names |= get_partition_names(
+                engine=engine,
+                parent_name=table,
+            )
+            composite_index_names |= get_partition_names(
+                engine=engine,
+                parent_name=index_name,
+            )
+
+        results: list[PlanCheckResult] = []
+        for name, call in calls.items():
+            for captured in capture_statements(engine=engine, call=call):
+                # Only the queries on the ping record tables are checked
+                if not any(
+                    f'FROM "{table}"' in captured.statement
+                    for table in PING_RECORD_INDEX_NAMES
+                ):
+                    continue
+
+                plan = explain(engine=engine, captured=captured)
+                results.append(
+                    check_plan(
+                        name=name,
+                        plan=plan,
+                        ping_record_relation_names=ping_record_relation_names,
+                        composite_index_names=composite_index_names,
+                    )
+                )
+    finally:
+        cleanup(engine=engine)
+
+    failed = False
+    for result in results:
+        if len(result.errors) == 0:
+            print(f"OK   {result.name}")
+            continue
+
+        failed = True
+        for error in result.errors:
+            print(f"FAIL {result.name}: {error}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Measure the per-record cost of turning the ping record rows into a response body.
+
+"model" is the path through the pydantic models: the records are built into the
+models, validated again against the response_model by FastAPI and encoded by
+JSONResponse. "orjson" is the path of the Web API: the records are plain dicts
+encoded by ORJSONResponse. Both paths start from the dicts built from the rows.
+
+The rows are generated in memory in the shape of the repository queries, so the
+database is not involved. Both paths must write the same JSON, which is checked
+before the measurement.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable, Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Any, Literal, cast
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import Row
+
+from aoirint_mcping_server.lib.repository.bedrock_ping_record_repository import (
+    BedrockPingRecord,
+    BedrockPingRecordDict,
+    build_bedrock_ping_record_dicts,
+)
+from aoirint_mcping_server.lib.repository.java_ping_record_repository import (
+    JavaPingRecord,
+    JavaPingRecordDict,
+    build_java_ping_record_dicts,
+)
+
+# A small PNG in the size range of the server icons (64x64)
+SAMPLE_FAVICON = "data:image/png;base64," + "iVBORw0KGgo" * 400
+
+
+def create_bedrock_ping_record_rows(
+    bedrock_server_id: str,
+    records: int,
+) -> Sequence[Row[Any]]:
+    now = datetime.now(UTC)
+    rows = [
+        (
+            str(uuid4()),
+            bedrock_server_id,
+            3.0,
+            False,
+            False,
+            766,
+            "MCPE",
+            "1.21.50",
+            12.345 + index % 7,
+            index % 20,
+            20,
+            "A Minecraft Server",
+            "Bedrock level",
+            "Survival",
+            now - timedelta(minutes=index),
+            now - timedelta(minutes=index),
+        )
+        for index in range(records)
+    ]
+    # Tuples are indexed in the same way as the rows
+    return cast(Sequence[Row[Any]], rows)
+
+
+def create_java_ping_record_rows(
+    records: int,
+    players: int,
+    include_favicon: bool,
+) -> tuple[Sequence[Row[Any]], Sequence[Row[Any]]]:
+    now = datetime.now(UTC)
+    ping_record_rows = [
+        (
+            str(uuid4()),
+            3.0,
+            False,
+            False,
+            767,
+            "Paper 1.21.1",
+            12.345 + index % 7,
+            players,
+            100,
+            "A Minecraft Server",
+            SAMPLE_FAVICON if include_favicon else None,
+            now - timedelta(minutes=index),
+            now - timedelta(minutes=index),
+            "0" * 64,
+        )
+        for index in range(records)
+    ]
+    player_rows = [
+        (
+            str(uuid4()),
+            ping_record_row[0],
+            str(uuid4()),
+            f"player{index}",
+        )
+        for ping_record_row in ping_record_rows
+        for index in range(players)
+    ]
+    # Tuples are indexed in the same way as the rows
+    return (
+        cast(Sequence[Row[Any]], ping_record_rows),
+        cast(Sequence[Row[Any]], player_rows),
+    )
+
+
+def build_bedrock_ping_records(
+    records: list[BedrockPingRecordDict],
+) -> list[BedrockPingRecord]:
+    return [
+        BedrockPingRecord(
+            **{
+                **record,
+                "created_at": record["created_at"].isoformat(),
+                "updated_at": record["updated_at"].isoformat(),
+            }
+        )
+        for record in records
+    ]
+
+
+def build_java_ping_records(
+    records: list[JavaPingRecordDict],
+) -> list[JavaPingRecord]:
+    return [
+        JavaPingRecord(
+            **{
+                **record,
+                "created_at": record["created_at"].isoformat(),
+                "updated_at": record["updated_at"].isoformat(),
+            }
+        )
+        for record in records
+    ]
+
+
+def measure(
+    encode: Callable[[], bytes],
+    iterations: int,
+) -> float:
+    """
+    Return the seconds per call of "encode".
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode()
+    return (time.perf_counter() - start) / iterations
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--edition",
+        type=str,
+        choices=["java", "bedrock", "all"],
+        default="all",
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        default=1000,
+        help="Number of the records per response",
+    )
+    parser.add_argument(
+        "--players",
+        type=int,
+        default=12,
+        help="Number of the sampled players per Java record",
+    )
+    parser.add_argument(
+        "--include_favicon",
+        action="store_true",
+        help="Include a favicon in each Java record",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=50,
+    )
+    args = parser.parse_args()
+
+    edition: Literal["java", "bedrock", "all"] = args.edition
+    records: int = args.records
+    players: int = args.players
+    include_favicon: bool = args.include_favicon
+    iterations: int = args.iterations
+
+    # serialize_response is a coroutine. Reuse a loop not to measure its creation.
+    loop = asyncio.new_event_loop()
+    encoders: dict[str, tuple[Callable[[], bytes], Callable[[], bytes]]] = {}
+
+    if edition in ("bedrock", "all"):
+        bedrock_rows = create_bedrock_ping_record_rows(
+            bedrock_server_id=str(uuid4()),
+            records=records,
+        )
+        bedrock_field = create_model_field(
+            name="Response",
+            type_=list[BedrockPingRecord],
+            mode="serialization",
+        )
+
+        def encode_bedrock_models() -> bytes:
+            content = loop.run_until_complete(
+                serialize_response(
+                    field=bedrock_field,
+                    response_content=build_bedrock_ping_records(
+                        records=build_bedrock_ping_record_dicts(rows=bedrock_rows),
+                    ),
+                )
+            )
+            return JSONResponse(content=content).body
+
+        def encode_bedrock_dicts() -> bytes:
+            return ORJSONResponse(
+                content=build_bedrock_ping_record_dicts(rows=bedrock_rows),
+            ).body
+
+        encoders["bedrock"] = (encode_bedrock_models, encode_bedrock_dicts)
+
+    if edition in ("java", "all"):
+        java_server_id = str(uuid4())
+        java_ping_record_rows, java_player_rows = create_java_ping_record_rows(
+            records=records,
+            players=players,
+            include_favicon=include_favicon,
+        )
+        java_field = create_model_field(
+            name="Response",
+            type_=list[JavaPingRecord],
+            mode="serialization",
+        )
+
+        def encode_java_models() -> bytes:
+            content = loop.run_until_complete(
+                serialize_response(
+                    field=java_field,
+                    response_content=build_java_ping_records(
+                        records=build_java_ping_record_dicts(
+                            java_server_id=java_server_id,
+                            ping_record_rows=java_ping_record_rows,
+                            player_rows=java_player_rows,
+                        ),
+                    ),
+                )
+            )
+            return JSONResponse(content=content).body
+
+        def encode_java_dicts() -> bytes:
+            return ORJSONResponse(
+                content=build_java_ping_record_dicts(
+                    java_server_id=java_server_id,
+                    ping_record_rows=java_ping_record_rows,
+                    player_rows=java_player_rows,
+                ),
+            ).body
+
+        encoders["java"] = (encode_java_models, encode_java_dicts)
+
+    print(
+        f"{'edition':<8} {'model us/rec':>12} {'orjson us/rec':>13} "
+        f"{'speedup':>7} {'body KiB':>8}"
+    )
+    for encoder_edition, (encode_models, encode_dicts) in encoders.items():
+        body = encode_dicts()
+        if encode_models() != body:
+            raise Exception(f"The {encoder_edition} bodies of the paths differ")
+
+        model_duration = measure(encode=encode_models, iterations=iterations)
+        orjson_duration = measure(encode=encode_dicts, iterations=iterations)
+
+        print(
+            f"{encoder_edition:<8} {model_duration / records * 1e6:>12.2f} "
+            f"{orjson_duration / records * 1e6:>13.2f} "
+            f"{model_duration / orjson_duration:>6.1f}x "
+            f"{len(body) / 1024:>8.1f}"
+        )
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
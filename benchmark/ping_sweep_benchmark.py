@@ -0,0 +1,580 @@
+"""
+Measure the sweeps of the updaters against local stand-in Minecraft servers.
+
+The stand-in servers answer the Java Server List Ping (TCP) and the Bedrock RakNet
+unconnected ping (UDP) with a configurable delay and drop rate, and a ratio of the
+servers is registered on closed ports to be refused. They run in a child process
+so that they do not compete with the pings for the GIL.
+
+The servers are registered in the database for the run and deleted afterwards.
+Use a scratch database without a running updater, which would ping them too.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Literal, cast
+
+from prometheus_client import REGISTRY
+from pydantic import BaseModel
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.sql import text as sql_text
+
+from aoirint_mcping_server.bedrock_updater.bedrock_updater import (
+    sweep_bedrock_servers,
+)
+from aoirint_mcping_server.java_updater.java_updater import sweep_java_servers
+from aoirint_mcping_server.lib.repository.bedrock_ping_record_repository import (
+    BedrockPingRecordRepositoryImpl,
+)
+from aoirint_mcping_server.lib.repository.bedrock_ping_repository import (
+    BedrockPingRepositoryImpl,
+)
+from aoirint_mcping_server.lib.repository.bedrock_server_repository import (
+    BedrockServer,
+    BedrockServerRepositoryImpl,
+)
+from aoirint_mcping_server.lib.repository.dns_resolver_repository import (
+    DnsResolverRepositoryImpl,
+)
+from aoirint_mcping_server.lib.repository.java_ping_record_repository import (
+    JavaPingRecordRepositoryImpl,
+)
+from aoirint_mcping_server.lib.repository.java_ping_repository import (
+    JavaPingRepositoryImpl,
+)
+from aoirint_mcping_server.lib.repository.java_server_repository import (
+    JavaServer,
+    JavaServerRepositoryImpl,
+)
+from aoirint_mcping_server.updater.updater import sweep
+
+SERVER_NAME_PREFIX = "ping-benchmark-"
+SERVER_HOST = "127.0.0.1"
+
+JAVA_STATUS = {
+    "version": {"name": "1.20.4", "protocol": 765},
+    "players": {"online": 0, "max": 20},
+    "description": "Ping benchmark",
+}
+
+# https://wiki.vg/Raknet_Protocol#Unconnected_Ping
+RAKNET_UNCONNECTED_PING = 0x01
+RAKNET_UNCONNECTED_PONG = 0x1C
+RAKNET_MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+BEDROCK_PROTOCOL = 618
+BEDROCK_VERSION = "1.20.40"
+
+Edition = Literal["java", "bedrock", "all"]
+
+
+class FakeServerConfig(BaseModel):
+    delay: float  # Seconds before each response
+    drop_rate: float  # Ratio of the status requests left unanswered
+    seed: int
+
+
+class PingSweepBenchmarkResult(BaseModel):
+    servers: int
+    records: int
+    timeouts: int
+    refused: int
+    elapsed: float
+    write_elapsed: float
+    pings_per_second: float
+    write_throughput: float
+
+
+def encode_varint(value: int) -> bytes:
+    data = b""
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value == 0:
+            return data + bytes([byte])
+        data += bytes([byte | 0x80])
+
+
+async def read_varint(reader: asyncio.StreamReader) -> int:
+    value = 0
+    for index in range(5):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << (7 * index)
+        if byte & 0x80 == 0:
+            return value
+
+    raise ValueError("VarInt is too long")
+
+
+async def read_java_packet(reader: asyncio.StreamReader) -> bytes:
+    length = await read_varint(reader)
+    return await reader.readexactly(length)
+
+
+def encode_java_packet(packet_id: int, payload: bytes) -> bytes:
+    body = encode_varint(packet_id) + payload
+    return encode_varint(len(body)) + body
+
+
+async def handle_java_connection(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    config: FakeServerConfig,
+    rng: random.Random,
+) -> None:
+    try:
+        # Handshake, whose next state is always status for the pings
+        await read_java_packet(reader)
+
+        while True:
+            packet = await read_java_packet(reader)
+
+            # The packet ids used here fit in one byte of VarInt. The status
+            # request has no fields, unlike a handshake with the same id.
+            if packet == b"\x00":
+                if rng.random() < config.drop_rate:
+                    # Keep the connection open without answering, like a stuck
+                    # server, until the client gives up
+                    await reader.read()
+                    return
+
+                await asyncio.sleep(config.delay)
+                status = json.dumps(JAVA_STATUS).encode()
+                writer.write(
+                    encode_java_packet(0x00, encode_varint(len(status)) + status)
+                )
+                await writer.drain()
+            elif packet[0] == 0x01:
+                writer.write(encode_java_packet(0x01, packet[1:]))
+                await writer.drain()
+            else:
+                # A retry after a timeout starts over with a handshake
+                pass
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class FakeBedrockServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, config: FakeServerConfig, rng: random.Random):
+        self.config = config
+        self.rng = rng
+        self.server_guid = rng.getrandbits(64)
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        # Not a subclass of asyncio.DatagramTransport, but implements it
+        self.transport = cast(asyncio.DatagramTransport, transport)
+
+    def datagram_received(self, data: bytes, addr: tuple[str | bytes, int]) -> None:
+        if self.transport is None:
+            return
+
+        if len(data) < 9 or data[0] != RAKNET_UNCONNECTED_PING:
+            return
+
+        if self.rng.random() < self.config.drop_rate:
+            return
+
+        port = self.transport.get_extra_info("sockname")[1]
+        server_id = (
+            f"MCPE;Ping benchmark;{BEDROCK_PROTOCOL};{BEDROCK_VERSION};0;20;"
+            f"{self.server_guid};Bedrock level;Survival;1;{port};{port};"
+        ).encode()
+
+        # The ping time is echoed back
+        response = (
+            bytes([RAKNET_UNCONNECTED_PONG])
+            + data[1:9]
+            + struct.pack(">Q", self.server_guid)
+            + RAKNET_MAGIC
+            + struct.pack(">H", len(server_id))
+            + server_id
+        )
+        asyncio.get_running_loop().call_later(
+            self.config.delay,
+            self.transport.sendto,
+            response,
+            addr,
+        )
+
+
+async def serve_fake_servers_async(
+    config: FakeServerConfig,
+    java_servers: int,
+    bedrock_servers: int,
+    connection: Connection,
+) -> None:
+    loop = asyncio.get_running_loop()
+    rng = random.Random(config.seed)
+
+    java_ports: list[int] = []
+    for _ in range(java_servers):
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_java_connection(
+                reader=reader,
+                writer=writer,
+                config=config,
+                rng=rng,
+            ),
+            host=SERVER_HOST,
+            port=0,
+        )
+        java_ports.append(server.sockets[0].getsockname()[1])
+
+    bedrock_ports: list[int] = []
+    for _ in range(bedrock_servers):
+        transport, _protocol = await loop.create_datagram_endpoint(
+            lambda: FakeBedrockServerProtocol(config=config, rng=rng),
+            local_addr=(SERVER_HOST, 0),
+        )
+        bedrock_ports.append(transport.get_extra_info("sockname")[1])
+
+    connection.send((java_ports, bedrock_ports))
+
+    # Serve until terminated by the parent
+    await asyncio.Event().wait()
+
+
+def serve_fake_servers(
+    config: FakeServerConfig,
+    java_servers: int,
+    bedrock_servers: int,
+    connection: Connection,
+) -> None:
+    asyncio.run(
+        serve_fake_servers_async(
+            config=config,
+            java_servers=java_servers,
+            bedrock_servers=bedrock_servers,
+            connection=connection,
+        ),
+    )
+
+
+def get_closed_port(kind: socket.SocketKind) -> int:
+    """
+    Return a port which nothing listens on (at least right after this).
+    """
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind((SERVER_HOST, 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def cleanup(engine: Engine) -> None:
+    # The ping records and rollups are deleted in cascade
+    with engine.connect() as conn:
+        with conn.begin():
+            for table in ("bedrock_servers", "java_servers"):
+                conn.execute(
+                    sql_text(f'DELETE FROM "{table}" WHERE "name" LIKE :name'),
+                    parameters={
+                        "name": f"{SERVER_NAME_PREFIX}%",
+                    },
+                )
+
+
+def register_java_servers(engine: Engine, ports: list[int]) -> list[JavaServer]:
+    java_server_api = JavaServerRepositoryImpl(engine=engine)
+    return [
+        java_server_api.create_java_server(
+            name=f"{SERVER_NAME_PREFIX}{index}",
+            host=SERVER_HOST,
+            port=port,
+            is_important=False,
+        )
+        for index, port in enumerate(ports)
+    ]
+
+
+def register_bedrock_servers(engine: Engine, ports: list[int]) -> list[BedrockServer]:
+    bedrock_server_api = BedrockServerRepositoryImpl(engine=engine)
+    return [
+        bedrock_server_api.create_bedrock_server(
+            name=f"{SERVER_NAME_PREFIX}{index}",
+            host=SERVER_HOST,
+            port=port,
+            is_important=False,
+        )
+        for index, port in enumerate(ports)
+    ]
+
+
+def get_write_duration_sum() -> float:
+    # Observed by the sweeps, which time the writes apart from the pings
+    return sum(
+        REGISTRY.get_sample_value(
+            "mcping_updater_write_duration_seconds_sum",
+            {"edition": edition},
+        )
+        or 0.0
+        for edition in ("java", "bedrock")
+    )
+
+
+def run_sweep(
+    engine: Engine,
+    executor: ThreadPoolExecutor,
+    edition: Edition,
+    java_servers: list[JavaServer],
+    bedrock_servers: list[BedrockServer],
+    timeout: float,
+) -> PingSweepBenchmarkResult:
+    dns_resolver_api = DnsResolverRepositoryImpl()
+    java_ping_api = JavaPingRepositoryImpl(dns_resolver_api=dns_resolver_api)
+    java_ping_record_api = JavaPingRecordRepositoryImpl(engine=engine)
+    bedrock_ping_api = BedrockPingRepositoryImpl(dns_resolver_api=dns_resolver_api)
+    bedrock_ping_record_api = BedrockPingRecordRepositoryImpl(engine=engine)
+
+    write_duration_sum = get_write_duration_sum()
+    start = time.perf_counter()
+
+    # (is_timeout, is_refused) of the records written
+    outcomes: list[tuple[bool, bool]] = []
+    if edition == "java":
+        java_ping_records = sweep_java_servers(
+            executor=executor,
+            java_ping_api=java_ping_api,
+            java_ping_record_api=java_ping_record_api,
+            java_servers=java_servers,
+            timeout=timeout,
+        )
+        outcomes = [
+            (record.is_timeout, record.is_refused)
+            for record in java_ping_records
+            if record is not None
+        ]
+    elif edition == "bedrock":
+        bedrock_ping_records = sweep_bedrock_servers(
+            executor=executor,
+            bedrock_ping_api=bedrock_ping_api,
+            bedrock_ping_record_api=bedrock_ping_record_api,
+            bedrock_servers=bedrock_servers,
+            timeout=timeout,
+        )
+        outcomes = [
+            (record.is_timeout, record.is_refused)
+            for record in bedrock_ping_records
+            if record is not None
+        ]
+    else:
+        result = sweep(
+            executor=executor,
+            java_ping_api=java_ping_api,
+            java_ping_record_api=java_ping_record_api,
+            bedrock_ping_api=bedrock_ping_api,
+            bedrock_ping_record_api=bedrock_ping_record_api,
+            java_servers=java_servers,
+            bedrock_servers=bedrock_servers,
+            timeout=timeout,
+        )
+        outcomes = [
+            (record.is_timeout, record.is_refused)
+            for record in result.java_ping_records
+            if record is not None
+        ] + [
+            (record.is_timeout, record.is_refused)
+            for record in result.bedrock_ping_records
+            if record is not None
+        ]
+
+    elapsed = time.perf_counter() - start
+    write_elapsed = get_write_duration_sum() - write_duration_sum
+
+    servers = len(java_servers) + len(bedrock_servers)
+    return PingSweepBenchmarkResult(
+        servers=servers,
+        records=len(outcomes),
+        timeouts=sum(1 for is_timeout, _ in outcomes if is_timeout),
+        refused=sum(1 for _, is_refused in outcomes if is_refused),
+        elapsed=elapsed,
+        write_elapsed=write_elapsed,
+        pings_per_second=servers / elapsed,
+        write_throughput=(
+            len(outcomes) / write_elapsed if write_elapsed > 0 else float("inf")
+        ),
+    )
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--database_url",
+        type=str,
+        required=True,
+    )
+    parser.add_argument(
+        "--edition",
+        type=str,
+        choices=["java", "bedrock", "all"],
+        default="all",
+        help="Updater to measure (all for the unified updater)",
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        default=100,
+        help="Number of the servers per edition",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.0,
+        help="Seconds for the stand-in servers to wait before each response",
+    )
+    parser.add_argument(
+        "--drop_rate",
+        type=float,
+        default=0.0,
+        help="Ratio of the status requests left unanswered (timeouts)",
+    )
+    parser.add_argument(
+        "--refused_rate",
+        type=float,
+        default=0.0,
+        help=(
+            "Ratio of the servers registered on closed ports. Bedrock pings to "
+            "them time out, as UDP does not tell the refusal."
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=3.0,
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=32,
+    )
+    parser.add_argument(
+        "--sweeps",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+    )
+    args = parser.parse_args()
+
+    database_url: str = args.database_url
+    edition: Edition = args.edition
+    servers: int = args.servers
+    delay: float = args.delay
+    drop_rate: float = args.drop_rate
+    refused_rate: float = args.refused_rate
+    timeout: float = args.timeout
+    concurrency: int = args.concurrency
+    sweeps: int = args.sweeps
+    seed: int = args.seed
+
+    refused_servers = round(servers * refused_rate)
+    java_servers = servers if edition in ("java", "all") else 0
+    bedrock_servers = servers if edition in ("bedrock", "all") else 0
+
+    parent_connection, child_connection = multiprocessing.Pipe()
+    fake_server_process = multiprocessing.Process(
+        target=serve_fake_servers,
+        kwargs={
+            "config": FakeServerConfig(delay=delay, drop_rate=drop_rate, seed=seed),
+            "java_servers": max(java_servers - refused_servers, 0),
+            "bedrock_servers": max(bedrock_servers - refused_servers, 0),
+            "connection": child_connection,
+        },
+        daemon=True,
+    )
+    fake_server_process.start()
+
+    engine = create_engine(url=database_url)
+    cleanup(engine=engine)
+    try:
+        java_ports, bedrock_ports = parent_connection.recv()
+        if java_servers > 0:
+            java_ports += [
+                get_closed_port(kind=socket.SOCK_STREAM)
+                for _ in range(java_servers - len(java_ports))
+            ]
+        if bedrock_servers > 0:
+            bedrock_ports += [
+                get_closed_port(kind=socket.SOCK_DGRAM)
+                for _ in range(bedrock_servers - len(bedrock_ports))
+            ]
+
+        registered_java_servers = register_java_servers(
+            engine=engine,
+            ports=java_ports,
+        )
+        registered_bedrock_servers = register_bedrock_servers(
+            engine=engine,
+            ports=bedrock_ports,
+        )
+
+        results: list[PingSweepBenchmarkResult] = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for index in range(sweeps):
+                result = run_sweep(
+                    engine=engine,
+                    executor=executor,
+                    edition=edition,
+                    java_servers=registered_java_servers,
+                    bedrock_servers=registered_bedrock_servers,
+                    timeout=timeout,
+                )
+                results.append(result)
+
+                print(
+                    f"sweep {index + 1}: {result.elapsed:.3f} s "
+                    f"(write {result.write_elapsed:.3f} s), "
+                    f"{result.pings_per_second:.1f} pings/s, "
+                    f"{result.write_throughput:.1f} records/s written, "
+                    f"{result.records} records, {result.timeouts} timeouts, "
+                    f"{result.refused} refused"
+                )
+    finally:
+        cleanup(engine=engine)
+        engine.dispose()
+        fake_server_process.terminate()
+        fake_server_process.join()
+
+    if len(results) == 0:
+        return
+
+    elapsed = sorted(result.elapsed for result in results)
+    write_elapsed = sum(result.write_elapsed for result in results)
+    records = sum(result.records for result in results)
+    print(
+        f"{edition} (servers={java_servers + bedrock_servers}, "
+        f"concurrency={concurrency}, delay={delay}, drop_rate={drop_rate}, "
+        f"refused_rate={refused_rate})"
+    )
+    print(
+        "  sweep:      "
+        f"min={elapsed[0]:.3f} s "
+        f"median={elapsed[len(elapsed) // 2]:.3f} s "
+        f"max={elapsed[-1]:.3f} s"
+    )
+    print(
+        "  throughput: "
+        f"{sum(result.servers for result in results) / sum(elapsed):.1f} pings/s"
+    )
+    print(
+        "  write:      "
+        f"{records / write_elapsed if write_elapsed > 0 else 0.0:.1f} records/s "
+        f"({write_elapsed / len(results) * 1000:.1f} ms per sweep)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+Seed a scratch database with servers and months of synthetic ping records for the
+Web API load tests (see web_api_load_suite).
+
+The records are generated in PostgreSQL, one per server per interval, with a
+fixed pattern of latency, players and timeouts, so that the same options always
+give the same data. The hourly and daily rollups are filled from them as the
+updaters would.
+
+The seeded servers are identified by their host, and are replaced on each run
+(the records and rollups are deleted in cascade).
+"""
+
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import Connection, Engine, create_engine
+from sqlalchemy.sql import text as sql_text
+
+from aoirint_mcping_server.lib.repository.java_ping_record_repository import (
+    calculate_java_favicon_hash,
+)
+
+SEED_HOST = "load-benchmark.invalid"
+SEED_FAVICON = "data:image/png;base64,iVBORw0KGgo="
+
+# Records are inserted and committed per chunk of this length
+SEED_CHUNK = timedelta(days=7)
+
+PING_RECORD_TABLES = (
+    "bedrock_ping_records",
+    "java_ping_records",
+    "java_ping_record_players",
+)
+
+
+def cleanup(engine: Engine) -> None:
+    with engine.connect() as conn:
+        with conn.begin():
+            for table in ("bedrock_servers", "java_servers"):
+                conn.execute(
+                    sql_text(f'DELETE FROM "{table}" WHERE "host" = :host'),
+                    parameters={
+                        "host": SEED_HOST,
+                    },
+                )
+
+
+def seed_servers(engine: Engine, servers: int) -> None:
+    with engine.connect() as conn:
+        with conn.begin():
+            for table in ("bedrock_servers", "java_servers"):
+                conn.execute(
+                    sql_text(
+                        f"""
+                            INSERT INTO "{table}"("name", "host", "port")
+                            SELECT
+                                'load-benchmark-' || i,
+                                :host,
+                                i
+                            FROM generate_series(1, :servers) AS i
+                        """,
+                    ),
+                    parameters={
+                        "host": SEED_HOST,
+                        "servers": servers,
+                    },
+                )
+
+            conn.execute(
+                sql_text(
+                    """
+                        INSERT INTO "java_favicons"("hash", "favicon")
+                        VALUES (:hash, :favicon)
+                        ON CONFLICT ("hash") DO NOTHING
+                    """,
+                ),
+                parameters={
+                    "hash": calculate_java_favicon_hash(favicon=SEED_FAVICON),
+                    "favicon": SEED_FAVICON,
+                },
+            )
+
+            # Kept by the inserts of the updaters
+            conn.execute(
+                sql_text(
+                    """
+                        INSERT INTO "java_server_latest_favicons"(
+                            "java_server_id",
+                            "favicon_hash"
+                        )
+                        SELECT
+                            "id",
+                            :favicon_hash
+                        FROM "java_servers"
+                        WHERE "host" = :host
+                    """,
+                ),
+                parameters={
+                    "host": SEED_HOST,
+                    "favicon_hash": calculate_java_favicon_hash(favicon=SEED_FAVICON),
+                },
+            )
+
+
+def seed_bedrock_ping_records(
+    conn: Connection,
+    since: datetime,
+    until: datetime,
+    interval: int,
+) -> int:
+    result = conn.execute(
+        sql_text(
+            """
+                INSERT INTO "bedrock_ping_records"(
+                    "bedrock_server_id",
+                    "timeout",
+                    "is_timeout",
+                    "is_refused",
+                    "version_protocol",
+                    "version_brand",
+                    "version_version",
+                    "latency",
+                    "players_online",
+                    "players_max",
+                    "motd",
+                    "map",
+                    "gamemode",
+                    "created_at"
+                )
+                SELECT
+                    "servers"."id",
+                    3,
+                    "pings"."is_timeout",
+                    FALSE,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 618 END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 'MCPE' END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN '1.20.40' END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN "pings"."latency" END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN "pings"."players" END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 20 END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 'Load benchmark' END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 'Bedrock level' END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 'Survival' END,
+                    "pings"."created_at"
+                FROM "bedrock_servers" AS "servers"
+                CROSS JOIN generate_series(
+                    CAST(:since AS TIMESTAMPTZ),
+                    CAST(:until AS TIMESTAMPTZ) - make_interval(secs => 1),
+                    make_interval(secs => :interval)
+                ) AS "times"("created_at")
+                CROSS JOIN LATERAL (
+                    SELECT
+                        "times"."created_at",
+                        -- About 2% of the pings time out
+                        (
+                            (extract(epoch FROM "times"."created_at") / :interval)
+                            + "servers"."port" * 7
+                        )::BIGINT % 50 = 0 AS "is_timeout",
+                        20 + (
+                            (extract(epoch FROM "times"."created_at") / :interval)
+                            + "servers"."port"
+                        )::BIGINT % 80 AS "latency",
+                        (
+                            (extract(epoch FROM "times"."created_at") / 3600)
+                            + "servers"."port"
+                        )::BIGINT % 20 AS "players"
+                ) AS "pings"
+                WHERE "servers"."host" = :host
+            """,
+        ),
+        parameters={
+            "host": SEED_HOST,
+            "since": since,
+            "until": until,
+            "interval": interval,
+        },
+    )
+    return result.rowcount
+
+
+def seed_java_ping_records(
+    conn: Connection,
+    since: datetime,
+    until: datetime,
+    interval: int,
+    players: int,
+) -> int:
+    result = conn.execute(
+        sql_text(
+            """
+                INSERT INTO "java_ping_records"(
+                    "java_server_id",
+                    "timeout",
+                    "is_timeout",
+                    "is_refused",
+                    "version_protocol",
+                    "version_name",
+                    "latency",
+                    "players_online",
+                    "players_max",
+                    "description",
+                    "favicon_hash",
+                    "created_at"
+                )
+                SELECT
+                    "servers"."id",
+                    3,
+                    "pings"."is_timeout",
+                    FALSE,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 765 END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN '1.20.4' END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN "pings"."latency" END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN "pings"."players" END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 20 END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN 'Load benchmark' END,
+                    CASE WHEN NOT "pings"."is_timeout" THEN :favicon_hash END,
+                    "pings"."created_at"
+                FROM "java_servers" AS "servers"
+                CROSS JOIN generate_series(
+                    CAST(:since AS TIMESTAMPTZ),
+                    CAST(:until AS TIMESTAMPTZ) - make_interval(secs => 1),
+                    make_interval(secs => :interval)
+                ) AS "times"("created_at")
+                CROSS JOIN LATERAL (
+                    SELECT
+                        "times"."created_at",
+                        -- About 2% of the pings time out
+                        (
+                            (extract(epoch FROM "times"."created_at") / :interval)
+                            + "servers"."port" * 7
+                        )::BIGINT % 50 = 0 AS "is_timeout",
+                        20 + (
+                            (extract(epoch FROM "times"."created_at") / :interval)
+                            + "servers"."port"
+                        )::BIGINT % 80 AS "latency",
+                        (
+                            (extract(epoch FROM "times"."created_at") / 3600)
+                            + "servers"."port"
+                        )::BIGINT % 20 AS "players"
+                ) AS "pings"
+                WHERE "servers"."host" = :host
+            """,
+        ),
+        parameters={
+            "host": SEED_HOST,
+            "since": since,
+            "until": until,
+            "interval": interval,
+            "favicon_hash": calculate_java_favicon_hash(favicon=SEED_FAVICON),
+        },
+    )
+    record_count = result.rowcount
+
+    # A sample of up to the given number of the players online
+    conn.execute(
+        sql_text(
+            """
+                INSERT INTO "java_ping_record_players"(
+                    "java_ping_record_id",
+                    "java_ping_record_created_at",
+                    "player_id",
+                    "name"
+                )
+                SELECT
+                    "records"."id",
+                    "records"."created_at",
+                    CAST(CAST(md5('load-benchmark-player-' || i) AS UUID) AS TEXT),
+                    'Player' || i
+                FROM "java_ping_records" AS "records"
+                INNER JOIN "java_servers" AS "servers"
+                    ON "servers"."id" = "records"."java_server_id"
+                CROSS JOIN LATERAL generate_series(
+                    1,
+                    LEAST("records"."players_online", :players)
+                ) AS i
+                WHERE
+                    "servers"."host" = :host
+                    AND "records"."created_at" >= :since
+                    AND "records"."created_at" < :until
+            """,
+        ),
+        parameters={
+            "host": SEED_HOST,
+            "since": since,
+            "until": until,
+            "players": players,
+        },
+    )
+
+    return record_count
+
+
+def seed_rollups(engine: Engine) -> None:
+    with engine.connect() as conn:
+        with conn.begin():
+            for edition in ("bedrock", "java"):
+                conn.execute(
+                    sql_text(
+                        f"""
+                            INSERT INTO "{edition}_ping_record_rollups"(
+                                "{edition}_server_id",
+                                "granularity",
+                                "bucket_start",
+                                "ping_count",
+                                "success_count",
+                                "timeout_count",
+                                "refused_count",
+                                "latency_min",
+                                "latency_max",
+                                "latency_sum",
+                                "latency_count",
+                                "players_online_min",
+                                "players_online_max",
+                                "players_online_sum",
+                                "players_online_count"
+                            )
+                            SELECT
+                                "records"."{edition}_server_id",
+                                "granularity",
+                                date_trunc(
+                                    "granularity",
+                                    "records"."created_at",
+                                    'UTC'
+                                ),
+                                COUNT(*),
+                                COUNT(*) FILTER (
+                                    WHERE NOT "records"."is_timeout"
+                                    AND NOT COALESCE("records"."is_refused", FALSE)
+                                ),
+                                COUNT(*) FILTER (WHERE "records"."is_timeout"),
+                                COUNT(*) FILTER (
+                                    WHERE COALESCE("records"."is_refused", FALSE)
+                                ),
+                                MIN("records"."latency"),
+                                MAX("records"."latency"),
+                                COALESCE(SUM("records"."latency"), 0),
+                                COUNT("records"."latency"),
+                                MIN("records"."players_online"),
+                                MAX("records"."players_online"),
+                                COALESCE(SUM("records"."players_online"), 0),
+                                COUNT("records"."players_online")
+                            FROM "{edition}_ping_records" AS "records"
+                            INNER JOIN "{edition}_servers" AS "servers"
+                                ON "servers"."id" = "records"."{edition}_server_id"
+                            CROSS JOIN unnest(ARRAY['hour', 'day']) AS "granularity"
+                            WHERE "servers"."host" = :host
+                            GROUP BY 1, 2, 3
+                        """,
+                    ),
+                    parameters={
+                        "host": SEED_HOST,
+                    },
+                )
+
+
+def seed(
+    engine: Engine,
+    servers: int,
+    months: int,
+    interval: int,
+    players: int,
+) -> None:
+    # Align to the interval, as the pattern of the records is derived from the
+    # timestamps
+    now = datetime.now(UTC)
+    until = datetime.fromtimestamp(
+        now.timestamp() // interval * interval,
+        tz=UTC,
+    )
+    since = until - timedelta(days=30 * months)
+
+    cleanup(engine=engine)
+    seed_servers(engine=engine, servers=servers)
+
+    with engine.connect() as conn:
+        with conn.begin():
+            # The seeded records are older than the partitions kept by the pruner
+            for table in PING_RECORD_TABLES:
+                conn.execute(
+                    sql_text(
+                        "SELECT create_monthly_partitions(:table, :since, 0)",
+                    ),
+                    parameters={
+                        "table": table,
+                        "since": since,
+                    },
+                )
+
+    bedrock_record_count = 0
+    java_record_count = 0
+    chunk_since = since
+    while chunk_since < until:
+        chunk_until = min(chunk_since + SEED_CHUNK, until)
+
+        with engine.connect() as conn:
+            with conn.begin():
+                bedrock_record_count += seed_bedrock_ping_records(
+                    conn=conn,
+                    since=chunk_since,
+                    until=chunk_until,
+                    interval=interval,
+                )
+                java_record_count += seed_java_ping_records(
+                    conn=conn,
+                    since=chunk_since,
+                    until=chunk_until,
+                    interval=interval,
+                    players=players,
+                )
+
+        print(
+            f"Seeded until {chunk_until.isoformat()}: "
+            f"{bedrock_record_count} Bedrock and {java_record_count} Java records"
+        )
+        chunk_since = chunk_until
+
+    seed_rollups(engine=engine)
+
+    with engine.connect() as conn:
+        for table in (
+            "bedrock_servers",
+            "java_servers",
+            "bedrock_ping_record_rollups",
+            "java_ping_record_rollups",
+            *PING_RECORD_TABLES,
+        ):
+            conn.execute(sql_text(f'ANALYZE "{table}"'))
+        conn.commit()
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--database_url",
+        type=str,
+        required=True,
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        default=100,
+        help="Number of the servers per edition",
+    )
+    parser.add_argument(
+        "--months",
+        type=int,
+        default=3,
+        help="Months (of 30 days) of the ping records until now",
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        default=300,
+        help="Seconds between the ping records of a server",
+    )
+    parser.add_argument(
+        "--players",
+        type=int,
+        default=5,
+        help="Maximum number of the players in the sample of a Java ping record",
+    )
+    parser.add_argument(
+        "--cleanup",
+        action="store_true",
+        help="Delete the seeded servers and their records only",
+    )
+    args = parser.parse_args()
+
+    database_url: str = args.database_url
+    servers: int = args.servers
+    months: int = args.months
+    interval: int = args.interval
+    players: int = args.players
+    is_cleanup: bool = args.cleanup
+
+    engine = create_engine(url=database_url)
+    try:
+        if is_cleanup:
+            cleanup(engine=engine)
+            return
+
+        seed(
+            engine=engine,
+            servers=servers,
+            months=months,
+            interval=interval,
+            players=players,
+        )
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
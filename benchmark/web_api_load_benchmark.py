@@ -0,0 +1,167 @@
+import asyncio
+import time
+
+import httpx
+from pydantic import BaseModel
+
+
+class WebApiLoadBenchmarkConfig(BaseModel):
+    base_url: str
+    method: str
+    path: str
+    params: list[dict[str, str]]  # Used in turn by the requests
+    read_api_key: str | None
+    concurrency: int
+    requests: int
+
+
+class WebApiLoadBenchmarkResult(BaseModel):
+    requests: int
+    errors: int
+    elapsed: float
+    throughput: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+
+
+def percentile(values: list[float], ratio: float) -> float:
+    if len(values) == 0:
+        return 0.0
+
+    sorted_values = sorted(values)
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * ratio))
+    return sorted_values[index]
+
+
+async def run_benchmark(config: WebApiLoadBenchmarkConfig) -> WebApiLoadBenchmarkResult:
+    headers: dict[str, str] = {}
+    if config.read_api_key is not None:
+        headers["X-Read-Api-Key"] = config.read_api_key
+
+    latencies: list[float] = []
+    errors = 0
+    sent = 0
+
+    async with httpx.AsyncClient(
+        base_url=config.base_url,
+        headers=headers,
+        limits=httpx.Limits(max_connections=config.concurrency),
+        timeout=60,
+    ) as client:
+
+        async def worker() -> None:
+            nonlocal errors, sent
+
+            while sent < config.requests:
+                params = config.params[sent % len(config.params)]
+                sent += 1
+
+                start = time.perf_counter()
+                try:
+                    response = await client.request(
+                        config.method,
+                        config.path,
+                        params=params,
+                    )
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(config.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return WebApiLoadBenchmarkResult(
+        requests=len(latencies),
+        errors=errors,
+        elapsed=elapsed,
+        throughput=len(latencies) / elapsed,
+        latency_p50=percentile(latencies, 0.50),
+        latency_p95=percentile(latencies, 0.95),
+        latency_p99=percentile(latencies, 0.99),
+    )
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--base_url",
+        type=str,
+        default="http://127.0.0.1:5000",
+    )
+    parser.add_argument(
+        "--method",
+        type=str,
+        default="POST",
+    )
+    parser.add_argument(
+        "--path",
+        type=str,
+        default="/java_server/list",
+    )
+    parser.add_argument(
+        "--param",
+        type=str,
+        action="append",
+        default=[],
+        help="Query parameter in KEY=VALUE form (repeatable)",
+    )
+    parser.add_argument(
+        "--read_api_key",
+        type=str,
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=32,
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=2000,
+    )
+    args = parser.parse_args()
+
+    base_url: str = args.base_url
+    method: str = args.method
+    path: str = args.path
+    param_list: list[str] = args.param
+    read_api_key: str | None = args.read_api_key
+    concurrency: int = args.concurrency
+    requests: int = args.requests
+
+    params = dict(param.split("=", 1) for param in param_list)
+
+    result = asyncio.run(
+        run_benchmark(
+            config=WebApiLoadBenchmarkConfig(
+                base_url=base_url,
+                method=method,
+                path=path,
+                params=[params],
+                read_api_key=read_api_key,
+                concurrency=concurrency,
+                requests=requests,
+            ),
+        ),
+    )
+
+    print(f"{method} {path} (concurrency={concurrency})")
+    print(f"  requests:   {result.requests} ({result.errors} errors)")
+    print(f"  elapsed:    {result.elapsed:.3f} s")
+    print(f"  throughput: {result.throughput:.1f} req/s")
+    print(
+        "  latency:    "
+        f"p50={result.latency_p50 * 1000:.1f} ms "
+        f"p95={result.latency_p95 * 1000:.1f} ms "
+        f"p99={result.latency_p99 * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
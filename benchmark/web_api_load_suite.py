@@ -0,0 +1,237 @@
+"""
+Measure the throughput and latency of the main Web API endpoints, one after
+another, against the servers seeded by seed_load_benchmark_data.
+
+The requests of an endpoint go to the seeded servers in turn, so that a single
+server does not stay in the caches.
+"""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import httpx
+from pydantic import BaseModel
+
+from benchmark.seed_load_benchmark_data import SEED_HOST
+from benchmark.web_api_load_benchmark import (
+    WebApiLoadBenchmarkConfig,
+    WebApiLoadBenchmarkResult,
+    run_benchmark,
+)
+
+
+class WebApiLoadSuiteEndpoint(BaseModel):
+    method: str
+    path: str
+    params: list[dict[str, str]]
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+def get_seeded_server_ids(
+    base_url: str,
+    read_api_key: str | None,
+    edition: str,
+) -> list[str]:
+    headers: dict[str, str] = {}
+    if read_api_key is not None:
+        headers["X-Read-Api-Key"] = read_api_key
+
+    response = httpx.post(
+        f"{base_url}/{edition}_server/list",
+        headers=headers,
+        timeout=60,
+    )
+    response.raise_for_status()
+
+    server_ids = [
+        server["id"] for server in response.json() if server["host"] == SEED_HOST
+    ]
+    if len(server_ids) == 0:
+        raise Exception(
+            f"No seeded {edition} server. Run seed_load_benchmark_data first."
+        )
+
+    return server_ids
+
+
+def create_endpoints(
+    bedrock_server_ids: list[str],
+    java_server_ids: list[str],
+    now: datetime,
+) -> list[WebApiLoadSuiteEndpoint]:
+    endpoints: list[WebApiLoadSuiteEndpoint] = []
+    for edition, server_ids in (
+        ("bedrock", bedrock_server_ids),
+        ("java", java_server_ids),
+    ):
+        server_id_key = f"{edition}_server_id"
+        endpoints += [
+            WebApiLoadSuiteEndpoint(
+                method="POST",
+                path=f"/{edition}_server/list",
+                params=[{}],
+            ),
+            WebApiLoadSuiteEndpoint(
+                method="GET",
+                path=f"/{edition}_server/list",
+                params=[{}],
+            ),
+            WebApiLoadSuiteEndpoint(
+                method="POST",
+                path=f"/{edition}_ping_record/latest",
+                params=[
+                    {server_id_key: server_id, "count": "20"}
+                    for server_id in server_ids
+                ],
+            ),
+            WebApiLoadSuiteEndpoint(
+                method="GET",
+                path=f"/{edition}_ping_record/latest",
+                params=[
+                    {server_id_key: server_id, "count": "20"}
+                    for server_id in server_ids
+                ],
+            ),
+            WebApiLoadSuiteEndpoint(
+                method="POST",
+                path=f"/{edition}_ping_record/range",
+                params=[
+                    {
+                        server_id_key: server_id,
+                        "since": (now - timedelta(days=1)).isoformat(),
+                        "until": now.isoformat(),
+                        "count": "100",
+                    }
+                    for server_id in server_ids
+                ],
+            ),
+            WebApiLoadSuiteEndpoint(
+                method="POST",
+                path=f"/{edition}_ping_record/rollup",
+                params=[
+                    {
+                        server_id_key: server_id,
+                        "granularity": "hour",
+                        "since": (now - timedelta(days=7)).isoformat(),
+                        "until": now.isoformat(),
+                    }
+                    for server_id in server_ids
+                ],
+            ),
+            WebApiLoadSuiteEndpoint(
+                method="POST",
+                path=f"/status/{edition}",
+                params=[{}],
+            ),
+        ]
+
+    endpoints.append(
+        WebApiLoadSuiteEndpoint(
+            method="POST",
+            path="/status/all",
+            params=[{}],
+        ),
+    )
+    return endpoints
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--base_url",
+        type=str,
+        default="http://127.0.0.1:5000",
+    )
+    parser.add_argument(
+        "--read_api_key",
+        type=str,
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        action="append",
+        help="Number of the concurrent clients (repeatable, default: 32)",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=1000,
+        help="Number of the requests per endpoint and concurrency",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=100,
+        help="Number of the requests per endpoint before the measurement",
+    )
+    parser.add_argument(
+        "--endpoint",
+        type=str,
+        action="append",
+        help='Endpoint to measure in "METHOD PATH" form (repeatable, default: all)',
+    )
+    args = parser.parse_args()
+
+    base_url: str = args.base_url
+    read_api_key: str | None = args.read_api_key
+    concurrencies: list[int] = args.concurrency if args.concurrency else [32]
+    requests: int = args.requests
+    warmup: int = args.warmup
+    endpoint_names: list[str] | None = args.endpoint
+
+    endpoints = create_endpoints(
+        bedrock_server_ids=get_seeded_server_ids(
+            base_url=base_url,
+            read_api_key=read_api_key,
+            edition="bedrock",
+        ),
+        java_server_ids=get_seeded_server_ids(
+            base_url=base_url,
+            read_api_key=read_api_key,
+            edition="java",
+        ),
+        now=datetime.now(UTC),
+    )
+    if endpoint_names is not None:
+        endpoints = [
+            endpoint for endpoint in endpoints if endpoint.name in endpoint_names
+        ]
+
+    print(
+        f"{'endpoint':<32} {'clients':>7} {'req/s':>9} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>6}"
+    )
+    for endpoint in endpoints:
+        for concurrency in concurrencies:
+            config = WebApiLoadBenchmarkConfig(
+                base_url=base_url,
+                method=endpoint.method,
+                path=endpoint.path,
+                params=endpoint.params,
+                read_api_key=read_api_key,
+                concurrency=concurrency,
+                requests=requests,
+            )
+            if warmup > 0:
+                asyncio.run(
+                    run_benchmark(config=config.model_copy(update={"requests": warmup}))
+                )
+
+            result: WebApiLoadBenchmarkResult = asyncio.run(
+                run_benchmark(config=config)
+            )
+            print(
+                f"{endpoint.name:<32} {concurrency:>7} {result.throughput:>9.1f} "
+                f"{result.latency_p50 * 1000:>8.1f} "
+                f"{result.latency_p95 * 1000:>8.1f} "
+                f"{result.latency_p99 * 1000:>8.1f} {result.errors:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+DROP INDEX "java_ping_records__favicon_hash__index";
+
+ALTER TABLE "java_ping_records" ADD COLUMN "favicon" TEXT;
+
+-- Setting "updated_at" to itself keeps it (refresh_updated_at_step2)
+UPDATE "java_ping_records"
+  SET
+    "favicon" = "java_favicons"."favicon",
+    "updated_at" = "java_ping_records"."updated_at"
+  FROM "java_favicons"
+  WHERE "java_ping_records"."favicon_hash" = "java_favicons"."hash";
+
+ALTER TABLE "java_ping_records" DROP COLUMN "favicon_hash";
+
+DROP TRIGGER refresh_java_favicons_updated_at_step1 ON "java_favicons";
+DROP TRIGGER refresh_java_favicons_updated_at_step2 ON "java_favicons";
+DROP TRIGGER refresh_java_favicons_updated_at_step3 ON "java_favicons";
+
+DROP TABLE "java_favicons";
@@ -0,0 +1,40 @@
+CREATE TABLE "java_favicons" (
+  "hash" TEXT PRIMARY KEY, -- Hex-encoded SHA-256 of the data URL
+  "favicon" TEXT NOT NULL, -- Data URL
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER refresh_java_favicons_updated_at_step1
+  BEFORE UPDATE ON "java_favicons" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_java_favicons_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "java_favicons" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_java_favicons_updated_at_step3
+  BEFORE UPDATE ON "java_favicons" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+ALTER TABLE "java_ping_records" ADD COLUMN "favicon_hash" TEXT REFERENCES "java_favicons"("hash");
+
+INSERT INTO "java_favicons"("hash", "favicon")
+  SELECT DISTINCT
+    encode(sha256(convert_to("favicon", 'UTF8')), 'hex'),
+    "favicon"
+  FROM "java_ping_records"
+  WHERE "favicon" IS NOT NULL;
+
+-- Setting "updated_at" to itself keeps it (refresh_updated_at_step2), so that the
+-- backfill does not touch the update times of the records
+UPDATE "java_ping_records"
+  SET
+    "favicon_hash" = encode(sha256(convert_to("favicon", 'UTF8')), 'hex'),
+    "updated_at" = "updated_at"
+  WHERE "favicon" IS NOT NULL;
+
+ALTER TABLE "java_ping_records" DROP COLUMN "favicon";
+
+CREATE INDEX "java_ping_records__favicon_hash__index"
+  ON "java_ping_records"
+  USING btree
+  ("favicon_hash");
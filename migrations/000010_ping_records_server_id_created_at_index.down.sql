@@ -0,0 +1,12 @@
+CREATE INDEX "java_ping_records__java_server_id__index"
+  ON "java_ping_records"
+  USING btree
+  ("java_server_id");
+
+CREATE INDEX "bedrock_ping_records__bedrock_server_id__index"
+  ON "bedrock_ping_records"
+  USING btree
+  ("bedrock_server_id");
+
+DROP INDEX "java_ping_records__java_server_id__created_at__id__index";
+DROP INDEX "bedrock_ping_records__bedrock_server_id__created_at__id__index";
@@ -0,0 +1,18 @@
+-- Serve "WHERE server_id = ? ORDER BY created_at DESC LIMIT ?" and keyset pagination
+-- on (created_at, id) with one index range scan. The status columns are included
+-- for index-only scans of aggregations over a time range.
+CREATE INDEX "bedrock_ping_records__bedrock_server_id__created_at__id__index"
+  ON "bedrock_ping_records"
+  USING btree
+  ("bedrock_server_id", "created_at" DESC, "id" DESC)
+  INCLUDE ("is_timeout", "is_refused", "latency", "players_online");
+
+CREATE INDEX "java_ping_records__java_server_id__created_at__id__index"
+  ON "java_ping_records"
+  USING btree
+  ("java_server_id", "created_at" DESC, "id" DESC)
+  INCLUDE ("is_timeout", "is_refused", "latency", "players_online");
+
+-- Covered by the composite indexes above
+DROP INDEX "bedrock_ping_records__bedrock_server_id__index";
+DROP INDEX "java_ping_records__java_server_id__index";
@@ -0,0 +1,11 @@
+DROP TRIGGER refresh_java_ping_record_rollups_updated_at_step1 ON "java_ping_record_rollups";
+DROP TRIGGER refresh_java_ping_record_rollups_updated_at_step2 ON "java_ping_record_rollups";
+DROP TRIGGER refresh_java_ping_record_rollups_updated_at_step3 ON "java_ping_record_rollups";
+
+DROP TABLE "java_ping_record_rollups";
+
+DROP TRIGGER refresh_bedrock_ping_record_rollups_updated_at_step1 ON "bedrock_ping_record_rollups";
+DROP TRIGGER refresh_bedrock_ping_record_rollups_updated_at_step2 ON "bedrock_ping_record_rollups";
+DROP TRIGGER refresh_bedrock_ping_record_rollups_updated_at_step3 ON "bedrock_ping_record_rollups";
+
+DROP TABLE "bedrock_ping_record_rollups";
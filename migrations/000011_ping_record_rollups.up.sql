@@ -0,0 +1,135 @@
+CREATE TABLE "bedrock_ping_record_rollups" (
+  "bedrock_server_id" UUID NOT NULL REFERENCES "bedrock_servers"("id") ON DELETE CASCADE,
+  "granularity" TEXT NOT NULL CHECK ("granularity" IN ('hour', 'day')),
+  "bucket_start" TIMESTAMPTZ NOT NULL, -- Truncated in UTC
+  "ping_count" INTEGER NOT NULL,
+  "success_count" INTEGER NOT NULL,
+  "timeout_count" INTEGER NOT NULL,
+  "refused_count" INTEGER NOT NULL,
+  "latency_min" NUMERIC,
+  "latency_max" NUMERIC,
+  "latency_sum" NUMERIC NOT NULL,
+  "latency_count" INTEGER NOT NULL,
+  "players_online_min" INTEGER,
+  "players_online_max" INTEGER,
+  "players_online_sum" BIGINT NOT NULL,
+  "players_online_count" INTEGER NOT NULL,
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY ("bedrock_server_id", "granularity", "bucket_start")
+);
+
+CREATE TRIGGER refresh_bedrock_ping_record_rollups_updated_at_step1
+  BEFORE UPDATE ON "bedrock_ping_record_rollups" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_bedrock_ping_record_rollups_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "bedrock_ping_record_rollups" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_bedrock_ping_record_rollups_updated_at_step3
+  BEFORE UPDATE ON "bedrock_ping_record_rollups" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+INSERT INTO "bedrock_ping_record_rollups"(
+  "bedrock_server_id",
+  "granularity",
+  "bucket_start",
+  "ping_count",
+  "success_count",
+  "timeout_count",
+  "refused_count",
+  "latency_min",
+  "latency_max",
+  "latency_sum",
+  "latency_count",
+  "players_online_min",
+  "players_online_max",
+  "players_online_sum",
+  "players_online_count"
+)
+  SELECT
+    "bedrock_server_id",
+    "granularity",
+    date_trunc("granularity", "created_at", 'UTC'),
+    COUNT(*),
+    COUNT(*) FILTER (WHERE NOT "is_timeout" AND NOT COALESCE("is_refused", FALSE)),
+    COUNT(*) FILTER (WHERE "is_timeout"),
+    COUNT(*) FILTER (WHERE COALESCE("is_refused", FALSE)),
+    MIN("latency"),
+    MAX("latency"),
+    COALESCE(SUM("latency"), 0),
+    COUNT("latency"),
+    MIN("players_online"),
+    MAX("players_online"),
+    COALESCE(SUM("players_online"), 0),
+    COUNT("players_online")
+  FROM "bedrock_ping_records"
+  CROSS JOIN unnest(ARRAY['hour', 'day']) AS "granularity"
+  GROUP BY 1, 2, 3;
+
+CREATE TABLE "java_ping_record_rollups" (
+  "java_server_id" UUID NOT NULL REFERENCES "java_servers"("id") ON DELETE CASCADE,
+  "granularity" TEXT NOT NULL CHECK ("granularity" IN ('hour', 'day')),
+  "bucket_start" TIMESTAMPTZ NOT NULL, -- Truncated in UTC
+  "ping_count" INTEGER NOT NULL,
+  "success_count" INTEGER NOT NULL,
+  "timeout_count" INTEGER NOT NULL,
+  "refused_count" INTEGER NOT NULL,
+  "latency_min" NUMERIC,
+  "latency_max" NUMERIC,
+  "latency_sum" NUMERIC NOT NULL,
+  "latency_count" INTEGER NOT NULL,
+  "players_online_min" INTEGER,
+  "players_online_max" INTEGER,
+  "players_online_sum" BIGINT NOT NULL,
+  "players_online_count" INTEGER NOT NULL,
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY ("java_server_id", "granularity", "bucket_start")
+);
+
+CREATE TRIGGER refresh_java_ping_record_rollups_updated_at_step1
+  BEFORE UPDATE ON "java_ping_record_rollups" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_java_ping_record_rollups_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "java_ping_record_rollups" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_java_ping_record_rollups_updated_at_step3
+  BEFORE UPDATE ON "java_ping_record_rollups" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+INSERT INTO "java_ping_record_rollups"(
+  "java_server_id",
+  "granularity",
+  "bucket_start",
+  "ping_count",
+  "success_count",
+  "timeout_count",
+  "refused_count",
+  "latency_min",
+  "latency_max",
+  "latency_sum",
+  "latency_count",
+  "players_online_min",
+  "players_online_max",
+  "players_online_sum",
+  "players_online_count"
+)
+  SELECT
+    "java_server_id",
+    "granularity",
+    date_trunc("granularity", "created_at", 'UTC'),
+    COUNT(*),
+    COUNT(*) FILTER (WHERE NOT "is_timeout" AND NOT COALESCE("is_refused", FALSE)),
+    COUNT(*) FILTER (WHERE "is_timeout"),
+    COUNT(*) FILTER (WHERE COALESCE("is_refused", FALSE)),
+    MIN("latency"),
+    MAX("latency"),
+    COALESCE(SUM("latency"), 0),
+    COUNT("latency"),
+    MIN("players_online"),
+    MAX("players_online"),
+    COALESCE(SUM("players_online"), 0),
+    COUNT("players_online")
+  FROM "java_ping_records"
+  CROSS JOIN unnest(ARRAY['hour', 'day']) AS "granularity"
+  GROUP BY 1, 2, 3;
@@ -0,0 +1,228 @@
+-- java_ping_records, java_ping_record_players
+
+ALTER TABLE "java_ping_record_players" RENAME TO "java_ping_record_players_partitioned";
+ALTER TABLE "java_ping_record_players_partitioned" RENAME CONSTRAINT "java_ping_record_players_pkey" TO "java_ping_record_players_partitioned_pkey";
+DROP INDEX "java_ping_record_players__java_ping_record_id__index";
+DROP INDEX "java_ping_record_players__created_at__index";
+
+ALTER TABLE "java_ping_records" RENAME TO "java_ping_records_partitioned";
+ALTER TABLE "java_ping_records_partitioned" RENAME CONSTRAINT "java_ping_records_pkey" TO "java_ping_records_partitioned_pkey";
+DROP INDEX "java_ping_records__created_at__index";
+DROP INDEX "java_ping_records__favicon_hash__index";
+DROP INDEX "java_ping_records__java_server_id__created_at__id__index";
+
+CREATE TABLE "java_ping_records" (
+  "id" UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  "java_server_id" UUID NOT NULL REFERENCES "java_servers"("id") ON DELETE CASCADE,
+  "timeout" NUMERIC NOT NULL,
+  "is_timeout" BOOLEAN NOT NULL,
+  "is_refused" BOOLEAN DEFAULT FALSE,
+  "version_protocol" INTEGER,
+  "version_name" TEXT,
+  "latency" NUMERIC,
+  "players_online" INTEGER,
+  "players_max" INTEGER,
+  "description" TEXT,
+  "favicon_hash" TEXT REFERENCES "java_favicons"("hash"),
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER refresh_java_ping_records_updated_at_step1
+  BEFORE UPDATE ON "java_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_java_ping_records_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "java_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_java_ping_records_updated_at_step3
+  BEFORE UPDATE ON "java_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+INSERT INTO "java_ping_records"(
+  "id",
+  "java_server_id",
+  "timeout",
+  "is_timeout",
+  "is_refused",
+  "version_protocol",
+  "version_name",
+  "latency",
+  "players_online",
+  "players_max",
+  "description",
+  "favicon_hash",
+  "created_at",
+  "updated_at"
+)
+  SELECT
+    "id",
+    "java_server_id",
+    "timeout",
+    "is_timeout",
+    "is_refused",
+    "version_protocol",
+    "version_name",
+    "latency",
+    "players_online",
+    "players_max",
+    "description",
+    "favicon_hash",
+    "created_at",
+    "updated_at"
+  FROM "java_ping_records_partitioned";
+
+CREATE INDEX "java_ping_records__created_at__index"
+  ON "java_ping_records"
+  USING btree
+  ("created_at");
+
+CREATE INDEX "java_ping_records__favicon_hash__index"
+  ON "java_ping_records"
+  USING btree
+  ("favicon_hash");
+
+CREATE INDEX "java_ping_records__java_server_id__created_at__id__index"
+  ON "java_ping_records"
+  USING btree
+  ("java_server_id", "created_at" DESC, "id" DESC)
+  INCLUDE ("is_timeout", "is_refused", "latency", "players_online");
+
+CREATE TABLE "java_ping_record_players" (
+  "id" UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  "java_ping_record_id" UUID NOT NULL REFERENCES "java_ping_records"("id") ON DELETE CASCADE,
+  "player_id" TEXT NOT NULL,
+  "name" TEXT NOT NULL,
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER refresh_java_ping_record_players_updated_at_step1
+  BEFORE UPDATE ON "java_ping_record_players" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_java_ping_record_players_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "java_ping_record_players" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_java_ping_record_players_updated_at_step3
+  BEFORE UPDATE ON "java_ping_record_players" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+INSERT INTO "java_ping_record_players"(
+  "id",
+  "java_ping_record_id",
+  "player_id",
+  "name",
+  "created_at",
+  "updated_at"
+)
+  SELECT
+    "id",
+    "java_ping_record_id",
+    "player_id",
+    "name",
+    "created_at",
+    "updated_at"
+  FROM "java_ping_record_players_partitioned";
+
+CREATE INDEX "java_ping_record_players__java_ping_record_id__index"
+  ON "java_ping_record_players"
+  USING btree
+  ("java_ping_record_id");
+
+CREATE INDEX "java_ping_record_players__created_at__index"
+  ON "java_ping_record_players"
+  USING btree
+  ("created_at");
+
+DROP TABLE "java_ping_record_players_partitioned";
+DROP TABLE "java_ping_records_partitioned";
+
+
+-- bedrock_ping_records
+
+ALTER TABLE "bedrock_ping_records" RENAME TO "bedrock_ping_records_partitioned";
+ALTER TABLE "bedrock_ping_records_partitioned" RENAME CONSTRAINT "bedrock_ping_records_pkey" TO "bedrock_ping_records_partitioned_pkey";
+DROP INDEX "bedrock_ping_records__created_at__index";
+DROP INDEX "bedrock_ping_records__bedrock_server_id__created_at__id__index";
+
+CREATE TABLE "bedrock_ping_records" (
+  "id" UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  "bedrock_server_id" UUID NOT NULL REFERENCES "bedrock_servers"("id") ON DELETE CASCADE,
+  "timeout" NUMERIC NOT NULL,
+  "is_timeout" BOOLEAN NOT NULL,
+  "is_refused" BOOLEAN DEFAULT FALSE,
+  "version_protocol" INTEGER,
+  "version_brand" TEXT,
+  "version_version" TEXT,
+  "latency" NUMERIC,
+  "players_online" INTEGER,
+  "players_max" INTEGER,
+  "motd" TEXT,
+  "map" TEXT,
+  "gamemode" TEXT,
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER refresh_bedrock_ping_records_updated_at_step1
+  BEFORE UPDATE ON "bedrock_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_bedrock_ping_records_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "bedrock_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_bedrock_ping_records_updated_at_step3
+  BEFORE UPDATE ON "bedrock_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+INSERT INTO "bedrock_ping_records"(
+  "id",
+  "bedrock_server_id",
+  "timeout",
+  "is_timeout",
+  "is_refused",
+  "version_protocol",
+  "version_brand",
+  "version_version",
+  "latency",
+  "players_online",
+  "players_max",
+  "motd",
+  "map",
+  "gamemode",
+  "created_at",
+  "updated_at"
+)
+  SELECT
+    "id",
+    "bedrock_server_id",
+    "timeout",
+    "is_timeout",
+    "is_refused",
+    "version_protocol",
+    "version_brand",
+    "version_version",
+    "latency",
+    "players_online",
+    "players_max",
+    "motd",
+    "map",
+    "gamemode",
+    "created_at",
+    "updated_at"
+  FROM "bedrock_ping_records_partitioned";
+
+CREATE INDEX "bedrock_ping_records__created_at__index"
+  ON "bedrock_ping_records"
+  USING btree
+  ("created_at");
+
+CREATE INDEX "bedrock_ping_records__bedrock_server_id__created_at__id__index"
+  ON "bedrock_ping_records"
+  USING btree
+  ("bedrock_server_id", "created_at" DESC, "id" DESC)
+  INCLUDE ("is_timeout", "is_refused", "latency", "players_online");
+
+DROP TABLE "bedrock_ping_records_partitioned";
+
+
+DROP FUNCTION create_monthly_partitions(TEXT, TIMESTAMPTZ, INTEGER);
+DROP FUNCTION create_monthly_partition(TEXT, TIMESTAMPTZ);
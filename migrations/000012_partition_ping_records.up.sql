@@ -0,0 +1,301 @@
+-- Partition the ping record tables by month of "created_at" (UTC), so that old records
+-- are removed by dropping a partition. The partitions are named
+-- "<table>_pYYYYMM" and created by create_monthly_partition().
+-- The players are partitioned by "created_at" of their ping record, so that a month
+-- of players can be dropped together with the month of ping records.
+
+CREATE FUNCTION create_monthly_partition(parent_table TEXT, month_start TIMESTAMPTZ) RETURNS TEXT AS
+$$
+DECLARE
+  range_start TIMESTAMP := date_trunc('month', month_start AT TIME ZONE 'UTC');
+  partition_name TEXT := parent_table || '_p' || to_char(range_start, 'YYYYMM');
+BEGIN
+  EXECUTE format(
+    'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+    partition_name,
+    parent_table,
+    range_start AT TIME ZONE 'UTC',
+    (range_start + INTERVAL '1 month') AT TIME ZONE 'UTC'
+  );
+  RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION create_monthly_partitions(parent_table TEXT, since TIMESTAMPTZ, months_ahead INTEGER) RETURNS VOID AS
+$$
+DECLARE
+  month_start TIMESTAMP := date_trunc('month', since AT TIME ZONE 'UTC');
+  last_month_start TIMESTAMP := date_trunc('month', CURRENT_TIMESTAMP AT TIME ZONE 'UTC') + make_interval(months => months_ahead);
+BEGIN
+  WHILE month_start <= last_month_start LOOP
+    PERFORM create_monthly_partition(parent_table, month_start AT TIME ZONE 'UTC');
+    month_start := month_start + INTERVAL '1 month';
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- bedrock_ping_records
+
+ALTER TABLE "bedrock_ping_records" RENAME TO "bedrock_ping_records_unpartitioned";
+ALTER TABLE "bedrock_ping_records_unpartitioned" RENAME CONSTRAINT "bedrock_ping_records_pkey" TO "bedrock_ping_records_unpartitioned_pkey";
+DROP INDEX "bedrock_ping_records__created_at__index";
+DROP INDEX "bedrock_ping_records__bedrock_server_id__created_at__id__index";
+
+CREATE TABLE "bedrock_ping_records" (
+  "id" UUID NOT NULL DEFAULT gen_random_uuid(),
+  "bedrock_server_id" UUID NOT NULL REFERENCES "bedrock_servers"("id") ON DELETE CASCADE,
+  "timeout" NUMERIC NOT NULL,
+  "is_timeout" BOOLEAN NOT NULL,
+  "is_refused" BOOLEAN DEFAULT FALSE,
+  "version_protocol" INTEGER,
+  "version_brand" TEXT,
+  "version_version" TEXT,
+  "latency" NUMERIC,
+  "players_online" INTEGER,
+  "players_max" INTEGER,
+  "motd" TEXT,
+  "map" TEXT,
+  "gamemode" TEXT,
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY ("id", "created_at")
+) PARTITION BY RANGE ("created_at");
+
+CREATE TRIGGER refresh_bedrock_ping_records_updated_at_step1
+  BEFORE UPDATE ON "bedrock_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_bedrock_ping_records_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "bedrock_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_bedrock_ping_records_updated_at_step3
+  BEFORE UPDATE ON "bedrock_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+CREATE INDEX "bedrock_ping_records__created_at__index"
+  ON "bedrock_ping_records"
+  USING btree
+  ("created_at");
+
+CREATE INDEX "bedrock_ping_records__bedrock_server_id__created_at__id__index"
+  ON "bedrock_ping_records"
+  USING btree
+  ("bedrock_server_id", "created_at" DESC, "id" DESC)
+  INCLUDE ("is_timeout", "is_refused", "latency", "players_online");
+
+SELECT create_monthly_partitions(
+  'bedrock_ping_records',
+  COALESCE(
+    (SELECT MIN("created_at") FROM "bedrock_ping_records_unpartitioned"),
+    CURRENT_TIMESTAMP
+  ),
+  3
+);
+
+INSERT INTO "bedrock_ping_records"(
+  "id",
+  "bedrock_server_id",
+  "timeout",
+  "is_timeout",
+  "is_refused",
+  "version_protocol",
+  "version_brand",
+  "version_version",
+  "latency",
+  "players_online",
+  "players_max",
+  "motd",
+  "map",
+  "gamemode",
+  "created_at",
+  "updated_at"
+)
+  SELECT
+    "id",
+    "bedrock_server_id",
+    "timeout",
+    "is_timeout",
+    "is_refused",
+    "version_protocol",
+    "version_brand",
+    "version_version",
+    "latency",
+    "players_online",
+    "players_max",
+    "motd",
+    "map",
+    "gamemode",
+    "created_at",
+    "updated_at"
+  FROM "bedrock_ping_records_unpartitioned";
+
+DROP TABLE "bedrock_ping_records_unpartitioned";
+
+
+-- java_ping_records
+
+ALTER TABLE "java_ping_record_players" RENAME TO "java_ping_record_players_unpartitioned";
+ALTER TABLE "java_ping_record_players_unpartitioned" RENAME CONSTRAINT "java_ping_record_players_pkey" TO "java_ping_record_players_unpartitioned_pkey";
+DROP INDEX "java_ping_record_players__java_ping_record_id__index";
+DROP INDEX "java_ping_record_players__created_at__index";
+
+ALTER TABLE "java_ping_records" RENAME TO "java_ping_records_unpartitioned";
+ALTER TABLE "java_ping_records_unpartitioned" RENAME CONSTRAINT "java_ping_records_pkey" TO "java_ping_records_unpartitioned_pkey";
+DROP INDEX "java_ping_records__created_at__index";
+DROP INDEX "java_ping_records__favicon_hash__index";
+DROP INDEX "java_ping_records__java_server_id__created_at__id__index";
+
+CREATE TABLE "java_ping_records" (
+  "id" UUID NOT NULL DEFAULT gen_random_uuid(),
+  "java_server_id" UUID NOT NULL REFERENCES "java_servers"("id") ON DELETE CASCADE,
+  "timeout" NUMERIC NOT NULL,
+  "is_timeout" BOOLEAN NOT NULL,
+  "is_refused" BOOLEAN DEFAULT FALSE,
+  "version_protocol" INTEGER,
+  "version_name" TEXT,
+  "latency" NUMERIC,
+  "players_online" INTEGER,
+  "players_max" INTEGER,
+  "description" TEXT,
+  "favicon_hash" TEXT REFERENCES "java_favicons"("hash"),
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY ("id", "created_at")
+) PARTITION BY RANGE ("created_at");
+
+CREATE TRIGGER refresh_java_ping_records_updated_at_step1
+  BEFORE UPDATE ON "java_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_java_ping_records_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "java_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_java_ping_records_updated_at_step3
+  BEFORE UPDATE ON "java_ping_records" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+CREATE INDEX "java_ping_records__created_at__index"
+  ON "java_ping_records"
+  USING btree
+  ("created_at");
+
+CREATE INDEX "java_ping_records__favicon_hash__index"
+  ON "java_ping_records"
+  USING btree
+  ("favicon_hash");
+
+CREATE INDEX "java_ping_records__java_server_id__created_at__id__index"
+  ON "java_ping_records"
+  USING btree
+  ("java_server_id", "created_at" DESC, "id" DESC)
+  INCLUDE ("is_timeout", "is_refused", "latency", "players_online");
+
+SELECT create_monthly_partitions(
+  'java_ping_records',
+  COALESCE(
+    (SELECT MIN("created_at") FROM "java_ping_records_unpartitioned"),
+    CURRENT_TIMESTAMP
+  ),
+  3
+);
+
+INSERT INTO "java_ping_records"(
+  "id",
+  "java_server_id",
+  "timeout",
+  "is_timeout",
+  "is_refused",
+  "version_protocol",
+  "version_name",
+  "latency",
+  "players_online",
+  "players_max",
+  "description",
+  "favicon_hash",
+  "created_at",
+  "updated_at"
+)
+  SELECT
+    "id",
+    "java_server_id",
+    "timeout",
+    "is_timeout",
+    "is_refused",
+    "version_protocol",
+    "version_name",
+    "latency",
+    "players_online",
+    "players_max",
+    "description",
+    "favicon_hash",
+    "created_at",
+    "updated_at"
+  FROM "java_ping_records_unpartitioned";
+
+
+-- java_ping_record_players
+
+CREATE TABLE "java_ping_record_players" (
+  "id" UUID NOT NULL DEFAULT gen_random_uuid(),
+  "java_ping_record_id" UUID NOT NULL,
+  "java_ping_record_created_at" TIMESTAMPTZ NOT NULL,
+  "player_id" TEXT NOT NULL,
+  "name" TEXT NOT NULL,
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY ("id", "java_ping_record_created_at"),
+  FOREIGN KEY ("java_ping_record_id", "java_ping_record_created_at")
+    REFERENCES "java_ping_records"("id", "created_at") ON DELETE CASCADE
+) PARTITION BY RANGE ("java_ping_record_created_at");
+
+CREATE TRIGGER refresh_java_ping_record_players_updated_at_step1
+  BEFORE UPDATE ON "java_ping_record_players" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_java_ping_record_players_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "java_ping_record_players" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_java_ping_record_players_updated_at_step3
+  BEFORE UPDATE ON "java_ping_record_players" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+CREATE INDEX "java_ping_record_players__java_ping_record_id__index"
+  ON "java_ping_record_players"
+  USING btree
+  ("java_ping_record_id");
+
+CREATE INDEX "java_ping_record_players__created_at__index"
+  ON "java_ping_record_players"
+  USING btree
+  ("created_at");
+
+SELECT create_monthly_partitions(
+  'java_ping_record_players',
+  COALESCE(
+    (SELECT MIN("created_at") FROM "java_ping_records_unpartitioned"),
+    CURRENT_TIMESTAMP
+  ),
+  3
+);
+
+INSERT INTO "java_ping_record_players"(
+  "id",
+  "java_ping_record_id",
+  "java_ping_record_created_at",
+  "player_id",
+  "name",
+  "created_at",
+  "updated_at"
+)
+  SELECT
+    "java_ping_record_players_unpartitioned"."id",
+    "java_ping_record_players_unpartitioned"."java_ping_record_id",
+    "java_ping_records_unpartitioned"."created_at",
+    "java_ping_record_players_unpartitioned"."player_id",
+    "java_ping_record_players_unpartitioned"."name",
+    "java_ping_record_players_unpartitioned"."created_at",
+    "java_ping_record_players_unpartitioned"."updated_at"
+  FROM "java_ping_record_players_unpartitioned"
+  INNER JOIN "java_ping_records_unpartitioned"
+    ON "java_ping_records_unpartitioned"."id" = "java_ping_record_players_unpartitioned"."java_ping_record_id";
+
+DROP TABLE "java_ping_record_players_unpartitioned";
+DROP TABLE "java_ping_records_unpartitioned";
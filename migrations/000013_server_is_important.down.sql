@@ -0,0 +1,2 @@
+ALTER TABLE "bedrock_servers" DROP COLUMN "is_important";
+ALTER TABLE "java_servers" DROP COLUMN "is_important";
@@ -0,0 +1,2 @@
+ALTER TABLE "bedrock_servers" ADD COLUMN "is_important" BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE "java_servers" ADD COLUMN "is_important" BOOLEAN NOT NULL DEFAULT FALSE;
@@ -0,0 +1,5 @@
+DROP TRIGGER refresh_java_server_latest_favicons_updated_at_step1 ON "java_server_latest_favicons";
+DROP TRIGGER refresh_java_server_latest_favicons_updated_at_step2 ON "java_server_latest_favicons";
+DROP TRIGGER refresh_java_server_latest_favicons_updated_at_step3 ON "java_server_latest_favicons";
+
+DROP TABLE "java_server_latest_favicons";
@@ -0,0 +1,28 @@
+-- The hash of the latest favicon of each Java server, kept by the ping record
+-- inserts, so that the favicon of a server is found without searching its records
+-- in all the partitions for the last one with a favicon.
+
+CREATE TABLE "java_server_latest_favicons" (
+  "java_server_id" UUID PRIMARY KEY REFERENCES "java_servers"("id") ON DELETE CASCADE,
+  "favicon_hash" TEXT NOT NULL REFERENCES "java_favicons"("hash"),
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER refresh_java_server_latest_favicons_updated_at_step1
+  BEFORE UPDATE ON "java_server_latest_favicons" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step1();
+CREATE TRIGGER refresh_java_server_latest_favicons_updated_at_step2
+  BEFORE UPDATE OF "updated_at" ON "java_server_latest_favicons" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step2();
+CREATE TRIGGER refresh_java_server_latest_favicons_updated_at_step3
+  BEFORE UPDATE ON "java_server_latest_favicons" FOR EACH ROW
+  EXECUTE PROCEDURE refresh_updated_at_step3();
+
+INSERT INTO "java_server_latest_favicons"("java_server_id", "favicon_hash")
+  SELECT DISTINCT ON ("java_server_id")
+    "java_server_id",
+    "favicon_hash"
+  FROM "java_ping_records"
+  WHERE "favicon_hash" IS NOT NULL
+  ORDER BY "java_server_id", "created_at" DESC;